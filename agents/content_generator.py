@@ -1,19 +1,90 @@
 import logging
-from typing import Dict, Any
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from utils.bedrock_client import BedrockClient
-from utils.prompt_templates import CONTENT_GENERATION_PROMPT
-from config import TEMPERATURE, MAX_TOKENS
+from utils.content_scoring import score_draft
+from utils.output_schemas import BLOG_OUTLINE_SCHEMA
+from utils.prompt_templates import CONTENT_GENERATION_PROMPT, CONTENT_OUTLINE_PROMPT, SECTION_GENERATION_PROMPT
+from config import (TEMPERATURE, MAX_TOKENS, BLOG_POST_LENGTH, CONTENT_GENERATION_MODE,
+                    SECTION_GENERATION_WORKERS, SECTION_RETRIES, DRAFT_CANDIDATES, DRAFT_CANDIDATE_VARIANTS,
+                    DRAFT_MODEL_ID)
 
 logger = logging.getLogger(__name__)
 
 class ContentGeneratorAgent:
     def __init__(self):
         self.claude_client = BedrockClient()
+        # The quick draft may run on a smaller, faster model
+        self.draft_client = BedrockClient(model_id=DRAFT_MODEL_ID) if DRAFT_MODEL_ID else self.claude_client
     
-    def generate_content(self, topic_data: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_content(self,
+                         topic_data: Dict[str, Any],
+                         mode: str = CONTENT_GENERATION_MODE,
+                         candidates: int = DRAFT_CANDIDATES) -> Dict[str, Any]:
         """
         Generate a blog post based on the provided topic data.
+        
+        Args:
+            topic_data: Dictionary with the topic and its research data
+            mode: "single" to write the post in one completion, or "sections" to
+                  generate an outline first and then write all sections in parallel
+            candidates: Number of drafts to generate concurrently; the best one by
+                        local scoring is returned
         """
+        if candidates > 1:
+            return self._generate_best_candidate(topic_data, mode, candidates)
+            
+        return self._generate_draft(topic_data, mode)
+    
+    def generate_quick_draft(self, topic_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generate a draft-quality post as fast as possible: a single completion on
+        the draft model, without candidates or sections.
+        """
+        logger.info("Generating quick draft...")
+        return self._generate_draft(topic_data, "single", client=self.draft_client)
+    
+    def _generate_best_candidate(self, topic_data: Dict[str, Any], mode: str, candidates: int) -> Dict[str, Any]:
+        """
+        Generate several drafts concurrently with different temperatures and angles,
+        and return the one with the best local score.
+        """
+        variants = [DRAFT_CANDIDATE_VARIANTS[i % len(DRAFT_CANDIDATE_VARIANTS)] for i in range(candidates)]
+        logger.info(f"Generating {candidates} draft candidates in parallel...")
+        
+        with ThreadPoolExecutor(max_workers=candidates) as executor:
+            futures = [
+                executor.submit(self._generate_draft, topic_data, mode, variant["temperature"], variant["angle"])
+                for variant in variants
+            ]
+            drafts = [future.result() for future in futures]
+            
+        scored_drafts = []
+        for i, draft in enumerate(drafts):
+            scores = score_draft(draft.get("content", ""), draft.get("keywords", []))
+            logger.info(f"Draft candidate {i+1} ({variants[i]['temperature']}): {scores}")
+            scored_drafts.append((scores["total"], i, draft, scores))
+            
+        _, best_index, best_draft, _ = max(scored_drafts, key=lambda item: item[0])
+        logger.info(f"Selected draft candidate {best_index+1}: '{best_draft.get('title', '')}'")
+        
+        return {
+            **best_draft,
+            "candidate_scores": [scores for _, _, _, scores in scored_drafts],
+            "selected_candidate": best_index
+        }
+    
+    def _generate_draft(self,
+                        topic_data: Dict[str, Any],
+                        mode: str,
+                        temperature: float = TEMPERATURE,
+                        angle: str = "",
+                        client: Optional[BedrockClient] = None) -> Dict[str, Any]:
+        """
+        Generate one draft of the blog post.
+        """
+        client = client or self.claude_client
         try:
             topic = topic_data.get("topic", {})
             research_data = topic_data.get("research_data", {})
@@ -35,21 +106,38 @@ class ContentGeneratorAgent:
                     # Limit text length to keep prompt size manageable
                     context += f"\nSource {i+1}: {source.get('title', '')}\n{source_text[:1500]}...\n"
             
+            system_prompt = f"You are an expert AI content writer specialized in {topic_title}. Create comprehensive, accurate, and engaging content."
+            
+            if mode == "sections":
+                sectioned = self._generate_sectioned_content(topic_title, keywords_str, context, system_prompt, temperature, angle)
+                if sectioned:
+                    title, body, outline = sectioned
+                    return {
+                        "topic": topic,
+                        "title": title,
+                        "content": body,
+                        "keywords": keywords,
+                        "outline": outline
+                    }
+                logger.warning("Sectioned generation failed, falling back to single-pass generation")
+                
             # Build the prompt
             prompt = CONTENT_GENERATION_PROMPT.format(
                 topic=topic_title,
                 keywords=keywords_str
             )
             
+            if angle:
+                prompt += f"\n\nEditorial angle: {angle}"
+                
             if context:
                 prompt += f"\n\nUse the following research information to enrich your content:\n{context}"
             
             # Call Claude
-            system_prompt = f"You are an expert AI content writer specialized in {topic_title}. Create comprehensive, accurate, and engaging content."
-            response = self.claude_client.generate_text(
+            response = client.generate_text(
                 system_prompt=system_prompt,
                 user_message=prompt,
-                temperature=TEMPERATURE,
+                temperature=temperature,
                 max_tokens=MAX_TOKENS
             )
             
@@ -77,4 +165,152 @@ class ContentGeneratorAgent:
                 "title": f"Understanding {topic_data.get('topic', {}).get('title', 'AI Technology')}",
                 "content": f"An exploration of {topic_data.get('topic', {}).get('title', 'AI Technology')} and its impact on the industry.",
                 "keywords": topic_data.get("topic", {}).get("keywords", [])
-            }
\ No newline at end of file
+            }
+    
+    def generate_outline(self,
+                         topic_title: str,
+                         keywords_str: str,
+                         context: str = "",
+                         temperature: float = TEMPERATURE,
+                         angle: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Generate a structured outline (title plus sections with key points).
+        
+        Returns:
+            The validated outline, or None if it could not be generated
+        """
+        prompt = CONTENT_OUTLINE_PROMPT.format(
+            topic=topic_title,
+            keywords=keywords_str,
+            word_count=BLOG_POST_LENGTH
+        )
+        if angle:
+            prompt += f"\n\nEditorial angle: {angle}"
+        if context:
+            prompt += f"\n\nUse the following research information to plan the content:\n{context}"
+            
+        outline = self.claude_client.generate_structured(
+            system_prompt=f"You are an expert AI content strategist specialized in {topic_title}.",
+            user_message=prompt,
+            tool_name="record_blog_outline",
+            tool_description="Record the blog post outline.",
+            input_schema=BLOG_OUTLINE_SCHEMA,
+            temperature=temperature
+        )
+        if not outline:
+            return None
+            
+        # Make sure every section has a sensible length target
+        default_words = BLOG_POST_LENGTH // len(outline["sections"])
+        for section in outline["sections"]:
+            if section.get("target_words", 0) <= 0:
+                section["target_words"] = default_words
+                
+        return outline
+    
+    def generate_section(self,
+                         outline: Dict[str, Any],
+                         index: int,
+                         keywords_str: str,
+                         context: str,
+                         system_prompt: str,
+                         temperature: float = TEMPERATURE) -> str:
+        """
+        Generate a single section of the outline, retrying it on its own if it fails.
+        
+        Raises:
+            RuntimeError: If the section could not be generated after all retries
+        """
+        sections = outline["sections"]
+        section = sections[index]
+        
+        outline_text = "\n".join(f"{i+1}. {s['heading']}" for i, s in enumerate(sections))
+        prompt = SECTION_GENERATION_PROMPT.format(
+            title=outline["title"],
+            keywords=keywords_str,
+            outline=outline_text,
+            section_number=index + 1,
+            heading=section["heading"],
+            key_points="\n".join(f"- {point}" for point in section["key_points"]),
+            target_words=section["target_words"],
+            previous_heading=sections[index - 1]["heading"] if index > 0 else "none, this is the opening",
+            next_heading=sections[index + 1]["heading"] if index < len(sections) - 1 else "none, this is the closing"
+        )
+        if context:
+            prompt += f"\n\nUse the following research information to enrich your content:\n{context}"
+            
+        # Roughly 1.5 tokens per word, with headroom for formatting
+        max_tokens = min(MAX_TOKENS, int(section["target_words"] * 2) + 256)
+        
+        last_error = ""
+        for attempt in range(SECTION_RETRIES + 1):
+            response = self.claude_client.invoke_model(
+                system_prompt=system_prompt,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            if "error" not in response and response.get("content"):
+                return self._clean_section(response["content"][0]["text"], section["heading"])
+                
+            last_error = response.get("error", "empty response")
+            logger.warning(f"Section '{section['heading']}' failed (attempt {attempt+1}): {last_error}")
+            
+        raise RuntimeError(f"Could not generate section '{section['heading']}': {last_error}")
+    
+    def _generate_sectioned_content(self,
+                                    topic_title: str,
+                                    keywords_str: str,
+                                    context: str,
+                                    system_prompt: str,
+                                    temperature: float = TEMPERATURE,
+                                    angle: str = "") -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Generate the outline, then all sections concurrently, and stitch them together.
+        
+        Returns:
+            Tuple of (title, body, outline), or None if generation failed
+        """
+        outline = self.generate_outline(topic_title, keywords_str, context, temperature, angle)
+        if not outline:
+            return None
+            
+        sections = outline["sections"]
+        logger.info(f"Generating {len(sections)} sections in parallel for: {outline['title']}")
+        
+        try:
+            with ThreadPoolExecutor(max_workers=min(SECTION_GENERATION_WORKERS, len(sections))) as executor:
+                futures = [
+                    executor.submit(self.generate_section, outline, i, keywords_str, context, system_prompt, temperature)
+                    for i in range(len(sections))
+                ]
+                section_texts = [future.result() for future in futures]
+        except Exception as e:
+            logger.error(f"Error generating sections: {str(e)}")
+            return None
+            
+        body = self._stitch_sections([s["heading"] for s in sections], section_texts)
+        return outline["title"].strip(), body, outline
+    
+    def _clean_section(self, text: str, heading: str) -> str:
+        """
+        Remove a repeated section heading and demote stray top-level headings.
+        """
+        lines = text.strip().split('\n')
+        
+        # Drop the heading if the model echoed it at the start
+        if lines and lines[0].strip().lstrip('#').strip().strip('*').lower() == heading.strip().lower():
+            lines = lines[1:]
+            
+        # Headings inside a section must stay below the ## section heading
+        lines = [re.sub(r'^#{1,2}\s+', '### ', line) for line in lines]
+        
+        return '\n'.join(lines).strip()
+    
+    def _stitch_sections(self, headings: List[str], section_texts: List[str]) -> str:
+        """
+        Join sections under ## headings with consistent paragraph spacing.
+        """
+        parts = [f"## {heading.strip()}\n\n{text}" for heading, text in zip(headings, section_texts)]
+        body = '\n\n'.join(parts)
+        return re.sub(r'\n{3,}', '\n\n', body)
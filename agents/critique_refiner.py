@@ -1,25 +1,198 @@
 import logging
 import re
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable
 from utils.bedrock_client import BedrockClient
-from utils.prompt_templates import SELF_CRITIQUE_PROMPT, CONTENT_REFINEMENT_PROMPT
-from config import TEMPERATURE, MAX_TOKENS, MAX_ITERATIONS
+from utils.content_scoring import text_change_ratio
+from utils.content_history import make_delta
+from utils.markdown_normalizer import normalize_markdown, structure_issues
+from utils.edit_script import split_blocks, number_blocks, apply_edits, EditScriptError
+from utils.article_sections import (split_sections, join_sections, map_findings_to_sections, replace_section_body,
+                                    changed_sections, section_hash)
+from utils.output_schemas import CRITIQUE_SCHEMA, ASPECT_CRITIQUE_SCHEMA, EDIT_SCRIPT_SCHEMA
+from utils.prompt_templates import (SELF_CRITIQUE_PROMPT, CONTENT_REFINEMENT_PROMPT, CONTENT_EDIT_PROMPT,
+                                    SECTION_REFINEMENT_PROMPT, CRITIQUE_ASPECTS, ASPECT_CRITIQUE_PROMPT)
+from config import (TEMPERATURE, MAX_TOKENS, MAX_ITERATIONS, REFINEMENT_SCORE_TARGET,
+                    REFINEMENT_MIN_SCORE_GAIN, REFINEMENT_MIN_CHANGE, REFINEMENT_MODE,
+                    SECTION_REFINEMENT_WORKERS, CRITIQUE_MODE, CRITIQUE_ASPECT_MODEL_ID)
 
 logger = logging.getLogger(__name__)
 
+# Sort order for critique finding severities
+SEVERITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+
+def clean_scores(scores: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Keep only the scores of known critique aspects, as integers clamped to 1-10.
+    
+    Unknown aspects and non-numeric values returned by the model are dropped.
+    """
+    cleaned = {}
+    for aspect, value in (scores or {}).items():
+        if aspect not in CRITIQUE_ASPECTS or isinstance(value, bool):
+            continue
+        try:
+            cleaned[aspect] = min(max(int(round(float(value))), 1), 10)
+        except (TypeError, ValueError, OverflowError):
+            continue
+    return cleaned
+
+
+def average_score(scores: Dict[str, int]) -> Optional[float]:
+    """
+    Return the average of cleaned scores, or None if there are none.
+    """
+    return round(sum(scores.values()) / len(scores), 2) if scores else None
+
+
+def format_findings(findings: List[Dict[str, Any]]) -> str:
+    """
+    Format critique findings as a bulleted critique for a refinement prompt.
+    """
+    return "\n".join(
+        f"- [{finding.get('severity', 'medium').upper()}] {finding['issue']}\n  Suggestion: {finding.get('suggestion', '')}"
+        for finding in findings
+    )
+
 class CritiqueRefinerAgent:
     def __init__(self):
         self.claude_client = BedrockClient()
+        # Aspect critiques may run on a smaller, faster model
+        self.aspect_client = BedrockClient(model_id=CRITIQUE_ASPECT_MODEL_ID) if CRITIQUE_ASPECT_MODEL_ID else self.claude_client
     
     def critique_content(self, content: str) -> str:
         """
         Generate a critique of the content.
         """
+        return self.critique_with_score(content)["critique"]
+    
+    def critique_with_score(self, content: str, mode: str = CRITIQUE_MODE) -> Dict[str, Any]:
+        """
+        Generate a critique of the content together with structured scores.
+        
+        In "aspects" mode each aspect is critiqued concurrently and the findings
+        are merged into one prioritized critique.
+        
+        Returns:
+            Dictionary with the critique text, the per-area scores and their
+            average as "score" (None if the scores could not be obtained)
+        """
+        if mode == "aspects":
+            result = self.critique_aspects(content)
+            if result:
+                return result
+            logger.warning("Aspect critiques failed, falling back to a single critique")
+            
+        return self._critique_single(content)
+    
+    def critique_aspects(self, content: str) -> Optional[Dict[str, Any]]:
+        """
+        Critique every aspect in parallel and merge the findings.
+        
+        Returns:
+            The merged critique, or None if no aspect critique succeeded
+        """
+        with ThreadPoolExecutor(max_workers=len(CRITIQUE_ASPECTS)) as executor:
+            futures = {
+                aspect: executor.submit(self._critique_aspect, aspect, question, content)
+                for aspect, question in CRITIQUE_ASPECTS.items()
+            }
+            aspect_results = {aspect: future.result() for aspect, future in futures.items()}
+            
+        aspect_results = {aspect: result for aspect, result in aspect_results.items() if result}
+        if not aspect_results:
+            return None
+            
+        return self._merge_aspect_critiques(aspect_results)
+    
+    def _critique_aspect(self, aspect: str, question: str, content: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.aspect_client.generate_structured(
+                system_prompt=f"You are an expert editor reviewing technical AI content for {aspect}.",
+                user_message=ASPECT_CRITIQUE_PROMPT.format(aspect=aspect.upper(), question=question, content=content),
+                tool_name="record_aspect_review",
+                tool_description=f"Record the {aspect} review of the blog post.",
+                input_schema=ASPECT_CRITIQUE_SCHEMA,
+                temperature=TEMPERATURE,
+                max_tokens=MAX_TOKENS
+            )
+        except Exception as e:
+            logger.error(f"Error generating {aspect} critique: {str(e)}")
+            return None
+    
+    def _merge_aspect_critiques(self, aspect_results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merge aspect critiques into one deduplicated critique, most severe issues first.
+        """
+        scores = clean_scores({aspect: result.get("score") for aspect, result in aspect_results.items()})
+        
+        # Deduplicate findings reported by several aspects, keeping the highest severity
+        merged: List[Dict[str, Any]] = []
+        for aspect, result in aspect_results.items():
+            for finding in result["findings"]:
+                words = set(re.findall(r'[a-z0-9]+', finding["issue"].lower()))
+                duplicate = next((m for m in merged if words and len(words & m["words"]) / len(words | m["words"]) > 0.5), None)
+                if duplicate:
+                    duplicate["aspects"].append(aspect)
+                    if SEVERITY_ORDER[finding["severity"]] < SEVERITY_ORDER[duplicate["severity"]]:
+                        duplicate["severity"] = finding["severity"]
+                    continue
+                merged.append({**finding, "aspects": [aspect], "words": words})
+                
+        # Most severe first, then issues from the weakest aspects
+        merged.sort(key=lambda f: (SEVERITY_ORDER[f["severity"]], min(scores.get(a, 10) for a in f["aspects"])))
+        
+        lines = ["SCORES:"]
+        lines += [f"- {aspect.capitalize()}: {score}/10" for aspect, score in scores.items()]
+        strengths = [s for result in aspect_results.values() for s in result.get("strengths", [])]
+        if strengths:
+            lines += ["", "STRENGTHS TO KEEP:"]
+            lines += [f"- {strength}" for strength in strengths]
+        lines += ["", "ISSUES TO ADDRESS (in priority order):"]
+        for i, finding in enumerate(merged):
+            location = f" (in: {finding['location']})" if finding.get("location") else ""
+            aspects = ", ".join(a.capitalize() for a in finding["aspects"])
+            lines.append(f"{i+1}. [{finding['severity'].upper()} - {aspects}] {finding['issue']}{location}")
+            lines.append(f"   Suggestion: {finding['suggestion']}")
+        if not merged:
+            lines.append("- No significant issues found.")
+            
+        return {
+            "critique": "\n".join(lines),
+            "scores": scores,
+            "score": average_score(scores),
+            "findings": [{key: value for key, value in f.items() if key != "words"} for f in merged]
+        }
+    
+    def _critique_single(self, content: str) -> Dict[str, Any]:
+        """
+        Generate one combined critique covering all aspects.
+        """
         try:
             # Call Claude for critique
             system_prompt = "You are an expert editor specializing in technical content about artificial intelligence."
             user_message = SELF_CRITIQUE_PROMPT.format(content=content)
             
+            result = self.claude_client.generate_structured(
+                system_prompt=system_prompt,
+                user_message=user_message,
+                tool_name="record_critique",
+                tool_description="Record the scores and written critique of the blog post.",
+                input_schema=CRITIQUE_SCHEMA,
+                temperature=TEMPERATURE,
+                max_tokens=MAX_TOKENS
+            )
+            
+            if result:
+                scores = clean_scores(result["scores"])
+                return {
+                    "critique": result["critique"],
+                    "scores": scores,
+                    "score": average_score(scores)
+                }
+                
+            # Fall back to a plain-text critique without scores
             response = self.claude_client.generate_text(
                 system_prompt=system_prompt,
                 user_message=user_message,
@@ -27,15 +200,172 @@ class CritiqueRefinerAgent:
                 max_tokens=MAX_TOKENS
             )
             
-            return response
+            return {"critique": response, "scores": {}, "score": None}
             
         except Exception as e:
             logger.error(f"Error generating critique: {str(e)}")
-            return "The content needs improvement in clarity and structure. Consider adding more specific examples and reorganizing the sections for better flow."
+            return {
+                "critique": "The content needs improvement in clarity and structure. Consider adding more specific examples and reorganizing the sections for better flow.",
+                "scores": {},
+                "score": None
+            }
     
-    def refine_content(self, original_content: str, critique: str) -> str:
+    def refine_content(self,
+                       original_content: str,
+                       critique: str,
+                       mode: str = REFINEMENT_MODE,
+                       findings: Optional[List[Dict[str, Any]]] = None) -> str:
         """
         Refine the content based on the critique.
+        
+        In "sections" mode only the sections the critique findings point at are
+        refined, and all other sections are kept byte-identical. In "edits" mode the
+        model returns targeted edits that are applied locally. A full rewrite is
+        only requested if neither is possible.
+        
+        Args:
+            original_content: The content to refine
+            critique: The critique text
+            mode: "sections", "edits" or "full"
+            findings: Structured critique findings with locations, used in "sections" mode
+        """
+        if mode == "sections" and findings:
+            sectioned_content = self.refine_sections(original_content, findings)
+            if sectioned_content is not None:
+                return sectioned_content
+            logger.warning("Section refinement not possible, falling back to an edit script")
+            
+        if mode in ("sections", "edits"):
+            edited_content = self.refine_with_edits(original_content, critique)
+            if edited_content is not None:
+                return edited_content
+            logger.warning("Edit script could not be applied, falling back to a full rewrite")
+            
+        return self._rewrite_content(original_content, critique)
+    
+    def refine_sections(self, original_content: str, findings: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Refine only the sections that critique findings refer to, in parallel.
+        
+        Findings that cannot be tied to a section are then applied to the whole
+        content with an edit script.
+        
+        Returns:
+            The content with the flagged sections refined, or None if no finding
+            could be tied to a section or no section was changed
+        """
+        sections = split_sections(original_content)
+        flagged, unlocated = map_findings_to_sections(findings, sections)
+        if not flagged:
+            return None
+            
+        first_line = sections[0]["text"].lstrip().split('\n', 1)[0]
+        title = first_line.lstrip('#').strip() if first_line.startswith('# ') else ""
+        outline = "\n".join(f"- {s['heading']}" for s in sections if s["heading"])
+        logger.info(f"Refining {len(flagged)} of {len(sections)} sections in parallel")
+        
+        with ThreadPoolExecutor(max_workers=min(SECTION_REFINEMENT_WORKERS, len(flagged))) as executor:
+            futures = {
+                index: executor.submit(self._refine_section, title, outline, sections[index], section_findings)
+                for index, section_findings in flagged.items()
+            }
+            refined = {index: future.result() for index, future in futures.items()}
+            
+        # Sections the model returned unchanged are skipped
+        updated = {}
+        for index, text in refined.items():
+            if not text:
+                continue
+            new_text = replace_section_body(sections[index], text)
+            if section_hash(new_text) != sections[index]["hash"]:
+                updated[index] = new_text
+        if not updated:
+            return None
+            
+        for index, text in updated.items():
+            sections[index] = {**sections[index], "text": text, "hash": section_hash(text)}
+        refined_content = join_sections(sections)
+            
+        if unlocated:
+            logger.info(f"Applying {len(unlocated)} findings that are not specific to a section with an edit script")
+            edited_content = self.refine_with_edits(refined_content, format_findings(unlocated))
+            if edited_content is not None:
+                return edited_content
+            logger.warning("Edit script for the remaining findings could not be applied, they are left to the next critique")
+            
+        return refined_content
+    
+    def _refine_section(self, title: str, outline: str, section: Dict[str, Any], findings: List[Dict[str, Any]]) -> Optional[str]:
+        try:
+            critique = format_findings(findings)
+            word_count = max(len(section["text"].split()), 50)
+            
+            response = self.claude_client.generate_text(
+                system_prompt="You are an expert AI content writer. Your task is to improve one section of a blog post based on editorial feedback.",
+                user_message=SECTION_REFINEMENT_PROMPT.format(
+                    title=title or "(untitled)",
+                    outline=outline or "- (no sections)",
+                    section=section["text"].strip(),
+                    critique=critique,
+                    word_count=word_count
+                ),
+                temperature=TEMPERATURE,
+                max_tokens=min(MAX_TOKENS, word_count * 3 + 256)
+            )
+            
+            if not response.strip() or response.startswith("Error"):
+                logger.warning(f"Could not refine section '{section['heading'] or '(opening)'}': {response[:200]}")
+                return None
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error refining section '{section['heading']}': {str(e)}")
+            return None
+    
+    def refine_with_edits(self, original_content: str, critique: str) -> Optional[str]:
+        """
+        Refine the content by asking for an edit script against numbered paragraphs.
+        
+        Returns:
+            The edited content, or None if no valid edit script could be applied
+        """
+        try:
+            blocks = split_blocks(original_content)
+            if not blocks:
+                return None
+                
+            system_prompt = "You are an expert AI content writer. Your task is to improve content based on editorial feedback with minimal, targeted edits."
+            user_message = CONTENT_EDIT_PROMPT.format(
+                numbered_content=number_blocks(blocks),
+                critique=critique
+            )
+            
+            result = self.claude_client.generate_structured(
+                system_prompt=system_prompt,
+                user_message=user_message,
+                tool_name="apply_edits",
+                tool_description="Apply targeted edits to numbered paragraphs of the blog post.",
+                input_schema=EDIT_SCRIPT_SCHEMA,
+                temperature=TEMPERATURE,
+                max_tokens=MAX_TOKENS
+            )
+            if not result:
+                return None
+                
+            edited_content = apply_edits(blocks, result["edits"])
+            logger.info(f"Applied {len(result['edits'])} edits to the content")
+            return edited_content
+            
+        except EditScriptError as e:
+            logger.warning(f"Invalid edit script: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Error refining content with edits: {str(e)}")
+            return None
+    
+    def _rewrite_content(self, original_content: str, critique: str) -> str:
+        """
+        Refine the content by having the model rewrite the complete article.
         """
         try:
             # Call Claude for refinement
@@ -58,42 +388,20 @@ class CritiqueRefinerAgent:
             logger.error(f"Error refining content: {str(e)}")
             return original_content
     
-    def _format_final_content(self, content: str) -> str:
-        """
-        Format the final content to be properly structured for the HTML generator.
-        Ensures proper headings and paragraphs.
-        """
-        # Clean up any excessive newlines
-        content = re.sub(r'\n{3,}', '\n\n', content)
-        
-        # Ensure headings are properly formatted with # symbols if not already
-        lines = content.split('\n')
-        formatted_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            if line:
-                # Check if this looks like a heading but doesn't use markdown format
-                if re.match(r'^[A-Z][A-Za-z0-9\s:]{5,50}$', line) and not line.startswith('#'):
-                    if len(line) <= 40:  # Short enough to be a main heading
-                        formatted_lines.append(f"# {line}")
-                    else:  # Likely a subheading
-                        formatted_lines.append(f"## {line}")
-                else:
-                    formatted_lines.append(line)
-        
-        # Join the lines back together
-        formatted_content = '\n'.join(formatted_lines)
-        
-        # Ensure paragraphs are properly separated
-        formatted_content = re.sub(r'(\w)\n(\w)', r'\1\n\n\2', formatted_content)
-        
-        return formatted_content
-    
     def finalize_content(self, content: str, title: str) -> str:
         """
         Perform final formatting on the content to prepare it for HTML generation.
+        
+        The content is normalized locally; the LLM formatting pass only runs when
+        the normalized structure still fails the quality check.
         """
+        normalized_content = normalize_markdown(content, title)
+        issues = structure_issues(normalized_content)
+        if not issues:
+            return normalized_content
+            
+        logger.info(f"Structure check failed ({'; '.join(issues)}), running LLM formatting pass")
+        
         try:
             # Get Claude to format the content with proper headings and structure
             system_prompt = """You are an expert content formatter preparing blog content for HTML conversion.
@@ -119,19 +427,50 @@ class CritiqueRefinerAgent:
                 max_tokens=MAX_TOKENS
             )
             
-            # Do additional formatting if needed
-            formatted_content = self._format_final_content(formatted_content)
+            if formatted_content.startswith("Error"):
+                return normalized_content
             
-            return formatted_content
+            # Normalize the model's output the same way
+            return normalize_markdown(formatted_content, title)
             
         except Exception as e:
             logger.error(f"Error finalizing content: {str(e)}")
-            # Fall back to simple formatting
-            return self._format_final_content(content)
+            # Fall back to the locally normalized content
+            return normalized_content
+    
+    def _stop_reason(self,
+                     score: Optional[float],
+                     previous_score: Optional[float],
+                     change_ratio: Optional[float]) -> Optional[str]:
+        """
+        Decide whether refinement has converged.
+        """
+        if score is not None and score >= REFINEMENT_SCORE_TARGET:
+            return "score_target_reached"
+        if score is not None and previous_score is not None and score - previous_score < REFINEMENT_MIN_SCORE_GAIN:
+            return "score_plateau"
+        if change_ratio is not None and change_ratio < REFINEMENT_MIN_CHANGE:
+            return "content_converged"
+        return None
     
-    def iterative_refinement(self, content_data: Dict[str, Any]) -> Dict[str, Any]:
+    def iterative_refinement(self,
+                             content_data: Dict[str, Any],
+                             progress_callback: Optional[Callable[[int, str], None]] = None) -> Dict[str, Any]:
         """
         Perform iterative refinement on the content.
+        
+        Stops before MAX_ITERATIONS when the critique score reaches the target,
+        stops improving, or a refinement barely changes the text.
+        
+        Args:
+            content_data: The generated content (title, content, topic, keywords)
+            progress_callback: Optional function called with the iteration number and
+                               the step about to run ("critique", "refine" or "finalize")
+                               
+        Returns:
+            The refined content. Refined versions in "refinement_history" are stored
+            as deltas against the previous version; use
+            utils.content_history.materialize_versions with the input content to rebuild them.
         """
         # Initialize history to track iterations
         refinement_history = []
@@ -144,31 +483,68 @@ class CritiqueRefinerAgent:
         
         logger.info(f"Starting iterative refinement for: {title}")
         
+        previous_score = None
+        change_ratio = None
+        best_score = None
+        best_content = current_content
+        stop_reason = "max_iterations"
+        
         # Track iterations
         for iteration in range(MAX_ITERATIONS):
             logger.info(f"Iteration {iteration+1}/{MAX_ITERATIONS}")
+            if progress_callback:
+                progress_callback(iteration + 1, "critique")
             
             # Generate critique
-            critique = self.critique_content(current_content)
+            critique_result = self.critique_with_score(current_content)
+            score = critique_result["score"]
             
             # Store the critique
             refinement_history.append({
                 "iteration": iteration + 1,
-                "critique": critique
+                "critique": critique_result["critique"],
+                "score": score
             })
             
+            if score is not None and (best_score is None or score > best_score):
+                best_score, best_content = score, current_content
+                
+            reason = self._stop_reason(score, previous_score, change_ratio)
+            if reason:
+                stop_reason = reason
+                break
+            
             # Skip refinement on the last iteration
             if iteration < MAX_ITERATIONS - 1:
+                if progress_callback:
+                    progress_callback(iteration + 1, "refine")
+                    
                 # Refine content based on critique
-                refined_content = self.refine_content(current_content, critique)
+                refined_content = self.refine_content(current_content, critique_result["critique"],
+                                                      findings=critique_result.get("findings"))
+                change_ratio = text_change_ratio(current_content, refined_content)
+                
+                # Store the refined content as a delta against the previous version
+                refinement_history[-1]["delta"] = make_delta(current_content, refined_content)
+                refinement_history[-1]["change_ratio"] = round(change_ratio, 3)
+                refinement_history[-1]["changed_sections"] = changed_sections(current_content, refined_content)
                 
                 # Update current content for next iteration
                 current_content = refined_content
+                previous_score = score
                 
-                # Store the refined content
-                refinement_history[-1]["refined_content"] = refined_content
+        # A refinement that lowered the score is not kept
+        final_score = refinement_history[-1]["score"]
+        if final_score is not None and best_score is not None and final_score < best_score:
+            logger.info(f"Reverting to the best-scoring version ({best_score})")
+            current_content, final_score = best_content, best_score
+            
+        iterations_used = len(refinement_history)
+        logger.info(f"Refinement stopped after {iterations_used} iterations: {stop_reason}")
         
         # Perform final formatting before returning
+        if progress_callback:
+            progress_callback(iterations_used, "finalize")
         final_content = self.finalize_content(current_content, title)
         print("==============================================")
         print("Final content:")
@@ -181,5 +557,8 @@ class CritiqueRefinerAgent:
             "title": title,
             "content": final_content,  # This is the final version
             "keywords": content_data.get("keywords", []),
-            "refinement_history": refinement_history
+            "refinement_history": refinement_history,
+            "stop_reason": stop_reason,
+            "iterations_used": iterations_used,
+            "final_score": final_score
         }
@@ -1,23 +1,53 @@
 import logging
 import os
-import json
-from typing import Dict, Any
-from PIL import Image
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, List, Optional, Callable
 from utils.bedrock_client import BedrockClient
 from utils.stable_diffusion_client import StableDiffusionClient
+from utils.local_diffusion_client import LocalDiffusionClient
+from utils.image_jobs import ImageJob, gather_jobs
+from utils.image_scoring import pick_best_image
+from utils.image_processing import generation_size, create_responsive_variants
+from utils.placeholder_images import save_placeholder_image
+from utils.output_schemas import IMAGE_PROMPT_SCHEMA
 from utils.prompt_templates import IMAGE_PROMPT_GENERATION
-from config import STABLE_DIFFUSION_MODEL, IMAGE_SIZE, TEMPERATURE, OUTPUT_DIR, HF_API_TOKEN
+from utils.topic_store import fingerprint_topic, topic_similarity
+from config import (STABLE_DIFFUSION_MODEL, IMAGE_SIZE, TEMPERATURE, OUTPUT_DIR, HF_API_TOKEN,
+                    IMAGE_BACKEND, IMAGE_QUALITY_TIER, IMAGE_QUALITY_TIERS, IMAGE_TITLE_SIMILARITY_THRESHOLD,
+                    IMAGE_VARIANT_WIDTHS, IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_QUALITY, IMAGE_THUMBNAIL_SIZE,
+                    IMAGE_CANDIDATES, IMAGE_CANDIDATE_GRACE)
 
 logger = logging.getLogger(__name__)
 
+# Fields added to the content data by process_content_for_image
+IMAGE_FIELDS = ("image_prompt", "image_description", "image_path", "image_filename", "image_placeholder",
+                "image_variants")
+
 class ImageGeneratorAgent:
     def __init__(self):
         self.claude_client = BedrockClient()
-        self.sd_client = StableDiffusionClient(api_token=HF_API_TOKEN)
+        if IMAGE_BACKEND == "local":
+            self.sd_client = LocalDiffusionClient()
+        else:
+            self.sd_client = StableDiffusionClient(api_token=HF_API_TOKEN)
         
         # Set the model ID to use
         if STABLE_DIFFUSION_MODEL:
             self.sd_client.set_model(STABLE_DIFFUSION_MODEL)
+            
+        # Background image jobs that overlap with content refinement
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-job")
+        
+        # Load the local pipeline in the background so the first image does not wait for it
+        if IMAGE_BACKEND == "local":
+            self._executor.submit(self._warm_up)
+    
+    def _warm_up(self) -> None:
+        try:
+            self.sd_client.warm_up()
+        except Exception as e:
+            logger.error(f"Error loading local diffusion pipeline: {str(e)}")
     
     def generate_image_prompt(self, title: str, content: str) -> Dict[str, str]:
         """
@@ -34,43 +64,22 @@ class ImageGeneratorAgent:
                 content=condensed_content
             )
             
-            response = self.claude_client.generate_text(
+            data = self.claude_client.generate_structured(
                 system_prompt=system_prompt,
                 user_message=user_message,
+                tool_name="record_image_prompt",
+                tool_description="Record the image generation prompt and its caption.",
+                input_schema=IMAGE_PROMPT_SCHEMA,
                 temperature=TEMPERATURE
             )
             
-            content = response
+            if not data:
+                raise ValueError("Could not obtain image prompt from response")
             
-            # Parse the JSON response
-            try:
-                # Check if response is in a code block
-                if "```json" in content:
-                    content = content.split("```json")[1].split("```")[0].strip()
-                elif "```" in content:
-                    content = content.split("```")[1].split("```")[0].strip()
-                
-                data = json.loads(content)
-                return {
-                    "image_prompt": data.get("image_prompt", ""),
-                    "image_description": data.get("image_description", "")
-                }
-            except (json.JSONDecodeError, KeyError):
-                # Fallback: extract the prompt in a more forgiving way
-                lines = content.split('\n')
-                image_prompt = ""
-                image_description = ""
-                
-                for line in lines:
-                    if "image prompt:" in line.lower():
-                        image_prompt = line.split(":", 1)[1].strip()
-                    elif "description:" in line.lower() or "caption:" in line.lower():
-                        image_description = line.split(":", 1)[1].strip()
-                
-                return {
-                    "image_prompt": image_prompt or f"A conceptual illustration of {title}",
-                    "image_description": image_description or f"Illustration of {title}"
-                }
+            return {
+                "image_prompt": data["image_prompt"],
+                "image_description": data["image_description"]
+            }
                 
         except Exception as e:
             logger.error(f"Error generating image prompt: {str(e)}")
@@ -79,40 +88,206 @@ class ImageGeneratorAgent:
                 "image_description": f"Conceptual visualization of {title}"
             }
     
-    def generate_image(self, image_prompt: str) -> Dict[str, Any]:
+    def _image_parameters(self, quality_tier: str) -> Dict[str, Any]:
         """
-        Generate an image using Stable Diffusion via Hugging Face API.
+        Return the generation parameters for a quality tier. Lower quality tiers generate
+        at a lower resolution with fewer steps and upscale the result to IMAGE_SIZE locally.
         """
-        try:
-            # Ensure output directory exists
+        tier = IMAGE_QUALITY_TIERS[quality_tier]
+        width, height = generation_size(IMAGE_SIZE, tier["scale"])
+        return {
+            # Set a negative prompt to avoid common issues
+            "negative_prompt": "low quality, blurry, distorted, deformed, disfigured, bad anatomy, text, watermark, signature, multiple faces",
+            "width": width,
+            "height": height,
+            "num_inference_steps": tier["steps"],
+            "guidance_scale": 7.5,
+            "output_size": IMAGE_SIZE,
+            "sharpen": tier["sharpen"]
+        }
+    
+    def start_image_job(self, image_prompt: str, quality_tier: str = IMAGE_QUALITY_TIER, seed: Optional[int] = None) -> ImageJob:
+        """
+        Start generating an image in the background.
+        
+        The job waits out cold model starts until IMAGE_JOB_DEADLINE; await it with
+        wait_for_image.
+        """
+        parameters = self._image_parameters(quality_tier)
+        
+        # Ensure output directory exists
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        
+        logger.info(f"Generating image with prompt: {image_prompt[:100]}...")
+        
+        # Generate and save the image, reusing a cached one for identical parameters
+        return ImageJob(lambda: self.sd_client.generate_image_file(prompt=image_prompt, seed=seed, **parameters))
+    
+    def start_image_candidates(self,
+                               image_prompt: str,
+                               count: int = IMAGE_CANDIDATES,
+                               quality_tier: str = IMAGE_QUALITY_TIER) -> List[ImageJob]:
+        """
+        Start generating several candidate images in the background.
+        
+        Candidates use different seeds derived from the prompt, so the same prompt
+        gives the same candidates (and cache hits) again. Backends that render a batch
+        in one call get a single job; otherwise every candidate is a concurrent job.
+        Await them with wait_for_best_image.
+        """
+        count = self.sd_client.max_candidates(count)
+        if count <= 1:
+            return [self.start_image_job(image_prompt, quality_tier)]
+            
+        digest = hashlib.sha256(image_prompt.encode('utf-8')).digest()
+        seeds = [int.from_bytes(digest[i * 4:(i + 1) * 4], "big") for i in range(count)]
+        logger.info(f"Generating {count} image candidates with prompt: {image_prompt[:100]}...")
+        
+        if self.sd_client.supports_batch:
+            parameters = self._image_parameters(quality_tier)
             os.makedirs(OUTPUT_DIR, exist_ok=True)
+            return [ImageJob(lambda: self.sd_client.generate_image_files(image_prompt, seeds, **parameters))]
             
-            # Set a negative prompt to avoid common issues
-            negative_prompt = "low quality, blurry, distorted, deformed, disfigured, bad anatomy, text, watermark, signature, multiple faces"
-            
-            logger.info(f"Generating image with prompt: {image_prompt[:100]}...")
-            
-            # Generate the image using the API
-            image = self.sd_client.generate_image(
-                prompt=image_prompt,
-                negative_prompt=negative_prompt,
-                width=IMAGE_SIZE[0],
-                height=IMAGE_SIZE[1],
-                num_inference_steps=30,
-                guidance_scale=7.5
-            )
+        return [self.start_image_job(image_prompt, quality_tier, seed) for seed in seeds]
+    
+    def wait_for_best_image(self,
+                            jobs: List[ImageJob],
+                            title: str = "",
+                            keywords: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Wait for candidate image jobs and return the best image by local scoring,
+        falling back to a placeholder image if none succeeds or every candidate
+        scores 0 (blank, noise or text).
+        
+        Once the first candidate is ready the others get IMAGE_CANDIDATE_GRACE more
+        seconds, so the wall time stays close to that of a single image. Rejected
+        candidates, and those that finish after they were given up on, are removed
+        from the output directory; the image cache keeps them.
+        """
+        def discard_late(result: Any) -> None:
+            logger.info("Discarding image candidate that finished after the grace period")
+            self.discard_images(self._flatten_images([result]))
             
-            # Save the image
-            image_filename = f"blog_image_{os.urandom(4).hex()}.png"
+        try:
+            results = gather_jobs(jobs, IMAGE_CANDIDATE_GRACE, on_late_result=discard_late)
+        except Exception as e:
+            logger.error(f"Error generating image: {str(e)}")
+            return {**self.create_placeholder_image(title, keywords), "error": str(e)}
             
-            # Save the image and get path information
-            image_data = self.sd_client.save_image(image, image_filename)
+        candidates = self._flatten_images(results)
             
-            return image_data
+        try:
+            best_index, scores = pick_best_image([candidate["full_path"] for candidate in candidates])
+        except Exception as e:
+            logger.error(f"Error scoring image candidates: {str(e)}")
+            return candidates[0]
+            
+        for i, candidate_scores in enumerate(scores):
+            logger.info(f"Image candidate {i+1} ({candidates[i]['image_filename']}): {candidate_scores}")
+            
+        if scores[best_index]["total"] <= 0:
+            logger.warning("No usable image candidate, using a placeholder image")
+            self.discard_images(candidates)
+            return {**self.create_placeholder_image(title, keywords), "candidate_scores": scores}
             
+        logger.info(f"Selected image candidate {best_index+1}")
+        self.discard_images(candidates[:best_index] + candidates[best_index + 1:], keep=candidates[best_index])
+        
+        return {
+            **candidates[best_index],
+            "candidate_scores": scores,
+            "selected_candidate": best_index
+        }
+    
+    @staticmethod
+    def _flatten_images(results: List[Any]) -> List[Dict[str, Any]]:
+        # Batched jobs return a list of images
+        return [image for result in results for image in (result if isinstance(result, list) else [result])]
+    
+    def discard_images(self, images: List[Dict[str, Any]], keep: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Remove unused generated images from the output directory.
+        
+        Only files generated by this request are removed. Output file names are
+        derived from the cache key, so images taken from the cache, or handed out
+        by the cache since they were generated, may be used by other posts and stay.
+        
+        Args:
+            images: Image path information of the images to remove
+            keep: An image whose file must stay, in case another image shares its path
+        """
+        keep_path = os.path.abspath(keep["full_path"]) if keep else None
+        cache = getattr(self.sd_client, "cache", None)
+        for image in images:
+            path = image.get("full_path")
+            if not path or image.get("cached", True) or os.path.abspath(path) == keep_path:
+                continue
+            if cache and image.get("cache_key") and cache.was_reused(image["cache_key"]):
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove image candidate {path}: {str(e)}")
+    
+    def wait_for_image(self, job: ImageJob, title: str = "", keywords: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Wait for an image job, falling back to a placeholder image if it fails or
+        misses its deadline.
+        """
+        try:
+            return job.result()
         except Exception as e:
             logger.error(f"Error generating image: {str(e)}")
-            return {"error": str(e)}
+            return {**self.create_placeholder_image(title, keywords), "error": str(e)}
+    
+    def generate_image(self, image_prompt: str, title: str = "", keywords: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Generate an image using Stable Diffusion via Hugging Face API, picking the
+        best of IMAGE_CANDIDATES candidates.
+        """
+        try:
+            jobs = self.start_image_candidates(image_prompt)
+        except Exception as e:
+            logger.error(f"Error generating image: {str(e)}")
+            return {**self.create_placeholder_image(title, keywords), "error": str(e)}
+            
+        return self.wait_for_best_image(jobs, title, keywords)
+            
+    def create_placeholder_image(self, title: str, keywords: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Create a deterministic placeholder hero image to use when no image could be generated.
+        """
+        try:
+            return save_placeholder_image(title, keywords)
+            
+        except Exception as e:
+            logger.error(f"Error creating placeholder image: {str(e)}")
+            return {}
+    
+    def create_image_variants(self, image_path: str) -> Dict[str, Any]:
+        """
+        Write the responsive copies of an image used by the HTML page, plus a thumbnail.
+        
+        Returns:
+            The variants from create_responsive_variants, or an empty dictionary on failure
+        """
+        if not image_path:
+            return {}
+            
+        try:
+            return create_responsive_variants(
+                os.path.join(OUTPUT_DIR, os.path.basename(image_path)),
+                OUTPUT_DIR,
+                widths=IMAGE_VARIANT_WIDTHS,
+                formats=IMAGE_VARIANT_FORMATS,
+                quality=IMAGE_VARIANT_QUALITY,
+                thumbnail_size=IMAGE_THUMBNAIL_SIZE
+            )
+        except Exception as e:
+            logger.error(f"Error creating image variants: {str(e)}")
+            return {}
     
     def process_content_for_image(self, content_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -127,7 +302,8 @@ class ImageGeneratorAgent:
         image_description = prompt_data.get("image_description", "")
         
         # Generate the image
-        image_data = self.generate_image(image_prompt)
+        image_data = self.generate_image(image_prompt, title, content_data.get("keywords"))
+        image_variants = self.create_image_variants(image_data.get("image_path", ""))
         
         # Add image information to content data
         return {
@@ -135,5 +311,96 @@ class ImageGeneratorAgent:
             "image_prompt": image_prompt,
             "image_description": image_description,
             "image_path": image_data.get("image_path", ""),
-            "image_filename": image_data.get("image_filename", "")
-        }
\ No newline at end of file
+            "image_filename": image_data.get("image_filename", ""),
+            "image_placeholder": image_data.get("placeholder", False),
+            "image_variants": image_variants
+        }
+    
+    def generate_draft_image(self, content_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generate the image for a draft, before the content is refined.
+        
+        Returns:
+            The draft title and the image fields, to be passed to attach_image
+        """
+        draft = {"title": content_data.get("title", "AI Technology"), "content": content_data.get("content", "")}
+        image_data = self.process_content_for_image(draft)
+        return {"title": draft["title"], **{field: image_data.get(field, "") for field in IMAGE_FIELDS}}
+    
+    def start_image_generation(self, content_data: Dict[str, Any]) -> Future:
+        """
+        Start generating the image for a draft in the background, so it runs while
+        the content is being refined.
+        
+        Returns:
+            A future resolving to the result of generate_draft_image
+        """
+        logger.info(f"Starting background image generation for draft: {content_data.get('title', '')}")
+        return self._executor.submit(self.generate_draft_image, content_data)
+    
+    def attach_image(self, content_data: Dict[str, Any], draft_image: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Add an image generated from an earlier draft to the final content.
+        
+        The image is regenerated from the final content if the final title is too
+        different from the draft title it was made for. If the draft has no image,
+        or only a placeholder, the content gets a placeholder right away and
+        "image_pending" is set, so it can be published without waiting; see
+        regenerate_image.
+        
+        Args:
+            content_data: The final content
+            draft_image: Result of the background image job (see start_image_generation)
+        """
+        if not draft_image or not draft_image.get("image_path") or draft_image.get("image_placeholder"):
+            logger.info("No image from the draft, publishing with a placeholder until one is generated")
+            placeholder = self.create_placeholder_image(content_data.get("title", "AI Technology"), content_data.get("keywords"))
+            return {
+                **content_data,
+                "image_prompt": "",
+                "image_description": (draft_image or {}).get("image_description", ""),
+                "image_path": placeholder.get("image_path", ""),
+                "image_filename": placeholder.get("image_filename", ""),
+                "image_placeholder": True,
+                "image_variants": {},
+                "image_pending": True
+            }
+            
+        title = content_data.get("title", "AI Technology")
+        if title.startswith("Title:"):
+            title = title[6:].strip()
+        similarity = topic_similarity(fingerprint_topic({"title": title}), fingerprint_topic({"title": draft_image.get("title", "")}))
+        if similarity < IMAGE_TITLE_SIMILARITY_THRESHOLD:
+            logger.info(f"Title changed from '{draft_image.get('title', '')}' to '{title}' (similarity {similarity:.2f}), regenerating image")
+            return self.process_content_for_image(content_data)
+            
+        return {**content_data, **{field: draft_image.get(field, "") for field in IMAGE_FIELDS}}
+
+    def regenerate_image(self,
+                         content_data: Dict[str, Any],
+                         on_image: Callable[[Dict[str, Any]], None]) -> Future:
+        """
+        Generate the image for content published with a placeholder, in the background.
+        
+        Args:
+            content_data: The final content returned by attach_image
+            on_image: Called with the content and its generated image, e.g. to re-save
+                      the published HTML; not called if only a placeholder could be made
+                      
+        Returns:
+            A future resolving to the content with its new image fields
+        """
+        def run() -> Dict[str, Any]:
+            final_content = self.process_content_for_image({key: value for key, value in content_data.items() if key != "image_pending"})
+            if final_content.get("image_placeholder"):
+                logger.warning("No image could be generated, keeping the published placeholder")
+                return final_content
+                
+            try:
+                on_image(final_content)
+            except Exception as e:
+                logger.error(f"Error publishing the generated image: {str(e)}")
+            return final_content
+            
+        logger.info(f"Starting background image generation for: {content_data.get('title', '')}")
+        return self._executor.submit(run)
@@ -0,0 +1,65 @@
+"""
+Measure end-to-end image generation time (generation, upscaling and saving) per quality tier.
+
+Usage:
+    python benchmarks/image_quality_tiers.py --tiers full balanced draft --runs 2
+
+Uses the configured IMAGE_BACKEND with the image cache disabled, so every run
+generates a new image.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.stable_diffusion_client import StableDiffusionClient
+from utils.local_diffusion_client import LocalDiffusionClient
+from utils.image_processing import generation_size
+from config import IMAGE_BACKEND, IMAGE_SIZE, IMAGE_QUALITY_TIERS, STABLE_DIFFUSION_MODEL, HF_API_TOKEN
+
+DEFAULT_PROMPT = "A futuristic data center with glowing neural network connections, digital art, high detail"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image quality tiers")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT, help="Image prompt")
+    parser.add_argument("--tiers", nargs="+", default=list(IMAGE_QUALITY_TIERS), help="Tiers to measure")
+    parser.add_argument("--runs", type=int, default=1, help="Runs per tier")
+    args = parser.parse_args()
+    
+    if IMAGE_BACKEND == "local":
+        client = LocalDiffusionClient(use_cache=False)
+        # Keep the one-time pipeline load out of the measurements
+        client.warm_up()
+    else:
+        client = StableDiffusionClient(api_token=HF_API_TOKEN, use_cache=False)
+    client.set_model(STABLE_DIFFUSION_MODEL)
+    
+    results = {}
+    for tier_name in args.tiers:
+        tier = IMAGE_QUALITY_TIERS[tier_name]
+        width, height = generation_size(IMAGE_SIZE, tier["scale"])
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            client.generate_image_file(
+                prompt=args.prompt,
+                width=width,
+                height=height,
+                num_inference_steps=tier["steps"],
+                output_size=IMAGE_SIZE,
+                sharpen=tier["sharpen"]
+            )
+            timings.append(time.perf_counter() - started)
+        results[tier_name] = (width, height, tier["steps"], sum(timings) / len(timings))
+        
+    baseline = results.get("full", next(iter(results.values())))[3]
+    print(f"\n{'tier':<10} {'generated':>10} {'steps':>6} {'seconds':>9} {'speedup':>8}")
+    for tier_name, (width, height, steps, seconds) in results.items():
+        print(f"{tier_name:<10} {f'{width}x{height}':>10} {steps:>6} {seconds:>9.1f} {baseline / seconds:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
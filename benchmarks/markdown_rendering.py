@@ -0,0 +1,141 @@
+"""
+Compare the single-pass Markdown renderer with the regex implementation it replaced.
+
+Usage:
+    python benchmarks/markdown_rendering.py --sections 20 80 320 --runs 3
+
+Each document repeats a section with a heading, paragraphs with emphasis, and
+bulleted and numbered lists, so the number of lists grows with the document.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.markdown_renderer import render_markdown
+
+SECTION = """## Section {i}: Scaling **Agents** in Production
+
+Teams deploying *autonomous* agents in section {i} report that **latency** and cost
+dominate early decisions, while evaluation becomes the bottleneck later on.
+
+* Batch requests to amortize per-call overhead in section {i}
+* Cache **deterministic** tool results
+* Stream partial output to users
+
+### Lessons from section {i}
+
+1. Measure before optimizing
+2. Keep prompts *versioned* alongside code
+3. Fail over to a smaller model under load
+
+Closing thoughts for section {i}, with a final **bold** remark.
+"""
+
+
+def legacy_format_content(content: str) -> str:
+    """
+    The regex-based HtmlGenerator._format_content that render_markdown replaced.
+    """
+    # Format headings
+    content = re.sub(r'^# (.+)$', r'<h1>\1</h1>', content, flags=re.MULTILINE)
+    content = re.sub(r'^## (.+)$', r'<h2 class="section-heading">\1</h2>', content, flags=re.MULTILINE)
+    content = re.sub(r'^### (.+)$', r'<h3 class="sub-heading">\1</h3>', content, flags=re.MULTILINE)
+    content = re.sub(r'^#### (.+)$', r'<h4>\1</h4>', content, flags=re.MULTILINE)
+    
+    # Format bold and italic text
+    content = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', content)
+    content = re.sub(r'\*(.+?)\*', r'<em>\1</em>', content)
+    
+    # Format lists
+    # Unordered lists
+    unordered_list_pattern = r'(?:^|\n)(?:\* .+\n)+(?:\n|$)'
+    for match in re.finditer(unordered_list_pattern, content, re.MULTILINE):
+        list_items = re.findall(r'\* (.+)', match.group(0))
+        list_html = '<ul>\n' + '\n'.join([f'<li>{item}</li>' for item in list_items]) + '\n</ul>'
+        content = content.replace(match.group(0), list_html)
+        
+    # Ordered lists
+    ordered_list_pattern = r'(?:^|\n)(?:\d+\. .+\n)+(?:\n|$)'
+    for match in re.finditer(ordered_list_pattern, content, re.MULTILINE):
+        list_items = re.findall(r'\d+\. (.+)', match.group(0))
+        list_html = '<ol>\n' + '\n'.join([f'<li>{item}</li>' for item in list_items]) + '\n</ol>'
+        content = content.replace(match.group(0), list_html)
+        
+    # Format paragraphs (more robust approach)
+    paragraphs = []
+    current_paragraph = []
+    in_html_block = False
+    
+    for line in content.split('\n'):
+        # Skip if we're inside an HTML block (list, heading, etc.)
+        if line.strip().startswith('<') and not line.strip().startswith('<p>'):
+            # If we have a paragraph in progress, close it
+            if current_paragraph:
+                paragraphs.append('<p>' + ' '.join(current_paragraph) + '</p>')
+                current_paragraph = []
+                
+            # Add the HTML line directly
+            paragraphs.append(line)
+            
+            # Check if we're entering an HTML block
+            if not line.strip().endswith('>'):
+                in_html_block = True
+                
+        # Check if we're exiting an HTML block
+        elif in_html_block and line.strip().endswith('>'):
+            paragraphs.append(line)
+            in_html_block = False
+            
+        # If we're in an HTML block, add the line as is
+        elif in_html_block:
+            paragraphs.append(line)
+            
+        # Handle regular paragraph text
+        elif line.strip():
+            current_paragraph.append(line.strip())
+            
+        # Handle paragraph breaks
+        elif current_paragraph:
+            paragraphs.append('<p>' + ' '.join(current_paragraph) + '</p>')
+            current_paragraph = []
+            
+    # Add the last paragraph if exists
+    if current_paragraph:
+        paragraphs.append('<p>' + ' '.join(current_paragraph) + '</p>')
+        
+    return '\n'.join(paragraphs)
+
+
+def make_document(sections: int) -> str:
+    return "\n".join(SECTION.format(i=i) for i in range(sections))
+
+
+def best_time(fn, content: str, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(content)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Markdown to HTML rendering")
+    parser.add_argument("--sections", type=int, nargs="+", default=[20, 80, 320], help="Document sizes in sections")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per size (the best is reported)")
+    args = parser.parse_args()
+    
+    print(f"\n{'sections':>8} {'KB':>7} {'legacy ms':>10} {'single-pass ms':>15} {'speedup':>8}")
+    for sections in args.sections:
+        content = make_document(sections)
+        legacy = best_time(legacy_format_content, content, args.runs)
+        single_pass = best_time(render_markdown, content, args.runs)
+        print(f"{sections:>8} {len(content) / 1024:>7.0f} {legacy * 1000:>10.1f} {single_pass * 1000:>15.1f} {legacy / single_pass:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
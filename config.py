@@ -20,20 +20,89 @@ MAX_TOKENS = 4096
 # Web scraping settings
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 REQUEST_TIMEOUT = 40  # seconds
+HTML_PARSER_WORKERS = min(4, os.cpu_count() or 1)  # Worker processes for HTML parsing (0 = parse inline); a search scrapes only a few pages
+
+# Speculative research prefetch settings
+RESEARCH_PREFETCH_ENABLED = True  # research shown topics while the user is choosing
+RESEARCH_PREFETCH_WORKERS = 2  # concurrent speculative research jobs
+RESEARCH_PREFETCH_BUDGET = 5  # max speculative research jobs (web searches) queued or running at once
+RESEARCH_PREFETCH_TTL = 60 * 60  # seconds a prefetched result stays usable
 
 # Content generation settings
-MAX_ITERATIONS = 4
+MAX_ITERATIONS = 4  # upper bound on critique passes
+REFINEMENT_SCORE_TARGET = 8.5  # stop refining once the average critique score (1-10) reaches this
+REFINEMENT_MIN_SCORE_GAIN = 0.25  # stop when a refinement improves the score by less than this
+REFINEMENT_MIN_CHANGE = 0.05  # stop when a refinement changes less than this fraction of the words
+REFINEMENT_MODE = "sections"  # "sections" (refine flagged sections only), "edits" (targeted edit scripts) or "full" (rewrite the whole article)
+SECTION_REFINEMENT_WORKERS = 4  # flagged sections refined in parallel
+CRITIQUE_MODE = "aspects"  # "aspects" (parallel per-aspect critiques) or "single" (one combined critique)
+CRITIQUE_ASPECT_MODEL_ID = None  # optional smaller model for aspect critiques, e.g. "anthropic.claude-3-haiku-20240307-v1:0"
 BLOG_POST_LENGTH = 1200  # words
+CONTENT_GENERATION_MODE = "single"  # "single" (one completion) or "sections" (outline, then sections in parallel)
+SECTION_GENERATION_WORKERS = 6  # concurrent section completions in "sections" mode
+SECTION_RETRIES = 2  # extra attempts for a failed section
+DRAFT_CANDIDATES = 1  # drafts generated concurrently and scored locally (1 = single draft)
+DRAFT_CANDIDATE_VARIANTS = [  # temperature and editorial angle per candidate, reused in order
+    {"temperature": 0.7, "angle": ""},
+    {"temperature": 0.9, "angle": "Lead with a concrete real-world use case and build the explanation around it."},
+    {"temperature": 0.5, "angle": "Take a practitioner's perspective focused on how the technology works and how to apply it."},
+    {"temperature": 0.8, "angle": "Frame the post around the open challenges and where the field is heading next."}
+]
+
+# Progressive delivery settings
+PROGRESSIVE_DELIVERY = True  # publish a quick draft HTML first and replace it with the refined version
+DRAFT_MODEL_ID = None  # optional faster model for the quick draft, e.g. "anthropic.claude-3-haiku-20240307-v1:0"
 
 # Image generation settings
 STABLE_DIFFUSION_MODEL = "stabilityai/stable-diffusion-xl-base-1.0"
 HF_API_TOKEN = os.getenv("HF_API_TOKEN")  # Hugging Face API token
 IMAGE_SIZE = (1024, 1024)
+IMAGE_QUALITY_TIER = "full"  # "full", "balanced" or "draft", see IMAGE_QUALITY_TIERS
+IMAGE_QUALITY_TIERS = {  # generation resolution (fraction of IMAGE_SIZE) and steps; smaller images are upscaled locally
+    "full": {"scale": 1.0, "steps": 30, "sharpen": False},
+    "balanced": {"scale": 0.75, "steps": 25, "sharpen": True},
+    "draft": {"scale": 0.5, "steps": 20, "sharpen": True}
+}
+IMAGE_BACKEND = "api"  # "api" (Hugging Face Inference API) or "local" (diffusers pipeline in this process)
+LOCAL_DIFFUSION_DEVICE = None  # "cuda", "mps" or "cpu"; detected when None
+LOCAL_DIFFUSION_ATTENTION_SLICING = True  # lower peak memory at a small speed cost
+LOCAL_DIFFUSION_FAST_SCHEDULER = True  # DPM-Solver++ scheduler, good results in about 20 steps
+LOCAL_DIFFUSION_MAX_STEPS = 20  # cap on inference steps for the local backend
+LOCAL_DIFFUSION_CPU_MAX_SIZE = 512  # longest image side when running on CPU
+IMAGE_TITLE_SIMILARITY_THRESHOLD = 0.3  # regenerate an image made from the draft if the final title is less similar than this
+IMAGE_REQUEST_TIMEOUT = 120  # seconds per inference request
+IMAGE_WAIT_FOR_MODEL = False  # let the API hold the request while a cold model loads instead of returning 503
+IMAGE_CANDIDATES = 3  # images generated concurrently per post; the best one by local scoring is used (1 = single image)
+IMAGE_CANDIDATE_GRACE = 20  # seconds to wait for the other candidates once the first one is ready
+IMAGE_JOB_WORKERS = 4  # image jobs running at once, at least IMAGE_CANDIDATES
+IMAGE_JOB_DEADLINE = 300  # seconds an image job may take in total, including waiting for a cold model
+IMAGE_JOB_INITIAL_BACKOFF = 5  # seconds before retrying a loading model, doubled on every attempt
+IMAGE_JOB_MAX_BACKOFF = 60  # upper bound for the wait between attempts
+IMAGE_VARIANT_WIDTHS = [480, 768, 1024]  # widths of the responsive copies referenced by the HTML srcset
+IMAGE_VARIANT_FORMATS = ["avif", "webp"]  # written next to JPEG fallbacks when Pillow can encode them
+IMAGE_VARIANT_QUALITY = 80  # encoder quality of the responsive copies and the thumbnail
+IMAGE_THUMBNAIL_SIZE = (320, 320)  # bounding box of the preview thumbnail
 
 # HTML generation settings
 TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "utils", "templates")
+BLOG_THEME = "professional"  # theme directory under TEMPLATE_DIR ("professional" or "minimal")
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "outputs")
 
+# Local cache settings
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache")
+TOPIC_CACHE_PATH = os.path.join(CACHE_DIR, "trending_topics.json")
+TOPIC_REFRESH_INTERVAL = 6 * 60 * 60  # seconds between background topic refreshes
+IMAGE_CACHE_ENABLED = True  # reuse images generated with the same model and parameters
+IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, "images")
+IMAGE_CACHE_MAX_BYTES = 500 * 1024 * 1024  # least recently used images are evicted above this
+TEMPLATE_CACHE_DIR = os.path.join(CACHE_DIR, "templates")  # compiled Jinja2 template bytecode
+
+# Topic deduplication settings
+TOPIC_STORE_PATH = os.path.join(CACHE_DIR, "topic_store.json")
+DUPLICATE_SIMILARITY_THRESHOLD = 0.5  # 0-1, topics at or above this are flagged as duplicates
+DUPLICATE_LOOKBACK_DAYS = 90  # only compare against posts published in this window
+DROP_DUPLICATE_TOPICS = False  # drop flagged topics instead of only marking them
+
 # Validate required credentials
 def validate_credentials():
     missing_credentials = []
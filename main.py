@@ -32,6 +32,7 @@ def main():
     # Parse command line arguments
     parser = argparse.ArgumentParser(description="AI Content Generation Agent")
     parser.add_argument("--auto", action="store_true", help="Run in automatic mode without human interaction")
+    parser.add_argument("--refresh-topics", action="store_true", help="Discover fresh trending topics instead of using the cached snapshot")
     args = parser.parse_args()
     
     try:
@@ -44,13 +45,26 @@ def main():
         print("\nStarting the workflow...\n")
         
         # Run the workflow
-        results = workflow.run()
+        def on_draft(draft_path):
+            print(f"\nDraft published to: {draft_path} (the refined version will replace it)\n")
+            
+        results = workflow.run(refresh_topics=args.refresh_topics, on_draft=on_draft)
         
         # Print the results
         print("\n========== WORKFLOW COMPLETED ==========\n")
         print(f"Generated blog post: {results.get('title', '')}")
         print(f"Selected topic: {results.get('selected_topic', {}).get('title', '')}")
-        print(f"HTML output saved to: {results.get('html_path', '')}")
+        print(f"HTML output saved to: {results.get('html_path', '')} (version {results.get('html_version', 0)})")
+        
+        # The process would otherwise wait silently for the background image at exit
+        if results.get("image_update"):
+            print("\nThe post was published with a placeholder image. Waiting for the generated image...")
+            image_data = results["image_update"].result()
+            if image_data.get("image_placeholder"):
+                print("No image could be generated; the post keeps its placeholder image.")
+            else:
+                version = workflow.html_generator.read_version(results["html_path"])
+                print(f"Generated image added to: {results['html_path']} (version {version})")
         print("\nThank you for using the AI Content Generation Agent!")
         
     except Exception as e:
@@ -2,10 +2,10 @@ import os
 import sys
 import logging
 import streamlit as st # type: ignore
-import time
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 from io import BytesIO
-import base64
 from dotenv import load_dotenv # type: ignore
 
 # Page configuration must be the first Streamlit command
@@ -24,7 +24,8 @@ from agents.content_generator import ContentGeneratorAgent
 from agents.critique_refiner import CritiqueRefinerAgent
 from agents.image_generator import ImageGeneratorAgent
 from utils.html_generator import HtmlGenerator
-from config import validate_credentials, OUTPUT_DIR
+from utils.content_history import materialize_versions
+from config import validate_credentials, OUTPUT_DIR, MAX_ITERATIONS, PROGRESSIVE_DELIVERY
 
 # Fix encoding issues for logging on Windows
 import codecs
@@ -59,8 +60,11 @@ if missing_credentials:
 # Initialize agents
 @st.cache_resource
 def load_agents():
+    topic_agent = TopicDiscoveryAgent()
+    # Keep the trending topic snapshot warm so discovery is instant
+    topic_agent.start_topic_refresher()
     return {
-        "topic_agent": TopicDiscoveryAgent(),
+        "topic_agent": topic_agent,
         "content_agent": ContentGeneratorAgent(),
         "critique_agent": CritiqueRefinerAgent(),
         "image_agent": ImageGeneratorAgent(),
@@ -205,6 +209,8 @@ def display_topic_card(topic, index):
             st.markdown(f"<div class='topic-title'>{topic.get('title', 'Unnamed Topic')}</div>", unsafe_allow_html=True)
             st.markdown(f"<div class='topic-description'>{topic.get('description', 'No description available')}</div>", unsafe_allow_html=True)
             st.markdown(f"<div class='topic-trending'><strong>Why Trending:</strong> {topic.get('why_trending', 'No information available')}</div>", unsafe_allow_html=True)
+            if topic.get('is_duplicate'):
+                st.warning(f"Similar to past post '{topic.get('similar_post', '')}' ({topic.get('similarity', 0):.0%} match)")
             
             keywords = topic.get('keywords', [])
             keyword_html = ""
@@ -213,14 +219,37 @@ def display_topic_card(topic, index):
             st.markdown(f"<div>{keyword_html}</div>", unsafe_allow_html=True)
             st.markdown("</div>", unsafe_allow_html=True)
 
-# Helper function to view generated images
-def get_image_base64(image_path):
-    try:
-        with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode()
-    except Exception as e:
-        logger.error(f"Error reading image {image_path}: {str(e)}")
-        return ""
+# Helper functions to locate generated images
+def get_image_file(content_data):
+    filename = os.path.basename(content_data.get("image_path", ""))
+    return os.path.join(OUTPUT_DIR, filename) if filename else ""
+
+def get_preview_image(content_data):
+    # Preview the small thumbnail instead of sending the full-size image to the browser
+    thumbnail = (content_data.get("image_variants") or {}).get("thumbnail")
+    if thumbnail and os.path.exists(os.path.join(OUTPUT_DIR, thumbnail)):
+        return os.path.join(OUTPUT_DIR, thumbnail)
+    return get_image_file(content_data)
+
+# Helper function to replace a placeholder image in published HTML once the real image is ready
+def publish_pending_image(agents, final_content, html_path):
+    if not final_content.get("image_pending") or not html_path:
+        return False
+    
+    def on_image(content_with_image):
+        html_content = agents["html_generator"].generate_html(
+            title=content_with_image.get("title", "AI Technology"),
+            content=content_with_image.get("content", ""),
+            image_path=content_with_image.get("image_path", ""),
+            image_alt=content_with_image.get("image_description", ""),
+            image_caption=content_with_image.get("image_description", ""),
+            image_variants=content_with_image.get("image_variants"),
+            keywords=content_with_image.get("keywords")
+        )
+        agents["html_generator"].save_html(html_content, os.path.basename(html_path))
+        
+    agents["image_agent"].regenerate_image(final_content, on_image)
+    return True
 
 # Helper function to display logs in a nice format
 def display_log(message, log_type="info"):
@@ -246,10 +275,14 @@ def main():
         st.session_state.refined_content = None
     if 'refinement_history' not in st.session_state:
         st.session_state.refinement_history = []
+    if 'image_job' not in st.session_state:
+        st.session_state.image_job = None
     if 'final_content' not in st.session_state:
         st.session_state.final_content = None
     if 'html_output' not in st.session_state:
         st.session_state.html_output = None
+    if 'draft_html' not in st.session_state:
+        st.session_state.draft_html = None
     if 'logs' not in st.session_state:
         st.session_state.logs = []
     
@@ -288,8 +321,10 @@ def main():
             st.session_state.content = None
             st.session_state.refined_content = None
             st.session_state.refinement_history = []
+            st.session_state.image_job = None
             st.session_state.final_content = None
             st.session_state.html_output = None
+            st.session_state.draft_html = None
             st.session_state.logs = []
             st.rerun()
     
@@ -308,12 +343,22 @@ def main():
         
         st.markdown("<div class='info-box'><p>The AI agent will search the web for currently trending topics in artificial intelligence.</p></div>", unsafe_allow_html=True)
         
-        if st.button("Discover Trending Topics", key="discover_btn"):
+        snapshot = agents["topic_agent"].topic_cache.get_snapshot()
+        if snapshot:
+            st.caption(f"Cached topics v{snapshot['version']} from {snapshot['created_at']}")
+        
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            discover_clicked = st.button("Discover Trending Topics", key="discover_btn")
+        with col2:
+            refresh_clicked = st.button("Refresh Topics Now", key="refresh_topics_btn")
+        
+        if discover_clicked or refresh_clicked:
             with st.spinner("Searching for trending AI topics..."):
                 try:
                     add_log("Starting trending topic discovery...", "info")
                     
-                    st.session_state.topics = agents["topic_agent"].discover_trending_topics()
+                    st.session_state.topics = agents["topic_agent"].get_trending_topics(force_refresh=refresh_clicked)
                     
                     add_log(f"Successfully discovered {len(st.session_state.topics)} trending topics", "success")
                     st.session_state.stage = 'select'
@@ -329,6 +374,9 @@ def main():
         st.markdown("<div class='info-box'><p>Select a trending topic that you'd like to generate content for.</p></div>", unsafe_allow_html=True)
         
         if st.session_state.topics:
+            # Research the topics in the background while the user reads them
+            agents["topic_agent"].prefetch_research(st.session_state.topics)
+            
             for i, topic in enumerate(st.session_state.topics):
                 display_topic_card(topic, i+1)
                 if st.button(f"Select Topic {i+1}", key=f"select_topic_{i}"):
@@ -378,72 +426,67 @@ def main():
                         status_text.text("Generating initial blog post content...")
                         add_log("Generating initial blog content...", "info")
                         
-                        content_data = agents["content_agent"].generate_content(topic_data)
+                        if PROGRESSIVE_DELIVERY:
+                            # Publish a quick draft while the full content is generated; only the
+                            # full content is refined, and its refined version replaces the draft
+                            with ThreadPoolExecutor(max_workers=1) as executor:
+                                content_future = executor.submit(agents["content_agent"].generate_content, topic_data)
+                                draft_data = agents["content_agent"].generate_quick_draft(topic_data)
+                                
+                                draft_html = agents["html_generator"].generate_html(
+                                    title=draft_data.get("title", "AI Technology"),
+                                    content=draft_data.get("content", ""),
+                                    keywords=draft_data.get("keywords")
+                                )
+                                draft_path = agents["html_generator"].save_html(draft_html, stage="draft")
+                                st.session_state.draft_html = {"content": draft_html, "path": draft_path}
+                                add_log(f"Draft published: {draft_path}", "success")
+                                st.success(f"Draft published to {draft_path}. It will be replaced by the refined version.")
+                                st.download_button(
+                                    label="Download Draft HTML",
+                                    data=draft_html,
+                                    file_name=os.path.basename(draft_path),
+                                    mime="text/html",
+                                    key="draft_download"
+                                )
+                                
+                                content_data = content_future.result()
+                        else:
+                            content_data = agents["content_agent"].generate_content(topic_data)
                         st.session_state.content = content_data
                         
                         add_log(f"Initial content generated: '{content_data.get('title', '')}'", "success")
                         progress_bar.progress(0.30)
                         
+                        # Generate the image from the draft while the content is refined
+                        image_job = agents["image_agent"].start_image_generation(content_data)
+                        add_log("Started image generation in the background...", "info")
+                        
                         # 3. Refine content through iterations
                         status_text.text("Refining content through multiple iterations...")
                         add_log("Starting content refinement process...", "info")
                         
-                        # Initialize with original content
-                        current_content = content_data.get("content", "")
-                        title = content_data.get("title", "")
-                        refinement_history = []
-                        
-                        # Track iterations (maximum 4)
-                        for iteration in range(4):
-                            status_text.text(f"Iteration {iteration+1}/4: Generating critique...")
-                            add_log(f"Refinement iteration {iteration+1}/4: Generating critique...", "info")
-                            
-                            # Generate critique
-                            critique = agents["critique_agent"].critique_content(current_content)
-                            
-                            # Store the critique
-                            refinement_history.append({
-                                "iteration": iteration + 1,
-                                "critique": critique
-                            })
-                            
-                            progress_bar.progress(0.30 + (iteration * 0.05))
-                            
-                            # Skip refinement on the last iteration
-                            if iteration < 3:
-                                status_text.text(f"Iteration {iteration+1}/4: Refining content based on critique...")
-                                add_log(f"Refinement iteration {iteration+1}/4: Implementing improvements...", "info")
-                                
-                                # Refine content based on critique
-                                refined_content = agents["critique_agent"].refine_content(current_content, critique)
-                                
-                                # Update current content for next iteration
-                                current_content = refined_content
-                                
-                                # Store the refined content
-                                refinement_history[-1]["refined_content"] = refined_content
-                            
-                            progress_bar.progress(0.30 + (iteration * 0.05) + 0.025)
-                            time.sleep(0.2)  # Small delay for UI feedback
-                        final_content = agents["critique_agent"].finalize_content(current_content, title)
-                        # Store final refined content
-                        st.session_state.refined_content = {
-                            "topic": content_data.get("topic", {}),
-                            "title": title,
-                            "content": final_content,  # This is the final version
-                            "keywords": content_data.get("keywords", []),
-                            "refinement_history": refinement_history
-                        }
+                        # Refine until the content converges (at most MAX_ITERATIONS critiques)
+                        def on_refinement_step(iteration, step):
+                            if step == "finalize":
+                                status_text.text("Finalizing content formatting...")
+                                return
+                            status_text.text(f"Iteration {iteration}/{MAX_ITERATIONS}: {'Generating critique' if step == 'critique' else 'Refining content based on critique'}...")
+                            add_log(f"Refinement iteration {iteration}/{MAX_ITERATIONS}: {'Generating critique' if step == 'critique' else 'Implementing improvements'}...", "info")
+                            progress_bar.progress(0.30 + ((iteration - 1) * 2 + (step == "refine")) * 0.25 / (MAX_ITERATIONS * 2))
                         
-                        st.session_state.refinement_history = refinement_history
+                        refined_content = agents["critique_agent"].iterative_refinement(content_data, progress_callback=on_refinement_step)
+                        st.session_state.refined_content = refined_content
+                        st.session_state.refinement_history = refined_content["refinement_history"]
+                        add_log(f"Refinement stopped after {refined_content['iterations_used']} iterations ({refined_content['stop_reason']})", "info")
                         add_log("Content refinement completed", "success")
                         progress_bar.progress(0.60)
                         
-                        # 4. Generate image
-                        status_text.text("Generating image for the blog post...")
-                        add_log("Generating accompanying image...", "info")
+                        # 4. Wait for the image started from the draft
+                        status_text.text("Waiting for the blog post image...")
+                        add_log("Waiting for the accompanying image...", "info")
                         
-                        final_content = agents["image_agent"].process_content_for_image(st.session_state.refined_content)
+                        final_content = agents["image_agent"].attach_image(st.session_state.refined_content, image_job.result())
                         st.session_state.final_content = final_content
                         
                         add_log(f"Image generated: {final_content.get('image_filename', '')}", "success")
@@ -465,14 +508,22 @@ def main():
                             content=content,
                             image_path=image_path,
                             image_alt=image_description,
-                            image_caption=image_description
+                            image_caption=image_description,
+                            image_variants=final_content.get("image_variants")
                         )
                         
-                        html_path = agents["html_generator"].save_html(html_content)
+                        # Atomically replace the published draft, if there is one
+                        draft_path = (st.session_state.draft_html or {}).get("path", "")
+                        html_path = agents["html_generator"].save_html(html_content, os.path.basename(draft_path) if draft_path else None)
+                        agents["topic_agent"].record_published_post(selected_topic, title, html_path)
                         st.session_state.html_output = {
                             "content": html_content,
-                            "path": html_path
+                            "path": html_path,
+                            "version": agents["html_generator"].read_version(html_path) if html_path else 0,
+                            "draft_path": draft_path
                         }
+                        if publish_pending_image(agents, final_content, html_path):
+                            add_log("Published with a placeholder image; the generated image will replace it when ready", "info")
                         
                         add_log(f"HTML blog post created: {html_path}", "success")
                         progress_bar.progress(1.0)
@@ -528,7 +579,7 @@ def main():
         st.markdown("<h2 class='section-header'>Content Refinement</h2>", unsafe_allow_html=True)
         
         if not st.session_state.refined_content:
-            st.markdown("<div class='info-box'><p>The AI will now refine the content through 4 iterations of self-critique and improvement.</p></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='info-box'><p>The AI will now refine the content through up to {MAX_ITERATIONS} iterations of self-critique and improvement, stopping early once it converges.</p></div>", unsafe_allow_html=True)
             
             if st.button("Start Refinement Process", key="refine_btn"):
                 with st.spinner("Refining content through multiple iterations..."):
@@ -538,56 +589,26 @@ def main():
                     try:
                         add_log("Starting content refinement process...", "info")
                         
-                        # Initialize with original content
                         content_data = st.session_state.content
-                        current_content = content_data.get("content", "")
-                        title = content_data.get("title", "")
-                        refinement_history = []
                         
-                        # Track iterations (maximum 4)
-                        for iteration in range(4):
-                            status_text.text(f"Iteration {iteration+1}/4: Generating critique...")
-                            add_log(f"Refinement iteration {iteration+1}/4: Generating critique...", "info")
-                            
-                            # Generate critique
-                            critique = agents["critique_agent"].critique_content(current_content)
-                            
-                            # Store the critique
-                            refinement_history.append({
-                                "iteration": iteration + 1,
-                                "critique": critique
-                            })
+                        # Generate the image from the draft while the content is refined
+                        if st.session_state.image_job is None:
+                            st.session_state.image_job = agents["image_agent"].start_image_generation(content_data)
                             
-                            progress_bar.progress((iteration * 2 + 1) / 8)
+                        # Refine until the content converges (at most MAX_ITERATIONS critiques)
+                        def on_refinement_step(iteration, step):
+                            if step == "finalize":
+                                status_text.text("Finalizing content formatting...")
+                                progress_bar.progress(0.95)
+                                return
+                            status_text.text(f"Iteration {iteration}/{MAX_ITERATIONS}: {'Generating critique' if step == 'critique' else 'Refining content based on critique'}...")
+                            add_log(f"Refinement iteration {iteration}/{MAX_ITERATIONS}: {'Generating critique' if step == 'critique' else 'Implementing improvements'}...", "info")
+                            progress_bar.progress(((iteration - 1) * 2 + (step == "refine")) / (MAX_ITERATIONS * 2))
                             
-                            # Skip refinement on the last iteration
-                            if iteration < 3:
-                                status_text.text(f"Iteration {iteration+1}/4: Refining content based on critique...")
-                                add_log(f"Refinement iteration {iteration+1}/4: Implementing improvements...", "info")
-                                
-                                # Refine content based on critique
-                                refined_content = agents["critique_agent"].refine_content(current_content, critique)
-                                
-                                # Update current content for next iteration
-                                current_content = refined_content
-                                
-                                # Store the refined content
-                                refinement_history[-1]["refined_content"] = refined_content
-                            
-                            progress_bar.progress((iteration * 2 + 2) / 8)
-                            time.sleep(0.2)  # Small delay for UI feedback
-                        # Perform final formatting before returning
-                        final_content = agents["critique_agent"].finalize_content(current_content, title)
-                        # Store final results
-                        st.session_state.refined_content = {
-                            "topic": content_data.get("topic", {}),
-                            "title": title,
-                            "content": final_content,  # This is the final version
-                            "keywords": content_data.get("keywords", []),
-                            "refinement_history": refinement_history
-                        }
-                        
-                        st.session_state.refinement_history = refinement_history
+                        refined_content = agents["critique_agent"].iterative_refinement(content_data, progress_callback=on_refinement_step)
+                        st.session_state.refined_content = refined_content
+                        st.session_state.refinement_history = refined_content["refinement_history"]
+                        add_log(f"Refinement stopped after {refined_content['iterations_used']} iterations ({refined_content['stop_reason']})", "info")
                         add_log("Content refinement completed", "success")
                         st.session_state.stage = 'visualize'
                         st.rerun()
@@ -599,6 +620,9 @@ def main():
         else:
             # Display refinement iterations
             st.markdown("<div class='info-box'><p>Content has been refined through multiple iterations. Review the process below.</p></div>", unsafe_allow_html=True)
+            refined = st.session_state.refined_content
+            if "stop_reason" in refined:
+                st.caption(f"Stopped after {refined['iterations_used']} of {MAX_ITERATIONS} iterations: {refined['stop_reason'].replace('_', ' ')}")
             
             tabs = st.tabs(["Original"] + [f"Iteration {i+1}" for i in range(len(st.session_state.refinement_history))])
             
@@ -607,17 +631,22 @@ def main():
                 st.markdown(f"<h3>{st.session_state.content.get('title', '')}</h3>", unsafe_allow_html=True)
                 st.markdown(st.session_state.content.get('content', ''), unsafe_allow_html=True)
             
+            # Rebuild each refined version from the stored deltas
+            versions = materialize_versions(st.session_state.content.get('content', ''), st.session_state.refinement_history)
+            
             # Show each iteration
             for i, iteration in enumerate(st.session_state.refinement_history):
                 with tabs[i+1]:
                     st.markdown("<div class='critique-box'>", unsafe_allow_html=True)
                     st.markdown("### Critique")
+                    if iteration.get("score") is not None:
+                        st.markdown(f"**Score:** {iteration['score']}/10")
                     st.markdown(iteration.get("critique", ""))
                     st.markdown("</div>", unsafe_allow_html=True)
                     
-                    if "refined_content" in iteration:
+                    if "delta" in iteration:
                         st.markdown("### Refined Content")
-                        st.markdown(iteration.get("refined_content", ""))
+                        st.markdown(versions[i])
                     else:
                         st.info("This was the final critique iteration.")
             
@@ -635,7 +664,10 @@ def main():
                 with st.spinner("Creating image for your content..."):
                     try:
                         add_log("Generating image for blog post...", "info")
-                        final_content = agents["image_agent"].process_content_for_image(st.session_state.refined_content)
+                        if st.session_state.image_job is not None:
+                            final_content = agents["image_agent"].attach_image(st.session_state.refined_content, st.session_state.image_job.result())
+                        else:
+                            final_content = agents["image_agent"].process_content_for_image(st.session_state.refined_content)
                         st.session_state.final_content = final_content
                         
                         add_log(f"Image generated: {final_content.get('image_filename', '')}", "success")
@@ -674,14 +706,18 @@ def main():
                     content=content,
                     image_path=image_path.split("/")[-1],
                     image_alt=image_description,
-                    image_caption=image_description
+                    image_caption=image_description,
+                    image_variants=final_content.get("image_variants")
                 )
                 
                 html_path = agents["html_generator"].save_html(html_content)
+                agents["topic_agent"].record_published_post(st.session_state.selected_topic or {}, title, html_path)
                 st.session_state.html_output = {
                     "content": html_content,
                     "path": html_path
                 }
+                if publish_pending_image(agents, final_content, html_path):
+                    add_log("Published with a placeholder image; the generated image will replace it when ready", "info")
                 
                 add_log(f"HTML blog post created: {html_path}", "success")
             except Exception as e:
@@ -689,6 +725,12 @@ def main():
                 st.error(f"Error generating HTML: {str(e)}")
                 logger.error(f"Error generating HTML: {str(e)}", exc_info=True)
         
+        html_output = st.session_state.html_output or {}
+        if html_output.get("draft_path"):
+            st.caption(f"Version {html_output.get('version', 0)} of {os.path.basename(html_output['path'])}, replacing the draft published earlier")
+        if final_content.get("image_pending"):
+            st.info("The post was published with a placeholder image. The generated image replaces it in the HTML file when it is ready.")
+            
         # Display the final content with image
         st.markdown("<div class='final-content'>", unsafe_allow_html=True)
         
@@ -696,9 +738,9 @@ def main():
         st.markdown(f"<h1>{final_content.get('title', '')}</h1>", unsafe_allow_html=True)
         
         # Image with caption
-        image_path = "E:/Work/ai_content_generator" + final_content.get("image_path", "")[1:]
+        image_path = get_image_file(final_content)
         if image_path and os.path.exists(image_path):
-            st.image(image_path, caption=final_content.get("image_description", ""), width=300)  
+            st.image(get_preview_image(final_content), caption=final_content.get("image_description", ""), width=300)
         else:
             st.warning(f"Image not found at path: {image_path}")
             add_log(f"Image not found at path: {image_path}", "error")
@@ -738,7 +780,7 @@ def main():
                         label="Download Featured Image",
                         data=image_bytes,
                         file_name=os.path.basename(image_path),
-                        mime="image/png"
+                        mime=mimetypes.guess_type(image_path)[0] or "application/octet-stream"
                     )
                 except Exception as e:
                     st.error(f"Error preparing image download: {str(e)}")
@@ -753,8 +795,10 @@ def main():
             st.session_state.content = None
             st.session_state.refined_content = None
             st.session_state.refinement_history = []
+            st.session_state.image_job = None
             st.session_state.final_content = None
             st.session_state.html_output = None
+            st.session_state.draft_html = None
             # Keep the logs
             st.rerun()
         st.markdown("</div>", unsafe_allow_html=True)
@@ -0,0 +1,63 @@
+from utils.article_sections import (split_sections, join_sections, locate_section, map_findings_to_sections,
+                                    replace_section_body, changed_sections)
+
+CONTENT = """# The Title
+
+Opening paragraph.
+
+## Key Challenges Ahead
+
+Challenges text mentions a very specific quoted passage here.
+
+## Getting Started
+
+Start text.
+"""
+
+
+def test_split_sections_round_trips_byte_for_byte():
+    sections = split_sections(CONTENT)
+    assert [s["heading"] for s in sections] == ["", "Key Challenges Ahead", "Getting Started"]
+    assert join_sections(sections) == CONTENT
+    assert len({s["hash"] for s in sections}) == 3
+
+
+def test_locate_section_by_heading_opening_partial_and_passage():
+    sections = split_sections(CONTENT)
+    assert locate_section("Getting Started", sections) == 2
+    assert locate_section("## Key Challenges Ahead", sections) == 1
+    assert locate_section("introduction", sections) == 0
+    assert locate_section("the challenges section", sections) == 1
+    assert locate_section("\"a very specific quoted passage here\"", sections) == 1
+    assert locate_section("whole post", sections) == -1
+    assert locate_section("", sections) == -1
+
+
+def test_map_findings_to_sections():
+    sections = split_sections(CONTENT)
+    findings = [
+        {"issue": "a", "location": "Getting Started"},
+        {"issue": "b", "location": "whole post"},
+        {"issue": "c"},
+        {"issue": "d", "location": "getting started"}
+    ]
+    flagged, unlocated = map_findings_to_sections(findings, sections)
+    assert [f["issue"] for f in flagged[2]] == ["a", "d"]
+    assert [f["issue"] for f in unlocated] == ["b", "c"]
+
+
+def test_replace_section_body_keeps_heading_and_spacing():
+    section = split_sections(CONTENT)[1]
+    text = replace_section_body(section, "## Key Challenges Ahead\n\nNew text.\n\n# Too High\n\nMore.")
+    assert text == "## Key Challenges Ahead\n\nNew text.\n\n### Too High\n\nMore.\n\n"
+
+
+def test_replace_opening_section_keeps_title():
+    section = split_sections(CONTENT)[0]
+    assert replace_section_body(section, "New opening.") == "# The Title\n\nNew opening.\n\n"
+
+
+def test_changed_sections():
+    new_content = CONTENT.replace("Start text.", "Better start text.")
+    assert changed_sections(CONTENT, new_content) == ["Getting Started"]
+    assert changed_sections(CONTENT, CONTENT) == []
@@ -0,0 +1,41 @@
+import json
+import pytest
+from utils.content_history import make_delta, apply_delta, materialize_versions
+
+OLD = "# Title\n\nIntro.\n\n## Part\n\nBody text.\n"
+NEW = "# Title\n\nA better intro.\n\n## Part\n\nBody text.\n\n## Added\n\nMore.\n"
+
+
+def test_delta_round_trips():
+    assert apply_delta(OLD, make_delta(OLD, NEW)) == NEW
+    assert apply_delta(NEW, make_delta(NEW, OLD)) == OLD
+
+
+def test_delta_stores_unchanged_lines_as_counts():
+    delta = make_delta(OLD, NEW)
+    assert json.loads(json.dumps(delta)) == delta
+    inserted = [line for op, value in delta if op == "+" for line in value]
+    assert "Body text.\n" not in inserted
+    assert "A better intro.\n" in inserted
+
+
+def test_empty_delta_for_identical_text():
+    assert apply_delta(OLD, make_delta(OLD, OLD)) == OLD
+    assert all(op == "=" for op, _ in make_delta(OLD, OLD))
+
+
+def test_apply_delta_rejects_mismatched_base():
+    with pytest.raises(ValueError):
+        apply_delta("short\n", make_delta(OLD, NEW))
+    with pytest.raises(ValueError):
+        apply_delta(OLD, [["?", 1]])
+
+
+def test_materialize_versions_rebuilds_each_iteration():
+    third = NEW.replace("More.", "Even more.")
+    history = [
+        {"critique": "1", "delta": make_delta(OLD, NEW)},
+        {"critique": "2", "delta": make_delta(NEW, third)},
+        {"critique": "final"}
+    ]
+    assert materialize_versions(OLD, history) == [NEW, third, ""]
@@ -0,0 +1,63 @@
+import pytest
+from utils.edit_script import split_blocks, number_blocks, apply_edits, EditScriptError
+
+CONTENT = """# Title
+
+First paragraph about agents.
+
+Second paragraph about costs.
+
+* one
+* two
+"""
+
+
+def test_split_blocks_separates_paragraphs_headings_and_lists():
+    assert split_blocks(CONTENT) == [
+        "# Title",
+        "First paragraph about agents.",
+        "Second paragraph about costs.",
+        "* one\n* two"
+    ]
+
+
+def test_number_blocks_adds_anchors():
+    assert number_blocks(["a", "b"]) == "[P1] a\n\n[P2] b"
+
+
+def test_apply_edits_uses_original_numbering():
+    blocks = split_blocks(CONTENT)
+    edited = apply_edits(blocks, [
+        {"op": "delete", "paragraph": 2},
+        {"op": "search_replace", "paragraph": 3, "search": "costs", "replace": "latency"},
+        {"op": "insert_after", "paragraph": 3, "text": "A new paragraph."},
+        {"op": "insert_after", "paragraph": 0, "text": "Lead."}
+    ])
+    assert edited.split("\n\n") == [
+        "Lead.",
+        "# Title",
+        "Second paragraph about latency.",
+        "A new paragraph.",
+        "* one\n* two"
+    ]
+
+
+def test_apply_edits_replace_paragraph():
+    assert apply_edits(["a", "b"], [{"op": "replace", "paragraph": 2, "text": " c "}]) == "a\n\nc"
+
+
+@pytest.mark.parametrize("edits, message", [
+    ([{"op": "rewrite", "paragraph": 1}], "Unknown edit operation"),
+    ([{"op": "delete", "paragraph": 3}], "does not exist"),
+    ([{"op": "delete", "paragraph": 0}], "does not exist"),
+    ([{"op": "search_replace", "paragraph": 1, "search": "missing", "replace": "x"}], "found 0 times"),
+    ([{"op": "search_replace", "paragraph": 1, "search": "a", "replace": "x"}], "found 2 times"),
+    ([{"op": "replace", "paragraph": 1, "text": "  "}], "Empty replacement"),
+    ([{"op": "insert_after", "paragraph": 1, "text": ""}], "Empty insertion"),
+    ([{"op": "delete", "paragraph": 1}, {"op": "replace", "paragraph": 1, "text": "x"}], "Conflicting"),
+    ([{"op": "search_replace", "paragraph": 1, "search": "b", "replace": "x"}, {"op": "delete", "paragraph": 1}], "Conflicting"),
+    ([{"op": "delete", "paragraph": 1}, {"op": "delete", "paragraph": 2}], "removed all content")
+])
+def test_apply_edits_rejects_invalid_scripts(edits, message):
+    with pytest.raises(EditScriptError, match=message):
+        apply_edits(["a b a", "c"], edits)
@@ -0,0 +1,92 @@
+import time
+import threading
+import pytest
+from utils.image_jobs import ImageJob, ImageJobTimeout, gather_jobs
+from utils.stable_diffusion_client import ModelLoadingError
+from config import IMAGE_JOB_WORKERS
+
+
+def flaky(failures, result="image", estimated_time=None):
+    # A generate function that reports a loading model a number of times first
+    calls = []
+    
+    def generate():
+        calls.append(time.time())
+        if len(calls) <= failures:
+            raise ModelLoadingError("loading", estimated_time)
+        return result
+    return generate, calls
+
+
+def test_result_retries_transient_errors():
+    generate, calls = flaky(2)
+    job = ImageJob(generate, deadline=5, initial_backoff=0.01, max_backoff=0.05)
+    assert job.result() == "image"
+    assert job.attempts == 3
+    assert len(calls) == 3
+
+
+def test_result_raises_other_errors_immediately():
+    def generate():
+        raise ValueError("bad prompt")
+    job = ImageJob(generate, deadline=5)
+    with pytest.raises(ValueError, match="bad prompt"):
+        job.result()
+    assert job.attempts == 1
+
+
+def test_job_timeout_is_raised_without_waiting_or_spinning():
+    # The model needs longer than the deadline, so the job gives up right away
+    generate, _ = flaky(10, estimated_time=100)
+    job = ImageJob(generate, deadline=1, initial_backoff=0.01)
+    started, cpu_started = time.time(), time.process_time()
+    with pytest.raises(ImageJobTimeout, match="loading"):
+        job.result()
+    assert time.time() - started < 0.5
+    assert time.process_time() - cpu_started < 0.5
+
+
+def test_result_times_out_when_the_job_is_too_slow():
+    release = threading.Event()
+    job = ImageJob(lambda: release.wait(5) and "late", deadline=0.2)
+    with pytest.raises(ImageJobTimeout, match="not ready within"):
+        job.result()
+    release.set()
+
+
+def test_deadline_starts_when_the_job_runs():
+    # More jobs than workers: queued jobs must not use up their deadline while waiting
+    jobs = [ImageJob(lambda i=i: time.sleep(0.3) or i, deadline=0.5) for i in range(IMAGE_JOB_WORKERS * 2)]
+    assert [job.result() for job in jobs] == list(range(IMAGE_JOB_WORKERS * 2))
+    assert all(job.started_at is not None for job in jobs)
+
+
+def test_gather_jobs_stops_waiting_after_grace_and_reports_late_results():
+    late = []
+    finished = threading.Event()
+    release = threading.Event()
+    
+    def on_late_result(result):
+        late.append(result)
+        finished.set()
+        
+    jobs = [
+        ImageJob(lambda: "fast", deadline=5),
+        ImageJob(lambda: release.wait(5) and "slow", deadline=5)
+    ]
+    started = time.time()
+    assert gather_jobs(jobs, grace=0.1, on_late_result=on_late_result) == ["fast"]
+    assert time.time() - started < 1
+    
+    # The slow request was already running, so it still finishes and is handed over
+    release.set()
+    assert finished.wait(2)
+    assert late == ["slow"]
+
+
+def test_gather_jobs_skips_failures_and_raises_when_all_fail():
+    def fail():
+        raise ValueError("failed")
+    assert gather_jobs([ImageJob(fail), ImageJob(lambda: "ok")], grace=1) == ["ok"]
+    with pytest.raises(ValueError, match="failed"):
+        gather_jobs([ImageJob(fail), ImageJob(fail)], grace=1)
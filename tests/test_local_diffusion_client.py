@@ -0,0 +1,53 @@
+import pytest
+from utils.local_diffusion_client import LocalDiffusionClient, get_pipeline
+
+# A randomly initialized Stable Diffusion pipeline of a few megabytes, for tests only
+TINY_MODEL = "hf-internal-testing/tiny-stable-diffusion-torch"
+
+
+def test_fit_size_scales_down_to_multiples_of_8():
+    assert LocalDiffusionClient._fit_size(1024, 768, 512) == (512, 384)
+    assert LocalDiffusionClient._fit_size(300, 200, 512) == (296, 200)
+    assert LocalDiffusionClient._fit_size(2000, 50, 512) == (512, 64)
+
+
+def test_cpu_generates_a_single_candidate():
+    client = LocalDiffusionClient(device="cpu", use_cache=False)
+    assert client.max_candidates(3) == 1
+    assert LocalDiffusionClient(device="cuda", use_cache=False).max_candidates(3) == 3
+
+
+@pytest.fixture(scope="module")
+def tiny_client():
+    pytest.importorskip("torch")
+    pytest.importorskip("diffusers")
+    client = LocalDiffusionClient(device="cpu", use_cache=False)
+    client.model_id = TINY_MODEL
+    try:
+        client.warm_up()
+    except OSError as e:
+        pytest.skip(f"Tiny test model not available: {e}")
+    return client
+
+
+def test_pipeline_is_loaded_once_and_kept_warm(tiny_client):
+    first, _ = get_pipeline(TINY_MODEL, "cpu")
+    second, _ = get_pipeline(TINY_MODEL, "cpu")
+    assert first is second
+
+
+def test_generate_images_is_batched_and_seeded(tiny_client):
+    images = tiny_client.generate_images("a robot", width=64, height=64, num_inference_steps=2, seeds=[1, 2])
+    assert len(images) == 2
+    assert images[0].size == (64, 64)
+    
+    again = tiny_client.generate_image("a robot", width=64, height=64, num_inference_steps=2, seed=1)
+    assert list(again.getdata()) == list(images[0].getdata())
+
+
+def test_generate_image_files_saves_one_file_per_seed(tiny_client, tmp_path, monkeypatch):
+    monkeypatch.setattr("utils.stable_diffusion_client.OUTPUT_DIR", str(tmp_path))
+    results = tiny_client.generate_image_files("a robot", [3, 4], width=64, height=64, num_inference_steps=2)
+    assert [result["cached"] for result in results] == [False, False]
+    assert len({result["full_path"] for result in results}) == 2
+    assert all(result["full_path"].startswith(str(tmp_path)) for result in results)
@@ -0,0 +1,49 @@
+from utils.markdown_normalizer import normalize_markdown, structure_issues
+
+
+def test_removes_repeated_title_and_demotes_headings():
+    content = "# My Post\n\nIntro.\n\n# Section One\n\nText."
+    assert normalize_markdown(content, "My Post") == "Intro.\n\n## Section One\n\nText."
+
+
+def test_promotes_bold_setext_and_standalone_headings():
+    content = "**Bold Heading**\n\nText.\n\nUnderlined\n==========\n\nKey Challenges Ahead\n\nMore text."
+    assert normalize_markdown(content) == \
+        "## Bold Heading\n\nText.\n\n## Underlined\n\n## Key Challenges Ahead\n\nMore text."
+
+
+def test_rule_under_prose_is_not_a_setext_heading():
+    content = "This paragraph ends with a full sentence.\n---\n\nNext part."
+    assert normalize_markdown(content) == "This paragraph ends with a full sentence.\n\nNext part."
+    assert normalize_markdown("Short Title\n---\n\nText.") == "### Short Title\n\nText."
+
+
+def test_lines_ending_in_colon_are_not_headings():
+    assert normalize_markdown("Key benefits include:\n\n- speed\n- cost") == \
+        "Key benefits include:\n\n* speed\n* cost"
+
+
+def test_repairs_list_markers():
+    assert normalize_markdown("Intro.\n• one\n  continued\n2) two") == "Intro.\n\n* one continued\n\n2. two"
+
+
+def test_fenced_code_is_kept_verbatim():
+    content = "Intro.\n\n```python\n# comment\nKey Challenges Ahead\n\n- x\n```\n\nAfter."
+    assert normalize_markdown(content) == content
+
+
+def test_unclosed_fence_keeps_the_rest():
+    content = "Intro.\n\n~~~\n# not a heading\n* kept"
+    assert normalize_markdown(content) == content
+
+
+def test_structure_issues():
+    assert structure_issues("## A\n\n" + "word " * 100) == []
+    assert structure_issues("word " * 400) == ["no ## section headings"]
+    long_block = structure_issues("## A\n\n" + "word " * 500)
+    assert long_block == ["500 words without a heading"]
+    assert structure_issues("## " + "x" * 130) == ["heading longer than 120 characters"]
+
+
+def test_structure_issues_ignore_fenced_code():
+    assert structure_issues("## A\n\nText.\n\n```\n# " + "x" * 130 + "\n```") == []
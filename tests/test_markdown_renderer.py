@@ -0,0 +1,41 @@
+from utils.markdown_renderer import render_markdown, render_inline
+
+
+def test_render_inline_emphasis_and_nesting():
+    assert render_inline("**bold** and *italic*") == "<strong>bold</strong> and <em>italic</em>"
+    assert render_inline("**bold *both* here**") == "<strong>bold <em>both</em> here</strong>"
+
+
+def test_render_inline_keeps_unmatched_markers():
+    assert render_inline("2 * 3 = 6") == "2 * 3 = 6"
+    assert render_inline("**open") == "**open"
+
+
+def test_render_inline_escapes_html():
+    assert render_inline("<script>alert('x')</script> & **b**") == \
+        "&lt;script&gt;alert('x')&lt;/script&gt; &amp; <strong>b</strong>"
+
+
+def test_render_markdown_blocks():
+    html = render_markdown("## Section\n\nLine one\nline two\n\n* a\n* **b**\n1. first\n\n### Sub\n\nEnd.")
+    assert html.split("\n") == [
+        '<h2 class="section-heading">Section</h2>',
+        "<p>Line one line two</p>",
+        "<ul>",
+        "<li>a</li>",
+        "<li><strong>b</strong></li>",
+        "</ul>",
+        "<ol>",
+        "<li>first</li>",
+        "</ol>",
+        '<h3 class="sub-heading">Sub</h3>',
+        "<p>End.</p>"
+    ]
+
+
+def test_render_markdown_paragraph_after_list():
+    assert render_markdown("* item\nAfter the list.") == "<ul>\n<li>item</li>\n</ul>\n<p>After the list.</p>"
+
+
+def test_render_markdown_escapes_headings_and_items():
+    assert render_markdown("# A <b>\n\n- x < y") == "<h1>A &lt;b&gt;</h1>\n<ul>\n<li>x &lt; y</li>\n</ul>"
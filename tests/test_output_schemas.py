@@ -0,0 +1,37 @@
+from utils.output_schemas import validate_payload, CRITIQUE_SCHEMA, ASPECT_CRITIQUE_SCHEMA
+
+SCORES = {"accuracy": 8, "clarity": 7, "structure": 9, "engagement": 6, "completeness": 8, "originality": 5}
+
+
+def test_valid_payload_has_no_errors():
+    assert validate_payload({"scores": SCORES, "critique": "Good."}, CRITIQUE_SCHEMA) == []
+
+
+def test_missing_and_mistyped_fields():
+    errors = validate_payload({"scores": {**SCORES, "clarity": "7"}}, CRITIQUE_SCHEMA)
+    assert "$: missing required field 'critique'" in errors
+    assert "$.scores.clarity: expected integer, got str" in errors
+
+
+def test_bool_is_not_a_number():
+    assert validate_payload(True, {"type": "integer"}) == ["$: expected integer, got bool"]
+
+
+def test_empty_string_enum_and_nested_items():
+    payload = {
+        "score": 6,
+        "findings": [
+            {"issue": " ", "suggestion": "Do this.", "severity": "critical"}
+        ]
+    }
+    assert validate_payload(payload, ASPECT_CRITIQUE_SCHEMA) == [
+        "$.findings[0].issue: must not be empty",
+        "$.findings[0].severity: must be one of high, medium, low"
+    ]
+
+
+def test_array_length_limits():
+    schema = {"type": "array", "minItems": 2, "maxItems": 3, "items": {"type": "string"}}
+    assert validate_payload(["a"], schema) == ["$: expected at least 2 items, got 1"]
+    assert validate_payload(["a", "b", "c", "d"], schema) == ["$: expected at most 3 items, got 4"]
+    assert validate_payload(["a", 1], schema) == ["$[1]: expected string, got int"]
@@ -0,0 +1,36 @@
+import threading
+import time
+
+from utils.research_prefetcher import ResearchPrefetcher
+
+
+def test_ttl_counts_from_when_research_finished():
+    release = threading.Event()
+    calls = []
+    
+    def research(topic):
+        calls.append(topic["title"])
+        release.wait(5)
+        return {"title": topic["title"]}
+        
+    prefetcher = ResearchPrefetcher(research, max_workers=1, budget=2, ttl=0.2)
+    prefetcher.prefetch([{"title": "Slow Topic"}])
+    # Research runs longer than the TTL; the result must still be fresh once it lands
+    time.sleep(0.3)
+    release.set()
+    assert prefetcher.take({"title": "Slow Topic"}, timeout=5) == {"title": "Slow Topic"}
+    assert prefetcher.prefetch([{"title": "Slow Topic"}]) == 0
+    
+    time.sleep(0.3)
+    assert prefetcher.prefetch([{"title": "Slow Topic"}]) == 1
+    assert prefetcher.take({"title": "Slow Topic"}, timeout=5) == {"title": "Slow Topic"}
+    assert calls == ["Slow Topic", "Slow Topic"]
+
+
+def test_take_cancels_queued_research_for_other_topics():
+    release = threading.Event()
+    prefetcher = ResearchPrefetcher(lambda topic: release.wait(5) and topic, max_workers=1, budget=3)
+    prefetcher.prefetch([{"title": "A"}, {"title": "B"}, {"title": "C"}])
+    threading.Timer(0.1, release.set).start()
+    assert prefetcher.take({"title": "A"}, timeout=5) == {"title": "A"}
+    assert prefetcher.take({"title": "B"}) is None
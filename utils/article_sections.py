@@ -0,0 +1,179 @@
+import re
+import hashlib
+from typing import Dict, Any, List, Tuple
+
+_SECTION_HEADING_PATTERN = re.compile(r'^##\s+(.+?)\s*#*\s*$')
+
+# Locations that refer to the part of the post before the first ## heading
+_OPENING_LOCATIONS = {"intro", "introduction", "opening", "opening paragraph", "beginning", "lead", "lede"}
+
+# Words that describe a location without identifying it
+_LOCATION_FILLER_WORDS = {"the", "a", "an", "of", "in", "on", "section", "paragraph", "paragraphs", "part", "heading", "under"}
+
+
+def _plain(text: str) -> str:
+    # Lowercase text without Markdown decoration, for heading comparison
+    text = re.sub(r'[*_`#]', '', text)
+    return re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()
+
+
+def section_hash(text: str) -> str:
+    """
+    Return a short content hash of a section's exact text.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def split_sections(content: str) -> List[Dict[str, Any]]:
+    """
+    Split Markdown content into sections starting at ## headings.
+    
+    The text before the first ## heading forms a section with an empty heading.
+    Sections keep their exact text, including trailing blank lines, so joining
+    them reproduces the content byte for byte.
+    
+    Returns:
+        List of sections with "heading", "text" and "hash" fields
+    """
+    sections: List[Dict[str, Any]] = []
+    heading = ""
+    current: List[str] = []
+    
+    for line in content.splitlines(keepends=True):
+        match = _SECTION_HEADING_PATTERN.match(line.rstrip('\r\n'))
+        if match and (current or sections):
+            sections.append({"heading": heading, "text": "".join(current)})
+            current = []
+        if match:
+            heading = match.group(1).strip()
+        current.append(line)
+        
+    if current:
+        sections.append({"heading": heading, "text": "".join(current)})
+        
+    for section in sections:
+        section["hash"] = section_hash(section["text"])
+    return sections
+
+
+def join_sections(sections: List[Dict[str, Any]]) -> str:
+    """
+    Join sections back into the complete content.
+    """
+    return "".join(section["text"] for section in sections)
+
+
+def locate_section(location: str, sections: List[Dict[str, Any]]) -> int:
+    """
+    Find the section a critique location refers to.
+    
+    The location is matched against the section headings first, then searched
+    for as a quoted passage in the section text.
+    
+    Returns:
+        The section index, or -1 if the location does not identify one section
+    """
+    plain_location = _plain(location)
+    if not plain_location:
+        return -1
+        
+    headings = [_plain(section["heading"]) for section in sections]
+    
+    for i, heading in enumerate(headings):
+        if heading and (heading == plain_location or heading in plain_location):
+            return i
+    if plain_location in _OPENING_LOCATIONS and sections and not sections[0]["heading"]:
+        return 0
+        
+    # Partial heading match, e.g. "the challenges section" for "Key Challenges Ahead"
+    location_words = set(plain_location.split()) - _LOCATION_FILLER_WORDS
+    best_index, best_overlap = -1, 0.0
+    for i, heading in enumerate(headings):
+        heading_words = set(heading.split()) - _LOCATION_FILLER_WORDS
+        if not heading_words or not location_words:
+            continue
+        overlap = len(location_words & heading_words) / min(len(location_words), len(heading_words))
+        if overlap > best_overlap:
+            best_index, best_overlap = i, overlap
+    if best_overlap >= 0.5:
+        return best_index
+        
+    # A quoted passage that occurs in exactly one section
+    passage = location.strip().strip('"\'“”').lower()
+    if len(passage) >= 20:
+        matches = [i for i, section in enumerate(sections) if passage in section["text"].lower()]
+        if len(matches) == 1:
+            return matches[0]
+            
+    return -1
+
+
+def map_findings_to_sections(findings: List[Dict[str, Any]],
+                             sections: List[Dict[str, Any]]) -> Tuple[Dict[int, List[Dict[str, Any]]], List[Dict[str, Any]]]:
+    """
+    Group critique findings by the section they refer to.
+    
+    Args:
+        findings: Critique findings with an optional "location" field
+        sections: The sections of the content (see split_sections)
+        
+    Returns:
+        Tuple of (findings per section index, findings that could not be located)
+    """
+    flagged: Dict[int, List[Dict[str, Any]]] = {}
+    unlocated: List[Dict[str, Any]] = []
+    
+    for finding in findings:
+        index = locate_section(finding.get("location", ""), sections)
+        if index < 0:
+            unlocated.append(finding)
+        else:
+            flagged.setdefault(index, []).append(finding)
+            
+    return flagged, unlocated
+
+
+def replace_section_body(section: Dict[str, Any], new_text: str) -> str:
+    """
+    Build the text of a refined section, keeping its original heading line and
+    trailing blank lines so neighbouring sections are unaffected.
+    
+    Args:
+        section: The original section
+        new_text: The refined section text, with or without its heading
+        
+    Returns:
+        The new section text
+    """
+    original = section["text"]
+    trailing = original[len(original.rstrip()):]
+    lines = new_text.strip().split('\n')
+    
+    # The ## heading (or a # title line in the opening section) is kept as is
+    first_line = original.lstrip().split('\n', 1)[0].rstrip('\r')
+    heading_line = first_line if section["heading"] or first_line.startswith('# ') else ""
+    
+    # Drop the heading if the model echoed it
+    if lines and heading_line and _plain(lines[0]) == _plain(heading_line):
+        lines = lines[1:]
+        
+    # Headings inside a section must stay below the ## section heading
+    body = '\n'.join(re.sub(r'^#{1,2}\s+', '### ', line) for line in lines).strip()
+    
+    if not heading_line:
+        return body + trailing
+        
+    return f"{heading_line}\n\n{body}{trailing}"
+
+
+def changed_sections(old_content: str, new_content: str) -> List[str]:
+    """
+    Return the headings of sections in the new content whose text differs from
+    every section of the old content.
+    """
+    old_hashes = {section["hash"] for section in split_sections(old_content)}
+    return [
+        section["heading"] or "(opening)"
+        for section in split_sections(new_content)
+        if section["hash"] not in old_hashes
+    ]
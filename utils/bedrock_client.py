@@ -3,13 +3,18 @@ import boto3 # type: ignore
 import logging
 from typing import List, Dict, Any, Optional
 from config import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION, CLAUDE_MODEL_ID, MAX_TOKENS, TEMPERATURE
+from utils.output_schemas import validate_payload, parse_json_payload
+from utils.prompt_templates import STRUCTURED_OUTPUT_REPAIR_PROMPT
 
 logger = logging.getLogger(__name__)
 
 class BedrockClient:
-    def __init__(self):
+    def __init__(self, model_id: Optional[str] = None):
         """
         Initialize the AWS Bedrock client for interacting with Claude model.
+        
+        Args:
+            model_id: Optional Bedrock model ID, defaults to CLAUDE_MODEL_ID
         """
         self.client = boto3.client(
             service_name='bedrock-runtime',
@@ -17,13 +22,15 @@ class BedrockClient:
             aws_access_key_id=AWS_ACCESS_KEY_ID,
             aws_secret_access_key=AWS_SECRET_ACCESS_KEY
         )
-        self.model_id = CLAUDE_MODEL_ID
+        self.model_id = model_id or CLAUDE_MODEL_ID
     
     def invoke_model(self, 
                      system_prompt: str, 
                      messages: List[Dict[str, str]], 
                      temperature: float = TEMPERATURE, 
-                     max_tokens: int = MAX_TOKENS) -> Dict[str, Any]:
+                     max_tokens: int = MAX_TOKENS,
+                     tools: Optional[List[Dict[str, Any]]] = None,
+                     tool_choice: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Invoke the Claude model with the given prompt and parameters.
         
@@ -32,6 +39,8 @@ class BedrockClient:
             messages: List of message objects (role and content)
             temperature: Controls randomness (0-1)
             max_tokens: Maximum number of tokens to generate
+            tools: Optional tool definitions the model may call
+            tool_choice: Optional tool selection (e.g. force a specific tool)
             
         Returns:
             The model's response
@@ -45,6 +54,10 @@ class BedrockClient:
                 "max_tokens": max_tokens,
                 "temperature": temperature
             }
+            if tools:
+                request_body["tools"] = tools
+            if tool_choice:
+                request_body["tool_choice"] = tool_choice
             
             # Invoke the model
             response = self.client.invoke_model(
@@ -97,4 +110,106 @@ class BedrockClient:
             logger.error(f"Error from Claude API: {response['error']}")
             return f"Error generating content: {response.get('error', 'Unknown error')}"
         else:
-            return "Error: Unexpected response format from model"
\ No newline at end of file
+            return "Error: Unexpected response format from model"
+    
+    def generate_structured(self,
+                            system_prompt: str,
+                            user_message: str,
+                            tool_name: str,
+                            tool_description: str,
+                            input_schema: Dict[str, Any],
+                            temperature: float = TEMPERATURE,
+                            max_tokens: int = MAX_TOKENS,
+                            max_repairs: int = 1) -> Optional[Dict[str, Any]]:
+        """
+        Generate schema-validated structured output by forcing a tool call.
+        
+        If the returned payload does not validate, a short repair request containing
+        only the invalid payload and the validation errors is sent instead of the
+        full prompt.
+        
+        Args:
+            system_prompt: System instructions
+            user_message: The user's message/prompt
+            tool_name: Name of the tool the model must call
+            tool_description: Description of the tool
+            input_schema: JSON schema the tool input must satisfy
+            temperature: Controls randomness
+            max_tokens: Maximum tokens to generate
+            max_repairs: Maximum number of repair calls after a failed validation
+            
+        Returns:
+            The validated payload, or None if no valid payload could be obtained
+        """
+        tools = [{
+            "name": tool_name,
+            "description": tool_description,
+            "input_schema": input_schema
+        }]
+        tool_choice = {"type": "tool", "name": tool_name}
+        
+        response = self.invoke_model(
+            system_prompt=system_prompt,
+            messages=[{"role": "user", "content": user_message}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            tools=tools,
+            tool_choice=tool_choice
+        )
+        
+        for attempt in range(max_repairs + 1):
+            if "error" in response:
+                logger.error(f"Error from Claude API: {response['error']}")
+                return None
+            
+            payload = self._extract_tool_input(response, tool_name)
+            if payload is None:
+                errors = ["response did not contain a JSON payload"]
+            else:
+                errors = validate_payload(payload, input_schema)
+            
+            if not errors:
+                return payload
+            
+            logger.warning(f"Invalid structured output for {tool_name} (attempt {attempt+1}): {'; '.join(errors)}")
+            if attempt == max_repairs:
+                break
+            
+            # Ask only for a corrected payload rather than repeating the full prompt
+            repair_message = STRUCTURED_OUTPUT_REPAIR_PROMPT.format(
+                tool_name=tool_name,
+                schema=json.dumps(input_schema),
+                payload=json.dumps(payload) if payload is not None else "(none)",
+                errors="\n".join(f"- {error}" for error in errors)
+            )
+            response = self.invoke_model(
+                system_prompt="You fix structured data so that it matches a JSON schema.",
+                messages=[{"role": "user", "content": repair_message}],
+                temperature=0.0,
+                max_tokens=max_tokens,
+                tools=tools,
+                tool_choice=tool_choice
+            )
+        
+        logger.error(f"Could not obtain valid structured output for {tool_name}")
+        return None
+    
+    def _extract_tool_input(self, response: Dict[str, Any], tool_name: str) -> Optional[Any]:
+        """
+        Return the input of the named tool call, falling back to JSON in a text block.
+        """
+        content = response.get("content")
+        if not isinstance(content, list):
+            return None
+        
+        for block in content:
+            if block.get("type") == "tool_use" and block.get("name") == tool_name:
+                return block.get("input")
+        
+        for block in content:
+            if block.get("type") == "text":
+                payload = parse_json_payload(block.get("text", ""))
+                if payload is not None:
+                    return payload
+        
+        return None
@@ -0,0 +1,84 @@
+import difflib
+from typing import Dict, Any, List
+
+
+def make_delta(old_text: str, new_text: str) -> List[List[Any]]:
+    """
+    Encode the change from one version of the content to the next as a compact,
+    JSON-serializable line delta.
+    
+    Operations are ["=", n] (keep n lines), ["-", n] (drop n lines) and
+    ["+", lines] (insert lines). Unchanged lines are stored as counts only.
+    
+    Args:
+        old_text: The previous version
+        new_text: The new version
+        
+    Returns:
+        The delta, to be applied with apply_delta
+    """
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+    
+    delta: List[List[Any]] = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append(["=", i2 - i1])
+            continue
+        if tag in ("delete", "replace"):
+            delta.append(["-", i2 - i1])
+        if tag in ("insert", "replace"):
+            delta.append(["+", new_lines[j1:j2]])
+            
+    return delta
+
+
+def apply_delta(old_text: str, delta: List[List[Any]]) -> str:
+    """
+    Rebuild the new version of the content from the previous version and a delta.
+    
+    Raises:
+        ValueError: If the delta does not fit the given text
+    """
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines: List[str] = []
+    position = 0
+    
+    for op, value in delta:
+        if op == "=":
+            new_lines.extend(old_lines[position:position + value])
+            position += value
+        elif op == "-":
+            position += value
+        elif op == "+":
+            new_lines.extend(value)
+        else:
+            raise ValueError(f"Unknown delta operation: {op}")
+            
+    if position != len(old_lines):
+        raise ValueError("Delta does not match the base text")
+        
+    return "".join(new_lines)
+
+
+def materialize_versions(base_content: str, history: List[Dict[str, Any]]) -> List[str]:
+    """
+    Rebuild the refined content of every iteration of a refinement history.
+    
+    Args:
+        base_content: The content before the first refinement
+        history: Refinement history entries, with a "delta" for refined iterations
+        
+    Returns:
+        The refined content for each history entry ("" for entries without a refinement)
+    """
+    versions = []
+    current = base_content
+    for entry in history:
+        if "delta" in entry:
+            current = apply_delta(current, entry["delta"])
+            versions.append(current)
+        else:
+            versions.append("")
+    return versions
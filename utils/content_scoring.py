@@ -0,0 +1,160 @@
+import re
+import difflib
+from typing import Dict, Any, List
+from config import BLOG_POST_LENGTH
+
+# Relative weight of each signal in the total draft score
+SCORE_WEIGHTS = {
+    "keyword_coverage": 0.25,
+    "structure": 0.2,
+    "length": 0.25,
+    "readability": 0.15,
+    "uniqueness": 0.15
+}
+
+# Preferred range of ## section headings in a post
+IDEAL_SECTION_RANGE = (4, 8)
+
+# Preferred Flesch reading ease range for technical blog content
+IDEAL_READABILITY_RANGE = (30.0, 60.0)
+
+
+def _split_keyword(keyword: str) -> List[str]:
+    # "GenerativeAI" -> ["generative", "ai"]
+    keyword = re.sub(r'([a-z])([A-Z])', r'\1 \2', keyword)
+    return re.findall(r'[a-z0-9]+', keyword.lower())
+
+
+def _count_syllables(word: str) -> int:
+    groups = re.findall(r'[aeiouy]+', word)
+    count = len(groups)
+    if word.endswith('e') and count > 1:
+        count -= 1
+    return max(count, 1)
+
+
+def keyword_coverage(content: str, keywords: List[str]) -> float:
+    """
+    Fraction of keywords whose words all appear in the content.
+    """
+    if not keywords:
+        return 1.0
+        
+    words = set(re.findall(r'[a-z0-9]+', content.lower()))
+    covered = 0
+    for keyword in keywords:
+        parts = _split_keyword(str(keyword))
+        if parts and all(part in words for part in parts):
+            covered += 1
+    return covered / len(keywords)
+
+
+def structure_score(content: str) -> float:
+    """
+    Score the heading structure: enough ## sections, and no walls of text between headings.
+    """
+    sections = re.findall(r'^##\s+\S', content, flags=re.MULTILINE)
+    low, high = IDEAL_SECTION_RANGE
+    count = len(sections)
+    if low <= count <= high:
+        score = 1.0
+    elif count < low:
+        score = count / low
+    else:
+        score = max(0.0, 1.0 - (count - high) / high)
+        
+    # Penalize very long runs of text without any heading
+    blocks = re.split(r'^#{1,4}\s+.*$', content, flags=re.MULTILINE)
+    longest_block = max((len(block.split()) for block in blocks), default=0)
+    if longest_block > 400:
+        score *= 0.8
+    return score
+
+
+def length_score(content: str, target_words: int = BLOG_POST_LENGTH) -> float:
+    """
+    Score how close the word count is to the target length.
+    """
+    word_count = len(content.split())
+    return max(0.0, 1.0 - abs(word_count - target_words) / target_words)
+
+
+def reading_ease(content: str) -> float:
+    """
+    Approximate Flesch reading ease of the content (higher is easier).
+    """
+    text = re.sub(r'^#+\s+.*$', '', content, flags=re.MULTILINE)
+    sentences = [s for s in re.split(r'[.!?]+(?:\s|$)', text) if s.strip()]
+    words = re.findall(r'[a-z]+', text.lower())
+    if not sentences or not words:
+        return 0.0
+        
+    syllables = sum(_count_syllables(word) for word in words)
+    return 206.835 - 1.015 * (len(words) / len(sentences)) - 84.6 * (syllables / len(words))
+
+
+def readability_score(content: str) -> float:
+    """
+    Score the reading ease against the preferred range for technical content.
+    """
+    ease = reading_ease(content)
+    low, high = IDEAL_READABILITY_RANGE
+    if low <= ease <= high:
+        return 1.0
+    distance = low - ease if ease < low else ease - high
+    return max(0.0, 1.0 - distance / 40.0)
+
+
+def uniqueness_score(content: str) -> float:
+    """
+    Fraction of paragraphs that are not exact or near duplicates of an earlier one.
+    """
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', content) if len(p.split()) >= 8]
+    if not paragraphs:
+        return 1.0
+        
+    seen: List[set] = []
+    duplicates = 0
+    for paragraph in paragraphs:
+        words = re.findall(r'[a-z0-9]+', paragraph.lower())
+        shingles = {" ".join(words[i:i+3]) for i in range(max(len(words) - 2, 1))}
+        if any(len(shingles & other) / len(shingles | other) > 0.6 for other in seen):
+            duplicates += 1
+        seen.append(shingles)
+    return 1.0 - duplicates / len(paragraphs)
+
+
+def score_draft(content: str, keywords: List[str], target_words: int = BLOG_POST_LENGTH) -> Dict[str, Any]:
+    """
+    Score a draft locally using cheap text signals.
+    
+    Args:
+        content: The draft body in Markdown
+        keywords: Topic keywords that should be covered
+        target_words: Target length of the post in words
+        
+    Returns:
+        Dictionary with each signal (0-1) and the weighted "total"
+    """
+    scores = {
+        "keyword_coverage": keyword_coverage(content, keywords),
+        "structure": structure_score(content),
+        "length": length_score(content, target_words),
+        "readability": readability_score(content),
+        "uniqueness": uniqueness_score(content)
+    }
+    scores["total"] = sum(SCORE_WEIGHTS[name] * value for name, value in scores.items())
+    return {name: round(value, 3) for name, value in scores.items()}
+
+
+def text_change_ratio(old_content: str, new_content: str) -> float:
+    """
+    Word-level edit distance between two versions, as a fraction (0 = identical, 1 = rewritten).
+    """
+    old_words = old_content.split()
+    new_words = new_content.split()
+    if not old_words and not new_words:
+        return 0.0
+        
+    matcher = difflib.SequenceMatcher(None, old_words, new_words, autojunk=False)
+    return 1.0 - matcher.ratio()
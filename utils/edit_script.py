@@ -0,0 +1,102 @@
+import re
+from typing import Dict, Any, List
+
+# Supported edit operations, applied against numbered paragraphs of the original text
+EDIT_OPERATIONS = ("search_replace", "replace", "insert_after", "delete")
+
+
+class EditScriptError(ValueError):
+    """
+    Raised when an edit script cannot be applied cleanly.
+    """
+
+
+def split_blocks(content: str) -> List[str]:
+    """
+    Split Markdown content into blocks (paragraphs, headings, lists) separated by blank lines.
+    """
+    return [block.strip() for block in re.split(r'\n\s*\n', content.strip()) if block.strip()]
+
+
+def number_blocks(blocks: List[str]) -> str:
+    """
+    Render blocks with [P<n>] anchors so the model can refer to them.
+    """
+    return "\n\n".join(f"[P{i+1}] {block}" for i, block in enumerate(blocks))
+
+
+def apply_edits(blocks: List[str], edits: List[Dict[str, Any]]) -> str:
+    """
+    Apply an edit script to the numbered blocks of the original content.
+    
+    Paragraph numbers always refer to the original numbering, so edits can be
+    applied in any order. Each search string must match exactly once in its paragraph.
+    
+    Args:
+        blocks: The original content blocks (see split_blocks)
+        edits: List of edits with "op", "paragraph" and "search"/"replace"/"text" fields
+        
+    Returns:
+        The edited content
+        
+    Raises:
+        EditScriptError: If an edit is invalid, ambiguous or conflicts with another edit
+    """
+    texts: List[str] = list(blocks)
+    deleted = set()
+    replaced = set()
+    edited = set()
+    inserted: Dict[int, List[str]] = {}
+    
+    for edit in edits:
+        op = edit.get("op")
+        paragraph = edit.get("paragraph")
+        if op not in EDIT_OPERATIONS:
+            raise EditScriptError(f"Unknown edit operation: {op}")
+        if not isinstance(paragraph, int) or not (0 if op == "insert_after" else 1) <= paragraph <= len(blocks):
+            raise EditScriptError(f"Paragraph P{paragraph} does not exist")
+            
+        index = paragraph - 1
+        
+        if op == "insert_after":
+            text = (edit.get("text") or "").strip()
+            if not text:
+                raise EditScriptError(f"Empty insertion after P{paragraph}")
+            inserted.setdefault(paragraph, []).append(text)
+            continue
+            
+        if index in deleted or index in replaced:
+            raise EditScriptError(f"Conflicting edits for P{paragraph}")
+            
+        if op == "delete":
+            if index in edited:
+                raise EditScriptError(f"Conflicting edits for P{paragraph}")
+            deleted.add(index)
+            
+        elif op == "replace":
+            text = (edit.get("text") or "").strip()
+            if not text:
+                raise EditScriptError(f"Empty replacement for P{paragraph}")
+            if index in edited:
+                raise EditScriptError(f"Conflicting edits for P{paragraph}")
+            texts[index] = text
+            replaced.add(index)
+            
+        else:
+            search = edit.get("search") or ""
+            replace = edit.get("replace") or ""
+            occurrences = texts[index].count(search) if search else 0
+            if occurrences != 1:
+                raise EditScriptError(f"Search text found {occurrences} times in P{paragraph}: {search[:60]!r}")
+            texts[index] = texts[index].replace(search, replace, 1)
+            edited.add(index)
+            
+    result = list(inserted.get(0, []))
+    for i, text in enumerate(texts):
+        if i not in deleted and text.strip():
+            result.append(text.strip())
+        result.extend(inserted.get(i + 1, []))
+        
+    if not result:
+        raise EditScriptError("Edits removed all content")
+    return "\n\n".join(result)
@@ -1,15 +1,86 @@
 import os
-import re
+import json
+import html
 import logging
+import tempfile
+import threading
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+from markupsafe import Markup
 from utils.bedrock_client import BedrockClient
-from config import OUTPUT_DIR
+from utils.image_processing import MIME_TYPES
+from utils.markdown_renderer import render_markdown
+from utils.placeholder_images import save_placeholder_image
+from config import OUTPUT_DIR, TEMPLATE_DIR, TEMPLATE_CACHE_DIR, BLOG_THEME
 
 logger = logging.getLogger(__name__)
 
+# Rendered width of the featured image: the full viewport on small screens,
+# the 1000px container minus its padding otherwise
+IMAGE_SIZES = "(max-width: 1000px) calc(100vw - 4rem), 936px"
+
+# Every theme is a directory under TEMPLATE_DIR with this template
+POST_TEMPLATE = "post.html"
+
+_environment: Optional[Environment] = None
+_environment_lock = threading.Lock()
+
+# Serializes saves, so concurrent saves of one file (e.g. a background image
+# update) get distinct version numbers
+_save_lock = threading.Lock()
+
+
+def get_template_environment() -> Environment:
+    """
+    Return the shared Jinja2 environment, created on first use.
+    
+    Templates are compiled once per process and kept in memory, and their compiled
+    bytecode is cached in TEMPLATE_CACHE_DIR so later processes skip compilation.
+    """
+    global _environment
+    with _environment_lock:
+        if _environment is None:
+            bytecode_cache = None
+            try:
+                os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+                bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+            except OSError as e:
+                logger.warning(f"Template bytecode cache disabled: {str(e)}")
+                
+            _environment = Environment(
+                loader=FileSystemLoader(TEMPLATE_DIR),
+                bytecode_cache=bytecode_cache,
+                autoescape=select_autoescape(["html"]),
+                trim_blocks=True,
+                lstrip_blocks=True,
+                # Templates do not change while the process runs; skip the mtime check on every render
+                auto_reload=False
+            )
+        return _environment
+
+
+def available_themes() -> List[str]:
+    """
+    Return the names of the themes in TEMPLATE_DIR.
+    """
+    try:
+        return sorted(name for name in os.listdir(TEMPLATE_DIR)
+                      if os.path.isfile(os.path.join(TEMPLATE_DIR, name, POST_TEMPLATE)))
+    except OSError:
+        return []
+
+
 class HtmlGenerator:
-    def __init__(self):
+    def __init__(self, theme: str = BLOG_THEME):
+        """
+        Initialize the HTML generator.
+        
+        Args:
+            theme: Default theme, a directory under TEMPLATE_DIR
+        """
+        self.theme = theme
+        
         # Initialize Bedrock client if needed
         try:
             self.claude_client = BedrockClient()
@@ -22,319 +93,52 @@ class HtmlGenerator:
     
     def _format_content(self, content: str) -> str:
         """
-        Format the markdown-like content to HTML.
-        Enhanced implementation to handle various markdown elements.
+        Format the markdown-like content to HTML (see render_markdown).
         """
-        # Format headings
-        content = re.sub(r'^# (.+)$', r'<h1>\1</h1>', content, flags=re.MULTILINE)
-        content = re.sub(r'^## (.+)$', r'<h2 class="section-heading">\1</h2>', content, flags=re.MULTILINE)
-        content = re.sub(r'^### (.+)$', r'<h3 class="sub-heading">\1</h3>', content, flags=re.MULTILINE)
-        content = re.sub(r'^#### (.+)$', r'<h4>\1</h4>', content, flags=re.MULTILINE)
-        
-        # Format bold and italic text
-        content = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', content)
-        content = re.sub(r'\*(.+?)\*', r'<em>\1</em>', content)
-        
-        # Format lists
-        # Unordered lists
-        unordered_list_pattern = r'(?:^|\n)(?:\* .+\n)+(?:\n|$)'
-        for match in re.finditer(unordered_list_pattern, content, re.MULTILINE):
-            list_items = re.findall(r'\* (.+)', match.group(0))
-            list_html = '<ul>\n' + '\n'.join([f'<li>{item}</li>' for item in list_items]) + '\n</ul>'
-            content = content.replace(match.group(0), list_html)
-        
-        # Ordered lists
-        ordered_list_pattern = r'(?:^|\n)(?:\d+\. .+\n)+(?:\n|$)'
-        for match in re.finditer(ordered_list_pattern, content, re.MULTILINE):
-            list_items = re.findall(r'\d+\. (.+)', match.group(0))
-            list_html = '<ol>\n' + '\n'.join([f'<li>{item}</li>' for item in list_items]) + '\n</ol>'
-            content = content.replace(match.group(0), list_html)
-        
-        # Format paragraphs (more robust approach)
-        paragraphs = []
-        current_paragraph = []
-        in_html_block = False
-        
-        for line in content.split('\n'):
-            # Skip if we're inside an HTML block (list, heading, etc.)
-            if line.strip().startswith('<') and not line.strip().startswith('<p>'):
-                # If we have a paragraph in progress, close it
-                if current_paragraph:
-                    paragraphs.append('<p>' + ' '.join(current_paragraph) + '</p>')
-                    current_paragraph = []
-                
-                # Add the HTML line directly
-                paragraphs.append(line)
-                
-                # Check if we're entering an HTML block
-                if not line.strip().endswith('>'):
-                    in_html_block = True
-            
-            # Check if we're exiting an HTML block
-            elif in_html_block and line.strip().endswith('>'):
-                paragraphs.append(line)
-                in_html_block = False
-            
-            # If we're in an HTML block, add the line as is
-            elif in_html_block:
-                paragraphs.append(line)
-            
-            # Handle regular paragraph text
-            elif line.strip():
-                current_paragraph.append(line.strip())
-            
-            # Handle paragraph breaks
-            elif current_paragraph:
-                paragraphs.append('<p>' + ' '.join(current_paragraph) + '</p>')
-                current_paragraph = []
-        
-        # Add the last paragraph if exists
-        if current_paragraph:
-            paragraphs.append('<p>' + ' '.join(current_paragraph) + '</p>')
-        
-        return '\n'.join(paragraphs)
+        return render_markdown(content)
     
-    def _create_professional_template(self) -> str:
+    def _image_html(self, image_path: str, image_alt: str, image_variants: Optional[Dict[str, Any]] = None) -> str:
         """
-        Create a professional default HTML template with modern CSS based on the template design from the screenshot.
+        Build the featured image markup.
+        
+        With responsive variants this is a <picture> with a srcset per format, so
+        browsers pick the smallest file in the best format they support; the
+        JPEG variants are the fallback. The image is lazy-loaded either way.
         """
-        return '''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{{TITLE}}</title>
-    <link href="https://fonts.googleapis.com/css2?family=Roboto:wght@300;400;500;700&display=swap" rel="stylesheet">
-    <style>
-        /* Reset and Base Styles */
-        * {
-            box-sizing: border-box;
-            margin: 0;
-            padding: 0;
-        }
-
-        body {
-            font-family: 'Roboto', Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            background-color: #f8f8f8;
-        }
-
-        /* Typography */
-        h1, h2, h3, h4, h5, h6 {
-            font-weight: 700;
-            line-height: 1.2;
-            margin-bottom: 1rem;
-            color: #2c3e50;
-        }
-
-        h1 {
-            font-size: 2.5rem;
-            margin-top: 1.5rem;
-            margin-bottom: 1.5rem;
-        }
-
-        h2 {
-            font-size: 2rem;
-            color: #3498db;
-            margin-top: 2rem;
-            margin-bottom: 1.2rem;
-        }
-
-        h3 {
-            font-size: 1.5rem;
-            margin-top: 1.5rem;
-            margin-bottom: 1rem;
-        }
-
-        p {
-            margin-bottom: 1.2rem;
-            font-size: 1.1rem;
-            line-height: 1.7;
-        }
-
-        /* Layout */
-        .container {
-            max-width: 1000px;
-            margin: 0 auto;
-            background-color: #fff;
-            box-shadow: 0 0 20px rgba(0, 0, 0, 0.1);
-        }
-
-        /* Header */
-        .header {
-            background: linear-gradient(to right, #2c3e50, #4a6fa5);
-            color: #fff;
-            padding: 2rem 0;
-            text-align: center;
-        }
-
-        .header h1 {
-            font-size: 2.2rem;
-            color: #fff;
-            margin: 0;
-            padding: 0 2rem;
-        }
-
-        .header p {
-            font-size: 1.1rem;
-            opacity: 0.9;
-            margin-top: 0.5rem;
-        }
-
-        /* Article Container */
-        .article-container {
-            padding: 2rem;
-        }
-
-        /* Article Title */
-        .article-title {
-            font-size: 2.5rem;
-            color: #2c3e50;
-            margin-bottom: 1rem;
-            text-align: left;
-            line-height: 1.2;
-        }
-
-        /* Article Meta */
-        .article-meta {
-            font-size: 0.9rem;
-            color: #7f8c8d;
-            margin-bottom: 2rem;
-            border-bottom: 1px solid #eee;
-            padding-bottom: 1rem;
-        }
-
-        /* Featured Image */
-        .featured-image-container {
-            margin: 2rem 0;
-            text-align: center;
-        }
-
-        .featured-image {
-            max-width: 100%;
-            height: auto;
-            border-radius: 8px;
-            box-shadow: 0 4px 10px rgba(0, 0, 0, 0.1);
-        }
-
-        .image-caption {
-            margin-top: 0.8rem;
-            font-size: 0.9rem;
-            color: #7f8c8d;
-            text-align: center;
-            font-style: italic;
-        }
-
-        /* Article Content */
-        .article-content {
-            margin-bottom: 3rem;
-        }
-
-        /* Section Headings with underline */
-        .section-heading {
-            position: relative;
-            display: inline-block;
-            margin-bottom: 1.5rem;
-            color: #3498db;
-        }
-
-        .section-heading::after {
-            content: "";
-            position: absolute;
-            bottom: -5px;
-            left: 0;
-            width: 100%;
-            height: 2px;
-            background-color: #3498db;
-        }
-
-        /* Lists */
-        ul, ol {
-            margin-bottom: 1.5rem;
-            padding-left: 2rem;
-        }
-
-        li {
-            margin-bottom: 0.5rem;
-        }
-
-        /* Footer */
-        .footer {
-            background-color: #2c3e50;
-            color: #fff;
-            padding: 2rem;
-            text-align: center;
-        }
-
-        .footer p {
-            margin: 0;
-            font-size: 0.9rem;
-            opacity: 0.8;
-        }
-
-        /* Responsive Styles */
-        @media (max-width: 768px) {
-            .article-container {
-                padding: 1.5rem;
-            }
-
-            h1, .article-title {
-                font-size: 2rem;
-            }
-
-            h2 {
-                font-size: 1.6rem;
-            }
-
-            h3 {
-                font-size: 1.3rem;
-            }
-
-            body {
-                font-size: 16px;
-            }
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <header class="header">
-            <h1>AI Content Generator</h1>
-            <p>Exploring the frontiers of artificial intelligence</p>
-        </header>
-
-        <div class="article-container">
-            <h1 class="article-title">{{TITLE}}</h1>
+        alt = html.escape(image_alt, quote=True)
+        variants = (image_variants or {}).get("variants") or {}
+        fallback = variants.get("jpeg")
+        if not fallback:
+            return f'<img src="{image_path}" alt="{alt}" class="featured-image" loading="lazy" decoding="async">'
+        
+        def srcset(entries):
+            return ", ".join(f"./outputs/{entry['filename']} {entry['width']}w" for entry in entries)
             
-            <div class="article-meta">
-                <span>By {{AUTHOR}} | Published on {{DATE}}</span>
-            </div>
-
-            <div class="featured-image-container">
-                <img src="{{IMAGE_PATH}}" alt="{{IMAGE_ALT}}" class="featured-image">
-                <p class="image-caption">{{IMAGE_CAPTION}}</p>
-            </div>
-
-            <div class="article-content">
-                {{CONTENT}}
-            </div>
-        </div>
-
-        <footer class="footer">
-            <p>&copy; {{YEAR}} AI Content Generator. All rights reserved.</p>
-        </footer>
-    </div>
-</body>
-</html>
-        '''
+        sources = [
+            f'<source type="{MIME_TYPES[fmt]}" srcset="{srcset(entries)}" sizes="{IMAGE_SIZES}">'
+            for fmt, entries in variants.items() if fmt != "jpeg" and entries
+        ]
+        largest = fallback[-1]
+        img = (
+            f'<img src="./outputs/{largest["filename"]}" srcset="{srcset(fallback)}" sizes="{IMAGE_SIZES}" '
+            f'width="{largest["width"]}" height="{largest["height"]}" alt="{alt}" class="featured-image" '
+            f'loading="lazy" decoding="async">'
+        )
+        return "<picture>" + "".join(sources) + img + "</picture>"
     
     def generate_html(self, title: str, content: str, image_path: str = "", 
                      image_alt: str = "", image_caption: str = "", 
-                     author: str = "AI Content Generator") -> str:
+                     author: str = "AI Content Generator",
+                     image_variants: Optional[Dict[str, Any]] = None,
+                     keywords: Optional[List[str]] = None,
+                     theme: Optional[str] = None) -> str:
         """
-        Generate HTML content using a professional template.
+        Generate HTML content from the theme's compiled template in a single render pass.
+        
+        image_variants are the responsive copies written by create_responsive_variants;
+        without them the single image at image_path is used. Without an image path
+        (e.g. a draft published before the image is ready) a placeholder hero image
+        is rendered from the title and keywords.
         """
         try:
             # Remove "Title:" prefix if present
@@ -344,8 +148,15 @@ class HtmlGenerator:
             # Format the content for HTML
             formatted_content = self._format_content(content)
             
-            # Get professional template
-            template = self._create_professional_template()
+            # Get the compiled theme template
+            template = get_template_environment().get_template(f"{theme or self.theme}/{POST_TEMPLATE}")
+            
+            # Use a placeholder until the generated image is available
+            if not image_path:
+                try:
+                    image_path = save_placeholder_image(title, keywords)["image_path"]
+                except Exception as e:
+                    logger.warning(f"Could not create placeholder image: {str(e)}")
             
             # Debug the image path
             logger.info(f"Original image path: {image_path}")
@@ -370,17 +181,18 @@ class HtmlGenerator:
             if not image_caption:
                 image_caption = "A visual representation of " + title.lower()
             
-            # Replace placeholders with content
-            html_content = template.replace("{{TITLE}}", title)
-            html_content = html_content.replace("{{CONTENT}}", formatted_content)
-            html_content = html_content.replace("{{IMAGE_PATH}}", image_path)
-            html_content = html_content.replace("{{IMAGE_ALT}}", image_alt)
-            html_content = html_content.replace("{{IMAGE_CAPTION}}", image_caption)
-            html_content = html_content.replace("{{AUTHOR}}", author)
-            html_content = html_content.replace("{{DATE}}", datetime.now().strftime('%B %d, %Y'))
-            html_content = html_content.replace("{{YEAR}}", str(datetime.now().year))
-            
-            return html_content
+            # Text is escaped by the template; the rendered content and image markup are trusted
+            now = datetime.now()
+            return template.render(
+                title=title,
+                content=Markup(formatted_content),
+                # Without even a placeholder there is no image block
+                image_html=Markup(self._image_html(image_path, image_alt, image_variants)) if image_path else "",
+                image_caption=image_caption,
+                author=author,
+                date=now.strftime('%B %d, %Y'),
+                year=now.year
+            )
             
         except Exception as e:
             logger.error(f"Error generating HTML: {str(e)}")
@@ -408,9 +220,18 @@ class HtmlGenerator:
             """
             return fallback
     
-    def save_html(self, html_content: str, filename: str = None) -> str:
+    def save_html(self, html_content: str, filename: str = None, stage: str = "final") -> str:
         """
         Save the HTML content to a file and return the file path.
+        
+        The file is replaced atomically, so a published draft can be swapped for the
+        refined version while it is being served. Each save bumps the version number
+        recorded next to the file (see read_version).
+        
+        Args:
+            html_content: The HTML to save
+            filename: Output file name, defaults to a timestamped name
+            stage: Label stored with the version, e.g. "draft" or "final"
         """
         if filename is None:
             # Generate a filename based on the current timestamp
@@ -423,10 +244,43 @@ class HtmlGenerator:
         filepath = os.path.join(OUTPUT_DIR, filename)
         
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            logger.info(f"HTML file saved: {filepath}")
+            with _save_lock:
+                self._write_atomic(filepath, html_content)
+                version = self.read_version(filepath) + 1
+                self._write_atomic(self._version_path(filepath), json.dumps({
+                    "version": version,
+                    "stage": stage,
+                    "updated_at": datetime.now().isoformat()
+                }, indent=2))
+            logger.info(f"HTML file saved: {filepath} (version {version}, {stage})")
             return filepath
         except Exception as e:
             logger.error(f"Error saving HTML file: {str(e)}")
             return ""
+
+    def read_version(self, filepath: str) -> int:
+        """
+        Return the version number of a saved HTML file (0 if it has none).
+        """
+        try:
+            with open(self._version_path(filepath), 'r', encoding='utf-8') as f:
+                return int(json.load(f).get("version", 0))
+        except (OSError, ValueError):
+            return 0
+    
+    def _version_path(self, filepath: str) -> str:
+        return os.path.splitext(filepath)[0] + ".version.json"
+    
+    def _write_atomic(self, filepath: str, text: str) -> None:
+        # Write to a unique temporary file first so readers never see a partial file
+        # and concurrent writers never share one
+        directory = os.path.dirname(filepath) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(filepath)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, filepath)
+        except OSError:
+            os.remove(tmp_path)
+            raise
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+from config import IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES
+
+try:
+    import fcntl
+except ImportError:  # Windows: instances in one process are still serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# A hit only rewrites the index when the recorded last use is older than this (seconds)
+RECENCY_WRITE_INTERVAL = 60
+
+# One lock per index file, shared by all ImageCache instances in the process
+_index_locks: Dict[str, threading.Lock] = {}
+_index_locks_guard = threading.Lock()
+
+
+def _index_lock(index_path: str) -> threading.Lock:
+    with _index_locks_guard:
+        return _index_locks.setdefault(os.path.abspath(index_path), threading.Lock())
+
+
+def image_cache_key(model_id: str, parameters: Dict[str, Any]) -> str:
+    """
+    Build a content address for an image from the model ID and all generation parameters.
+    """
+    payload = json.dumps({"model_id": model_id, **parameters}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ImageCache:
+    """
+    Content-addressed store of generated images with a size cap and LRU eviction.
+    
+    The index is shared by every instance and process using the same directory:
+    it is reloaded under a lock before each change, so concurrent clients merge
+    their entries instead of overwriting each other's.
+    """
+    def __init__(self, cache_dir: str = IMAGE_CACHE_DIR, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        """
+        Initialize the image cache.
+        
+        Args:
+            cache_dir: Directory the images and their index are stored in
+            max_bytes: Total size above which the least recently used images are evicted
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        
+        self._lock = _index_lock(self.index_path)
+        self._index: Dict[str, Dict[str, Any]] = self._load()
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return the path of a cached image and mark it as recently used.
+        
+        The first hit is always recorded; later ones only once the recorded use
+        is RECENCY_WRITE_INTERVAL old, so hits rarely rewrite the index.
+        
+        Returns:
+            The file path, or None on a cache miss
+        """
+        with self._locked():
+            entry = self._index.get(key)
+            if not entry:
+                return None
+                
+            path = os.path.join(self.cache_dir, entry["filename"])
+            if not os.path.exists(path):
+                # Removed outside the cache
+                del self._index[key]
+                self._save()
+                return None
+                
+            now = time.time()
+            if not entry.get("hits") or now - entry["last_used"] > RECENCY_WRITE_INTERVAL:
+                entry["last_used"] = now
+                entry["hits"] = entry.get("hits", 0) + 1
+                self._save()
+            return path
+    
+    def was_reused(self, key: str) -> bool:
+        """
+        Check whether a cached image has been handed out since it was stored.
+        """
+        with self._locked():
+            return bool(self._index.get(key, {}).get("hits"))
+    
+    def put_file(self, key: str, source_path: str) -> Optional[str]:
+        """
+        Store a copy of an image file under the given key.
+        
+        Returns:
+            The path of the cached copy, or None if it could not be stored
+        """
+        filename = f"{key}{os.path.splitext(source_path)[1] or '.png'}"
+        path = os.path.join(self.cache_dir, filename)
+        
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{filename}.", suffix=".tmp")
+            os.close(fd)
+            try:
+                shutil.copyfile(source_path, tmp_path)
+                os.replace(tmp_path, path)
+            except OSError:
+                os.remove(tmp_path)
+                raise
+        except OSError as e:
+            logger.error(f"Error caching image {source_path}: {str(e)}")
+            return None
+            
+        with self._locked():
+            self._index[key] = {
+                "filename": filename,
+                "size": os.path.getsize(path),
+                "last_used": time.time(),
+                "hits": 0
+            }
+            self._evict()
+            self._save()
+            return path if key in self._index else None
+    
+    def total_bytes(self) -> int:
+        """
+        Return the total size of the cached images.
+        """
+        with self._locked():
+            return sum(entry["size"] for entry in self._index.values())
+    
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # Hold the index lock (across processes where supported) with the index reloaded from disk
+        with self._lock:
+            lock_file = None
+            if fcntl:
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    lock_file = open(f"{self.index_path}.lock", 'a')
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                except OSError as e:
+                    logger.warning(f"Could not lock image cache index: {str(e)}")
+            try:
+                self._index = self._load()
+                yield
+            finally:
+                if lock_file:
+                    # Closing the file releases the lock
+                    lock_file.close()
+    
+    def _evict(self) -> None:
+        # Drop least recently used images until the cache fits its size cap
+        total = sum(entry["size"] for entry in self._index.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, entry["filename"]))
+            except OSError:
+                pass
+            total -= entry["size"]
+            del self._index[key]
+            logger.info(f"Evicted cached image {entry['filename']}")
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            return index if isinstance(index, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Could not load image cache index: {str(e)}")
+            return {}
+    
+    def _save(self) -> None:
+        # Caller holds the index lock
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # A unique temporary file, so concurrent writers never share one
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix="index.json.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self._index, f, indent=2)
+                os.replace(tmp_path, self.index_path)
+            except OSError:
+                os.remove(tmp_path)
+                raise
+        except OSError as e:
+            logger.error(f"Error saving image cache index: {str(e)}")
@@ -0,0 +1,178 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Any, List, Optional
+import requests
+from utils.stable_diffusion_client import ModelLoadingError
+from config import IMAGE_JOB_WORKERS, IMAGE_JOB_DEADLINE, IMAGE_JOB_INITIAL_BACKOFF, IMAGE_JOB_MAX_BACKOFF
+
+logger = logging.getLogger(__name__)
+
+# Errors after which the request is retried instead of failing the job
+TRANSIENT_ERRORS = (ModelLoadingError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+_executor = ThreadPoolExecutor(max_workers=IMAGE_JOB_WORKERS, thread_name_prefix="image-job")
+
+
+class ImageJobTimeout(TimeoutError):
+    """
+    Raised when an image job does not finish before its deadline.
+    """
+
+
+class ImageJob:
+    """
+    Background image generation that waits out cold model starts.
+    
+    While the model is loading the job sleeps for the estimated load time
+    reported by the API (at least the current backoff), doubling the backoff
+    after every attempt, until the overall deadline passes. The deadline counts
+    from when the job starts running, not from when it is queued.
+    """
+    def __init__(self,
+                 generate_fn: Callable[[], Dict[str, Any]],
+                 deadline: float = IMAGE_JOB_DEADLINE,
+                 initial_backoff: float = IMAGE_JOB_INITIAL_BACKOFF,
+                 max_backoff: float = IMAGE_JOB_MAX_BACKOFF):
+        """
+        Start the job.
+        
+        Args:
+            generate_fn: Function that generates the image, raising a transient error to retry
+            deadline: Seconds after which the job gives up
+            initial_backoff: Seconds to wait after the first transient failure
+            max_backoff: Upper bound for the wait between attempts
+        """
+        self.generate_fn = generate_fn
+        self.deadline = deadline
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        
+        # Set when a worker picks the job up
+        self.started_at: Optional[float] = None
+        self.attempts = 0
+        self._cancelled = threading.Event()
+        self._future: Future = _executor.submit(self._run)
+    
+    def _run(self) -> Dict[str, Any]:
+        self.started_at = time.time()
+        backoff = self.initial_backoff
+        while True:
+            self.attempts += 1
+            try:
+                return self.generate_fn()
+            except TRANSIENT_ERRORS as e:
+                remaining = self.deadline - (time.time() - self.started_at)
+                wait = min(max(getattr(e, "estimated_time", 0) or 0, backoff), self.max_backoff)
+                if wait >= remaining:
+                    raise ImageJobTimeout(f"Image not ready within {self.deadline}s after {self.attempts} attempts: {str(e)}")
+                    
+                logger.info(f"Image attempt {self.attempts} failed ({str(e)}), retrying in {wait:.0f}s")
+                if self._cancelled.wait(wait):
+                    raise ImageJobTimeout("Image job was cancelled")
+                backoff = min(backoff * 2, self.max_backoff)
+    
+    @property
+    def future(self) -> Future:
+        return self._future
+    
+    def done(self) -> bool:
+        return self._future.done()
+    
+    def expires_at(self) -> float:
+        """
+        Time at which the deadline passes; a job still queued has its full deadline ahead.
+        """
+        return (self.started_at or time.time()) + self.deadline
+    
+    def result(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Wait for the image.
+        
+        Args:
+            timeout: Seconds to wait, defaults to the time left until the deadline,
+                     which only starts once the job is running
+            
+        Raises:
+            ImageJobTimeout: If the image is not ready in time
+            Exception: Any non-transient error raised by the generate function
+        """
+        while True:
+            wait_time = timeout if timeout is not None else max(self.expires_at() - time.time(), 0)
+            # Waiting separately keeps the job's own errors (including ImageJobTimeout,
+            # a TimeoutError like the one result() raises) apart from the wait running out
+            done, _ = wait([self._future], timeout=wait_time)
+            if done:
+                return self._future.result()
+                
+            # Keep waiting while the job is queued behind other jobs
+            if timeout is None and (self.started_at is None or time.time() < self.expires_at()):
+                continue
+            self.cancel()
+            raise ImageJobTimeout(f"Image not ready within {self.deadline}s")
+    
+    def cancel(self) -> None:
+        """
+        Stop retrying. An attempt already in progress is not interrupted.
+        """
+        self._cancelled.set()
+        self._future.cancel()
+
+
+def gather_jobs(jobs: List[ImageJob],
+                grace: float,
+                on_late_result: Optional[Callable[[Any], None]] = None) -> List[Any]:
+    """
+    Wait for several image jobs and return the results of those that succeed.
+    
+    Once the first job succeeds the others get at most `grace` more seconds,
+    so one slow job does not hold up the rest; jobs still running then are cancelled.
+    Cancelling does not interrupt a request in flight, so such a job may still
+    succeed later; its result is then passed to on_late_result, e.g. to clean it up.
+    
+    Raises:
+        Exception: The last error if no job succeeds
+    """
+    pending = {job.future: job for job in jobs}
+    grace_deadline: Optional[float] = None
+    results: List[Any] = []
+    error: Optional[BaseException] = None
+    
+    while pending:
+        # Queued jobs keep their full deadline until they start
+        deadline = max(job.expires_at() for job in pending.values())
+        if grace_deadline is not None:
+            deadline = min(deadline, grace_deadline)
+        done, _ = wait(list(pending), timeout=max(deadline - time.time(), 0), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            job = pending.pop(future)
+            try:
+                results.append(job.result(timeout=0))
+                if grace_deadline is None:
+                    grace_deadline = time.time() + grace
+            except Exception as e:
+                logger.warning(f"Image job failed: {str(e)}")
+                error = e
+                
+    for job in pending.values():
+        job.cancel()
+        if on_late_result:
+            job.future.add_done_callback(lambda future: _late_result(future, on_late_result))
+        
+    if not results:
+        raise error or ImageJobTimeout("No image job finished in time")
+    if pending:
+        logger.info(f"Stopped waiting for {len(pending)} slower image jobs")
+    return results
+
+
+def _late_result(future: Future, on_late_result: Callable[[Any], None]) -> None:
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        on_late_result(future.result())
+    except Exception as e:
+        logger.error(f"Error handling late image job result: {str(e)}")
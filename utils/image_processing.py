@@ -0,0 +1,155 @@
+import os
+from typing import Dict, Any, List, Optional, Tuple
+from PIL import Image, ImageFilter, features
+
+# Pillow format names and MIME types of the responsive image formats
+PIL_FORMATS = {"avif": "AVIF", "webp": "WEBP", "jpeg": "JPEG"}
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+FILE_EXTENSIONS = {"avif": "avif", "webp": "webp", "jpeg": "jpg", "png": "png"}
+CONTENT_TYPES = {"image/png": "png", "image/jpeg": "jpeg", "image/jpg": "jpeg", "image/webp": "webp", "image/avif": "avif"}
+
+
+def sniff_image_format(header: bytes, content_type: Optional[str] = None) -> Optional[str]:
+    """
+    Identify an encoded image without decoding it.
+    
+    Args:
+        header: The first bytes of the file (16 are enough)
+        content_type: The Content-Type the bytes were served with, used if the magic bytes are not recognized
+        
+    Returns:
+        "png", "jpeg", "webp" or "avif", or None if the bytes are not a known image format
+    """
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    if header[4:12] in (b"ftypavif", b"ftypavis"):
+        return "avif"
+    return CONTENT_TYPES.get((content_type or "").split(";")[0].strip().lower())
+
+
+def generation_size(output_size: Tuple[int, int], scale: float, multiple: int = 64) -> Tuple[int, int]:
+    """
+    Return the resolution to generate at for a quality tier.
+    
+    Args:
+        output_size: The final (width, height)
+        scale: Fraction of the final resolution to generate at
+        multiple: Diffusion models expect sides that are multiples of this
+        
+    Returns:
+        The scaled (width, height), rounded to the nearest multiple
+    """
+    return tuple(max(round(side * scale / multiple) * multiple, multiple) for side in output_size)
+
+
+def upscale_image(image: Image.Image, size: Tuple[int, int], sharpen: bool = False) -> Image.Image:
+    """
+    Resize an image to the output size with Lanczos resampling.
+    
+    Args:
+        image: The generated image
+        size: The output (width, height)
+        sharpen: Apply a mild unsharp mask to restore edge contrast lost in upscaling
+        
+    Returns:
+        The resized image (the input itself if it already has the output size)
+    """
+    if image.size == tuple(size):
+        return image
+        
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+        
+    upscaled = image.resize(tuple(size), Image.LANCZOS)
+    if sharpen and upscaled.width > image.width:
+        upscaled = upscaled.filter(ImageFilter.UnsharpMask(radius=2, percent=60, threshold=2))
+    return upscaled
+
+
+def supported_formats(formats: List[str]) -> List[str]:
+    """
+    Return the formats this Pillow build can encode.
+    """
+    supported = []
+    for fmt in formats:
+        try:
+            if fmt == "jpeg" or features.check(fmt):
+                supported.append(fmt)
+        except ValueError:
+            # Older Pillow versions do not know the feature at all
+            continue
+    return supported
+
+
+def _save_atomic(image: Image.Image, path: str, fmt: str, quality: int) -> None:
+    options = {"quality": quality}
+    if fmt == "jpeg":
+        options.update(optimize=True, progressive=True)
+    tmp_path = f"{path}.tmp"
+    image.save(tmp_path, format=PIL_FORMATS[fmt], **options)
+    os.replace(tmp_path, path)
+
+
+def create_responsive_variants(source_path: str,
+                               output_dir: str,
+                               widths: List[int],
+                               formats: List[str],
+                               quality: int = 80,
+                               thumbnail_size: Tuple[int, int] = (320, 320)) -> Dict[str, Any]:
+    """
+    Write compressed copies of an image at several widths, plus a thumbnail.
+    
+    Every width is written in each supported modern format and as a JPEG fallback.
+    Files that already exist are reused, since image file names are content-addressed.
+    
+    Args:
+        source_path: The full-size image
+        output_dir: Directory to write the variants to
+        widths: Target widths; widths above the source width are capped to it
+        formats: Modern formats to write ("avif", "webp"), skipped if unsupported
+        quality: Encoder quality (0-100)
+        thumbnail_size: Bounding box of the thumbnail
+        
+    Returns:
+        Dictionary with the source "width" and "height", "variants" per format
+        (lists of {"width", "height", "filename"}, smallest first) and the "thumbnail" file name
+    """
+    image = Image.open(source_path)
+    image.load()
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+        
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    output_formats = [fmt for fmt in supported_formats(formats) if fmt != "jpeg"] + ["jpeg"]
+    variants: Dict[str, List[Dict[str, Any]]] = {fmt: [] for fmt in output_formats}
+    
+    for width in sorted({min(w, image.width) for w in widths}):
+        height = round(image.height * width / image.width)
+        resized = None
+        for fmt in output_formats:
+            filename = f"{stem}-{width}w.{FILE_EXTENSIONS[fmt]}"
+            path = os.path.join(output_dir, filename)
+            if not os.path.exists(path):
+                # Resize once per width, only if a file is actually missing
+                if resized is None:
+                    resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                _save_atomic(resized, path, fmt, quality)
+            variants[fmt].append({"width": width, "height": height, "filename": filename})
+            
+    thumbnail_filename = f"{stem}-thumb.jpg"
+    thumbnail_path = os.path.join(output_dir, thumbnail_filename)
+    if not os.path.exists(thumbnail_path):
+        thumbnail = image.copy()
+        thumbnail.thumbnail(thumbnail_size, Image.LANCZOS)
+        _save_atomic(thumbnail, thumbnail_path, "jpeg", quality)
+        
+    return {
+        "width": image.width,
+        "height": image.height,
+        "variants": variants,
+        "thumbnail": thumbnail_filename
+    }
@@ -0,0 +1,162 @@
+import math
+from typing import Dict, Any, List, Tuple
+import numpy as np
+from PIL import Image
+
+# Relative weight of each quality signal; the "clean" and "noise" gates multiply their sum
+SCORE_WEIGHTS = {
+    "contrast": 0.3,
+    "sharpness": 0.4,
+    "detail": 0.3
+}
+
+# Images are scored on a downscaled grayscale copy, still large enough to resolve small text
+SCORING_SIZE = 512
+
+# Grayscale standard deviation below which an image counts as blank
+BLANK_STD_THRESHOLD = 6.0
+
+# Gradient magnitude above which a pixel counts as an edge
+EDGE_THRESHOLD = 40.0
+
+# Preferred fraction of edge pixels: flatter images look empty, busier ones noisy
+IDEAL_EDGE_RANGE = (0.02, 0.25)
+
+# Laplacian variance treated as fully sharp
+SHARPNESS_TARGET = 1000.0
+
+# Ratio of fine detail (Laplacian std) to overall contrast above which an image looks like noise
+NOISE_RATIO = 1.5
+
+# The image is split into a grid of tiles to find dense local clusters of edges
+TILE_GRID = 8
+
+
+def _grayscale(image: Image.Image) -> np.ndarray:
+    image = image.convert("L")
+    image.thumbnail((SCORING_SIZE, SCORING_SIZE), Image.BILINEAR)
+    return np.asarray(image, dtype=np.float32)
+
+
+def _laplacian(pixels: np.ndarray) -> np.ndarray:
+    return (pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:]
+            - 4 * pixels[1:-1, 1:-1])
+
+
+def _edge_map(pixels: np.ndarray) -> np.ndarray:
+    dx = np.abs(np.diff(pixels, axis=1))[:-1, :]
+    dy = np.abs(np.diff(pixels, axis=0))[:, :-1]
+    return (dx + dy) > EDGE_THRESHOLD
+
+
+def contrast_score(pixels: np.ndarray) -> float:
+    """
+    Score the global contrast; blank and near-uniform images score 0.
+    """
+    std = float(pixels.std())
+    if std < BLANK_STD_THRESHOLD:
+        return 0.0
+    return min(std / 50.0, 1.0)
+
+
+def sharpness_score(pixels: np.ndarray) -> float:
+    """
+    Score the sharpness as the variance of the Laplacian, on a log scale.
+    """
+    variance = float(_laplacian(pixels).var())
+    return min(math.log1p(variance) / math.log1p(SHARPNESS_TARGET), 1.0)
+    
+
+def noise_score(pixels: np.ndarray) -> float:
+    """
+    Gate out noise: 1 for natural images, falling to 0 as fine detail outweighs
+    the overall contrast.
+    
+    Natural images have most of their energy in coarse structure, so their
+    Laplacian is small compared to their contrast.
+    """
+    ratio = float(_laplacian(pixels).std()) / max(float(pixels.std()), 1.0)
+    if ratio <= NOISE_RATIO:
+        return 1.0
+    return max(0.0, 1.0 - (ratio - NOISE_RATIO) / NOISE_RATIO)
+
+
+def detail_score(edges: np.ndarray) -> float:
+    """
+    Score the fraction of edge pixels against the preferred range.
+    """
+    density = float(edges.mean())
+    low, high = IDEAL_EDGE_RANGE
+    if low <= density <= high:
+        return 1.0
+    if density < low:
+        return density / low
+    return max(0.0, 1.0 - (density - high) / high)
+
+
+def clean_score(edges: np.ndarray) -> float:
+    """
+    Gate out text- or watermark-like regions: tiles with far more edges than the image as a whole.
+    """
+    height, width = edges.shape
+    tile_h, tile_w = height // TILE_GRID, width // TILE_GRID
+    if not tile_h or not tile_w:
+        return 1.0
+        
+    tiles = edges[:tile_h * TILE_GRID, :tile_w * TILE_GRID].reshape(TILE_GRID, tile_h, TILE_GRID, tile_w)
+    densities = tiles.mean(axis=(1, 3))
+    excess = float(densities.max() - np.median(densities))
+    return 1.0 - min(max(excess - 0.05, 0.0) / 0.15, 1.0)
+
+
+def score_image(image: Image.Image) -> Dict[str, Any]:
+    """
+    Score a generated image locally using cheap pixel statistics.
+    
+    Args:
+        image: The image to score
+        
+    The weighted quality signals are multiplied by the "clean" and "noise"
+    gates, so an image with text or one that is pure noise cannot make up for
+    it with sharpness or detail.
+    
+    Returns:
+        Dictionary with each signal (0-1), whether the image is "blank" and the
+        "total" (0 for blank images)
+    """
+    pixels = _grayscale(image)
+    edges = _edge_map(pixels)
+    scores = {
+        "contrast": contrast_score(pixels),
+        "sharpness": sharpness_score(pixels),
+        "detail": detail_score(edges),
+        "clean": clean_score(edges),
+        "noise": noise_score(pixels)
+    }
+    blank = scores["contrast"] == 0.0
+    quality = sum(weight * scores[name] for name, weight in SCORE_WEIGHTS.items())
+    scores["total"] = 0.0 if blank else quality * scores["clean"] * scores["noise"]
+    return {**{name: round(value, 3) for name, value in scores.items()}, "blank": blank}
+
+
+def score_image_file(path: str) -> Dict[str, Any]:
+    """
+    Score an image file; see score_image.
+    """
+    with Image.open(path) as image:
+        # Decoding at a reduced size is enough for scoring and much cheaper for JPEGs
+        image.draft("RGB", (SCORING_SIZE, SCORING_SIZE))
+        return score_image(image)
+
+
+def pick_best_image(paths: List[str]) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Pick the best of several candidate image files.
+    
+    Returns:
+        Tuple of (index of the best image, scores of all images); a best total
+        of 0 means no image is usable
+    """
+    scores = [score_image_file(path) for path in paths]
+    best_index = max(range(len(scores)), key=lambda i: scores[i]["total"])
+    return best_index, scores
@@ -0,0 +1,237 @@
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from PIL import Image
+from utils.stable_diffusion_client import StableDiffusionClient
+from utils.image_cache import ImageCache
+from utils.image_processing import upscale_image
+from config import (STABLE_DIFFUSION_MODEL, IMAGE_CACHE_ENABLED, LOCAL_DIFFUSION_DEVICE,
+                    LOCAL_DIFFUSION_ATTENTION_SLICING, LOCAL_DIFFUSION_FAST_SCHEDULER,
+                    LOCAL_DIFFUSION_MAX_STEPS, LOCAL_DIFFUSION_CPU_MAX_SIZE)
+
+logger = logging.getLogger(__name__)
+
+# Loaded pipelines per (model ID, device), kept warm for the lifetime of the process
+_pipelines: Dict[Tuple[str, str], Any] = {}
+_pipeline_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def detect_device() -> str:
+    """
+    Return the best available torch device: "cuda", "mps" or "cpu".
+    """
+    import torch # type: ignore
+    
+    if torch.cuda.is_available():
+        return "cuda"
+    if getattr(torch.backends, "mps", None) and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def _load_pipeline(model_id: str, device: str) -> Any:
+    # diffusers and torch are imported lazily; they are only needed for the local backend
+    import torch # type: ignore
+    from diffusers import AutoPipelineForText2Image, DPMSolverMultistepScheduler # type: ignore
+    
+    logger.info(f"Loading local diffusion pipeline {model_id} on {device}...")
+    dtype = torch.float16 if device == "cuda" else torch.float32
+    pipeline = AutoPipelineForText2Image.from_pretrained(model_id, torch_dtype=dtype)
+    
+    if LOCAL_DIFFUSION_FAST_SCHEDULER:
+        # DPM-Solver++ gives good results in far fewer steps than the default scheduler
+        pipeline.scheduler = DPMSolverMultistepScheduler.from_config(pipeline.scheduler.config)
+        
+    pipeline = pipeline.to(device)
+    
+    if LOCAL_DIFFUSION_ATTENTION_SLICING:
+        pipeline.enable_attention_slicing()
+    if device == "cpu" and hasattr(pipeline, "enable_vae_slicing"):
+        pipeline.enable_vae_slicing()
+        
+    pipeline.set_progress_bar_config(disable=True)
+    logger.info(f"Local diffusion pipeline {model_id} ready")
+    return pipeline
+
+
+def get_pipeline(model_id: str, device: str) -> Tuple[Any, threading.Lock]:
+    """
+    Return the pipeline for a model and device, loading it on first use.
+    
+    Returns:
+        Tuple of (pipeline, lock that must be held while running it)
+    """
+    key = (model_id, device)
+    with _registry_lock:
+        lock = _pipeline_locks.setdefault(key, threading.Lock())
+        
+    # Loading happens under the pipeline lock so concurrent callers wait for one load
+    with lock:
+        if key not in _pipelines:
+            _pipelines[key] = _load_pipeline(model_id, device)
+    return _pipelines[key], lock
+
+
+class LocalDiffusionClient(StableDiffusionClient):
+    """
+    Runs Stable Diffusion in this process with diffusers, behind the same interface
+    as the Hugging Face API client.
+    """
+    backend = "local"
+    # The pipeline returns decoded images, which are saved with save_image
+    streams_bytes = False
+    # Several seeds are rendered as one batch on the pipeline
+    supports_batch = True
+    
+    def __init__(self, device: Optional[str] = LOCAL_DIFFUSION_DEVICE, use_cache: bool = IMAGE_CACHE_ENABLED):
+        """
+        Initialize the local client. The pipeline itself is loaded on first use.
+        
+        Args:
+            device: Torch device ("cuda", "mps" or "cpu"), detected if None
+            use_cache: Reuse images generated earlier with the same model and parameters
+        """
+        self.model_id = STABLE_DIFFUSION_MODEL
+        self.cache = ImageCache() if use_cache else None
+        self._device = device
+        
+        logger.info(f"Initialized local diffusion client with model: {self.model_id}")
+    
+    @property
+    def device(self) -> str:
+        if not self._device:
+            self._device = detect_device()
+        return self._device
+    
+    def warm_up(self) -> None:
+        """
+        Load the pipeline now instead of on the first image.
+        """
+        get_pipeline(self.model_id, self.device)
+    
+    def generate_image(self,
+                       prompt: str,
+                       negative_prompt: str = None,
+                       width: int = 512,
+                       height: int = 512,
+                       num_inference_steps: int = 50,
+                       guidance_scale: float = 7.5,
+                       seed: Optional[int] = None) -> Image.Image:
+        """
+        Generate an image with the local pipeline.
+        
+        On CPU the resolution is scaled down to LOCAL_DIFFUSION_CPU_MAX_SIZE, and the
+        number of steps is capped at LOCAL_DIFFUSION_MAX_STEPS on every device.
+        
+        Returns:
+            PIL Image object
+        """
+        seeds = [seed] if seed is not None else None
+        return self.generate_images(prompt, negative_prompt, width, height, num_inference_steps, guidance_scale, seeds)[0]
+    
+    def generate_images(self,
+                        prompt: str,
+                        negative_prompt: str = None,
+                        width: int = 512,
+                        height: int = 512,
+                        num_inference_steps: int = 50,
+                        guidance_scale: float = 7.5,
+                        seeds: Optional[List[int]] = None) -> List[Image.Image]:
+        """
+        Generate one image per seed in a single batched pipeline call.
+        
+        Returns:
+            List of PIL Image objects, in the order of the seeds (one image if seeds is None)
+        """
+        import torch # type: ignore
+        
+        device = self.device
+        if device == "cpu":
+            width, height = self._fit_size(width, height, LOCAL_DIFFUSION_CPU_MAX_SIZE)
+        steps = min(num_inference_steps, LOCAL_DIFFUSION_MAX_STEPS)
+        
+        generator = None
+        if seeds:
+            # MPS has no generator of its own; CPU generators give the same images there
+            generator_device = "cpu" if device == "mps" else device
+            generator = [torch.Generator(device=generator_device).manual_seed(seed) for seed in seeds]
+            
+        pipeline, lock = get_pipeline(self.model_id, device)
+        logger.info(f"Generating {len(seeds or [None])} image(s) locally ({width}x{height}, {steps} steps on {device}): {prompt[:100]}...")
+        
+        # A pipeline is not safe to run from several threads at once
+        with lock, torch.inference_mode():
+            result = pipeline(
+                prompt=prompt,
+                negative_prompt=negative_prompt,
+                width=width,
+                height=height,
+                num_inference_steps=steps,
+                guidance_scale=guidance_scale,
+                num_images_per_prompt=len(seeds or [None]),
+                generator=generator
+            )
+            
+        logger.info("Image generated successfully")
+        return result.images
+    
+    def generate_image_files(self,
+                             prompt: str,
+                             seeds: List[int],
+                             negative_prompt: str = None,
+                             width: int = 512,
+                             height: int = 512,
+                             num_inference_steps: int = 50,
+                             guidance_scale: float = 7.5,
+                             output_size: Optional[Tuple[int, int]] = None,
+                             sharpen: bool = False) -> List[Dict[str, Any]]:
+        """
+        Generate one image file per seed, rendering the uncached seeds as one batch.
+        
+        Returns:
+            One dictionary per seed, as returned by generate_image_file
+        """
+        output_size = tuple(output_size or (width, height))
+        results: Dict[int, Dict[str, Any]] = {}
+        missing = {}
+        for seed in seeds:
+            key = self._image_key(prompt, negative_prompt, width, height, num_inference_steps, guidance_scale,
+                                  output_size, sharpen, seed)
+            cached = self._cached_image_file(key, f"blog_image_{key[:16]}")
+            if cached:
+                results[seed] = cached
+            else:
+                missing[seed] = key
+                
+        if missing:
+            started = time.perf_counter()
+            images = self.generate_images(prompt, negative_prompt, width, height, num_inference_steps,
+                                          guidance_scale, list(missing))
+            for (seed, key), image in zip(missing.items(), images):
+                image = upscale_image(image, output_size, sharpen=sharpen)
+                image_data = self.save_image(image, f"blog_image_{key[:16]}.png")
+                if self.cache:
+                    self.cache.put_file(key, image_data["full_path"])
+                results[seed] = {**image_data, "cached": False, "cache_key": key}
+                
+            seconds = round(time.perf_counter() - started, 2)
+            logger.info(f"Generated {len(missing)} image candidates in one batch in {seconds:.1f}s")
+            for seed in missing:
+                results[seed]["generation_seconds"] = seconds
+                
+        return [results[seed] for seed in seeds]
+    
+    def max_candidates(self, requested: int) -> int:
+        """
+        Return how many image candidates to generate for a post. A batch costs
+        about as much wall time as one image on a GPU, but scales linearly on CPU.
+        """
+        return 1 if self.device == "cpu" else requested
+    
+    @staticmethod
+    def _fit_size(width: int, height: int, max_size: int) -> Tuple[int, int]:
+        # Scale down to max_size on the longest side, keeping multiples of 8 for the VAE
+        scale = min(1.0, max_size / max(width, height))
+        return max(int(width * scale) // 8 * 8, 64), max(int(height * scale) // 8 * 8, 64)
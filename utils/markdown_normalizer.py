@@ -0,0 +1,186 @@
+import re
+from typing import List
+
+# A prose block longer than this without any heading counts as a structural problem
+MAX_WORDS_WITHOUT_HEADING = 450
+
+# Posts longer than this are expected to have ## section headings
+MIN_WORDS_FOR_SECTIONS = 300
+
+_BULLET_PATTERN = re.compile(r'^\s*(?:[-+*•●▪–]|\d+[.)])\s+')
+_ORDERED_PATTERN = re.compile(r'^\s*(\d+)[.)]\s+(.*)$')
+_HEADING_PATTERN = re.compile(r'^(#{1,6})\s*(.+?)\s*#*\s*$')
+_FENCE_PATTERN = re.compile(r'^\s*(```|~~~)')
+
+
+def _plain(text: str) -> str:
+    # Lowercase text without Markdown decoration, for title comparison
+    text = re.sub(r'^#+\s*', '', text.strip())
+    text = re.sub(r'^title:\s*', '', text, flags=re.IGNORECASE)
+    return re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()
+
+
+def _looks_like_heading(line: str) -> bool:
+    # Short, capitalized line without sentence punctuation, e.g. "Key Challenges Ahead";
+    # a trailing colon introduces what follows, e.g. "Key benefits include:"
+    if len(line) > 80 or len(line.split()) > 12:
+        return False
+    if not re.match(r'^[A-Z0-9]', line) or re.search(r'[.!?,;:]$', line):
+        return False
+    return bool(re.match(r'^[A-Za-z0-9][A-Za-z0-9\s:&\'’()/-]*$', line))
+
+
+def normalize_markdown(content: str, title: str = "") -> str:
+    """
+    Deterministically normalize blog Markdown for HTML generation.
+    
+    - Removes a repeated title at the start of the body
+    - Converts bold-only lines, setext and stand-alone capitalized lines into headings,
+      demoting # headings in the body to ## (the title is rendered separately)
+    - Repairs list markers to "* " and "1. " and keeps lists in their own blocks
+    - Separates headings and paragraphs with single blank lines
+    - Keeps fenced code blocks (``` or ~~~) verbatim
+    
+    Args:
+        content: The Markdown content
+        title: The post title, used to remove duplicated titles
+        
+    Returns:
+        The normalized Markdown
+    """
+    lines = [line.rstrip() for line in content.replace('\r\n', '\n').replace('\r', '\n').split('\n')]
+    
+    # Drop a duplicated title (with or without # or "Title:") before the first real content
+    title_key = _plain(title)
+    while lines and (not lines[0].strip() or (title_key and _plain(lines[0].strip('*')) == title_key)):
+        lines.pop(0)
+        
+    blocks: List[str] = []
+    paragraph: List[str] = []
+    list_items: List[str] = []
+    # Lines of the fenced code block being read, and its fence marker
+    code_lines: List[str] = []
+    fence = ""
+    
+    def flush_paragraph():
+        if paragraph:
+            blocks.append(' '.join(paragraph))
+            paragraph.clear()
+    
+    def flush_list():
+        if list_items:
+            blocks.append('\n'.join(list_items))
+            list_items.clear()
+            
+    for i, raw_line in enumerate(lines):
+        line = raw_line.strip()
+        
+        if fence:
+            code_lines.append(raw_line)
+            if line.startswith(fence):
+                blocks.append('\n'.join(code_lines))
+                code_lines.clear()
+                fence = ""
+            continue
+            
+        fence_match = _FENCE_PATTERN.match(raw_line)
+        if fence_match:
+            flush_paragraph()
+            flush_list()
+            fence = fence_match.group(1)
+            code_lines.append(raw_line)
+            continue
+            
+        previous_blank = i == 0 or not lines[i - 1].strip()
+        next_blank = i == len(lines) - 1 or not lines[i + 1].strip()
+        
+        if not line:
+            flush_paragraph()
+            flush_list()
+            continue
+            
+        # Setext underline (=== or ---) turns the previous paragraph line into a heading;
+        # under prose it is a horizontal rule, which ends the paragraph and is dropped
+        if re.match(r'^(=+|-{3,})$', line):
+            if paragraph and _looks_like_heading(paragraph[-1]):
+                text = paragraph.pop()
+                flush_paragraph()
+                blocks.append(f"{'##' if line.startswith('=') else '###'} {text}")
+            else:
+                flush_paragraph()
+            continue
+            
+        heading = _HEADING_PATTERN.match(line)
+        bold_line = re.match(r'^\*\*([^*]+?)\*\*:?$', line)
+        if heading or bold_line or (previous_blank and next_blank and _looks_like_heading(line) and not _BULLET_PATTERN.match(line)):
+            flush_paragraph()
+            flush_list()
+            if heading:
+                level = max(len(heading.group(1)), 2)
+                text = heading.group(2).strip().strip('*').strip()
+            else:
+                level = 2
+                text = bold_line.group(1).strip() if bold_line else line
+            text = re.sub(r'^title:\s*', '', text, flags=re.IGNORECASE)
+            if title_key and _plain(text) == title_key:
+                continue
+            blocks.append(f"{'#' * min(level, 4)} {text}")
+            continue
+            
+        bullet = _BULLET_PATTERN.match(line)
+        if bullet:
+            flush_paragraph()
+            ordered = _ORDERED_PATTERN.match(line)
+            # Start a new list when switching between ordered and unordered items
+            if list_items and list_items[-1].startswith('* ') == bool(ordered):
+                flush_list()
+            if ordered:
+                list_items.append(f"{ordered.group(1)}. {ordered.group(2).strip()}")
+            else:
+                list_items.append(f"* {line[bullet.end():].strip()}")
+            continue
+            
+        if list_items and raw_line.startswith((' ', '\t')):
+            # Indented continuation of the previous list item
+            list_items[-1] += f" {line}"
+            continue
+            
+        flush_list()
+        # Each prose line is its own paragraph, as model output puts one paragraph per line
+        flush_paragraph()
+        paragraph.append(line)
+        
+    flush_paragraph()
+    flush_list()
+    # An unclosed fence keeps the rest of the content verbatim
+    if code_lines:
+        blocks.append('\n'.join(code_lines))
+    
+    return '\n\n'.join(blocks)
+
+
+def structure_issues(content: str) -> List[str]:
+    """
+    Check normalized Markdown for structural problems that need an LLM formatting pass.
+    
+    Returns:
+        A list of problems (empty if the structure is acceptable)
+    """
+    issues = []
+    # Lines in fenced code blocks (e.g. "# comment") are not headings
+    content = re.sub(r'^(```|~~~).*?(^\1[^\n]*$|\Z)', '', content, flags=re.MULTILINE | re.DOTALL)
+    words = len(content.split())
+    headings = re.findall(r'^(#{2,4}) ', content, flags=re.MULTILINE)
+    
+    if words > MIN_WORDS_FOR_SECTIONS and '##' not in headings:
+        issues.append("no ## section headings")
+        
+    for block in re.split(r'^#{1,6} .*$', content, flags=re.MULTILINE):
+        if len(block.split()) > MAX_WORDS_WITHOUT_HEADING:
+            issues.append(f"{len(block.split())} words without a heading")
+            break
+            
+    if re.search(r'^#{1,6} .{120,}$', content, flags=re.MULTILINE):
+        issues.append("heading longer than 120 characters")
+        
+    return issues
@@ -0,0 +1,118 @@
+import re
+import html
+from typing import List, Tuple
+
+# Heading level -> opening tag; ## and ### carry the classes styled by the blog template
+HEADING_TAGS = {
+    1: '<h1>',
+    2: '<h2 class="section-heading">',
+    3: '<h3 class="sub-heading">',
+    4: '<h4>'
+}
+
+_HEADING_PATTERN = re.compile(r'^(#{1,4}) (.+)$')
+_UNORDERED_PATTERN = re.compile(r'^\s*[*+-] (.+)$')
+_ORDERED_PATTERN = re.compile(r'^\s*\d+[.)] (.+)$')
+_EMPHASIS_PATTERN = re.compile(r'\*\*|\*')
+
+_EMPHASIS_TAGS = {"**": "strong", "*": "em"}
+
+
+def render_inline(text: str) -> str:
+    """
+    Escape a line of text and render **bold** and *italic* markers.
+    
+    Markers are paired with a stack in one scan, so nesting works and unmatched
+    markers are kept as literal asterisks.
+    """
+    text = html.escape(text, quote=False)
+    parts: List[str] = []
+    # Open markers as (marker, index of its part)
+    stack: List[Tuple[str, int]] = []
+    position = 0
+    
+    for match in _EMPHASIS_PATTERN.finditer(text):
+        parts.append(text[position:match.start()])
+        position = match.end()
+        marker = match.group(0)
+        
+        depth = next((i for i in range(len(stack) - 1, -1, -1) if stack[i][0] == marker), None)
+        if depth is None:
+            stack.append((marker, len(parts)))
+            parts.append(marker)
+            continue
+            
+        # Markers opened after this one stay literal; close any still-open tags inside first
+        del stack[depth + 1:]
+        _, index = stack.pop()
+        parts[index] = f"<{_EMPHASIS_TAGS[marker]}>"
+        parts.append(f"</{_EMPHASIS_TAGS[marker]}>")
+        
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def render_markdown(content: str) -> str:
+    """
+    Render blog Markdown to HTML in a single pass over the lines.
+    
+    Supports # to #### headings, "* "/"- " and "1. " lists, paragraphs separated
+    by blank lines, and **bold** and *italic* text. All text is HTML-escaped.
+    
+    Args:
+        content: The Markdown content
+        
+    Returns:
+        The HTML, one block element per line group
+    """
+    blocks: List[str] = []
+    paragraph: List[str] = []
+    list_tag = ""
+    list_items: List[str] = []
+    
+    def flush_paragraph():
+        if paragraph:
+            blocks.append('<p>' + ' '.join(paragraph) + '</p>')
+            paragraph.clear()
+    
+    def flush_list():
+        nonlocal list_tag
+        if list_items:
+            blocks.append(f'<{list_tag}>\n' + '\n'.join(list_items) + f'\n</{list_tag}>')
+            list_items.clear()
+        list_tag = ""
+        
+    for line in content.replace('\r\n', '\n').split('\n'):
+        stripped = line.strip()
+        if not stripped:
+            flush_paragraph()
+            flush_list()
+            continue
+            
+        heading = _HEADING_PATTERN.match(line)
+        if heading:
+            flush_paragraph()
+            flush_list()
+            level = len(heading.group(1))
+            blocks.append(f'{HEADING_TAGS[level]}{render_inline(heading.group(2).strip())}</h{level}>')
+            continue
+            
+        item = _UNORDERED_PATTERN.match(line)
+        tag = "ul"
+        if not item:
+            item = _ORDERED_PATTERN.match(line)
+            tag = "ol"
+        if item:
+            flush_paragraph()
+            if list_tag != tag:
+                flush_list()
+                list_tag = tag
+            list_items.append(f'<li>{render_inline(item.group(1).strip())}</li>')
+            continue
+            
+        flush_list()
+        paragraph.append(render_inline(stripped))
+        
+    flush_paragraph()
+    flush_list()
+    return '\n'.join(blocks)
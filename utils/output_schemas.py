@@ -0,0 +1,211 @@
+import json
+from typing import Any, Dict, List, Optional
+
+# JSON schemas for structured model outputs (passed to Claude as tool input schemas)
+
+TRENDING_TOPICS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "topics": {
+            "type": "array",
+            "minItems": 1,
+            "maxItems": 10,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string", "minLength": 1, "description": "A concise name for the trending topic"},
+                    "description": {"type": "string", "description": "A brief 2-3 sentence description"},
+                    "why_trending": {"type": "string", "description": "Why this topic is currently relevant or important"},
+                    "keywords": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "3-5 relevant keywords or hashtags"
+                    }
+                },
+                "required": ["title", "description", "why_trending", "keywords"]
+            }
+        }
+    },
+    "required": ["topics"]
+}
+
+IMAGE_PROMPT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "image_prompt": {"type": "string", "minLength": 1, "description": "The detailed description for the image generation model"},
+        "image_description": {"type": "string", "minLength": 1, "description": "A brief caption (10-15 words) for the image"}
+    },
+    "required": ["image_prompt", "image_description"]
+}
+
+BLOG_OUTLINE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string", "minLength": 1, "description": "A compelling headline for the post"},
+        "sections": {
+            "type": "array",
+            "minItems": 3,
+            "maxItems": 8,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "heading": {"type": "string", "minLength": 1, "description": "The section heading"},
+                    "key_points": {
+                        "type": "array",
+                        "minItems": 1,
+                        "items": {"type": "string"},
+                        "description": "The points this section must cover"
+                    },
+                    "target_words": {"type": "integer", "description": "Approximate length of the section in words"}
+                },
+                "required": ["heading", "key_points", "target_words"]
+            }
+        }
+    },
+    "required": ["title", "sections"]
+}
+
+CRITIQUE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scores": {
+            "type": "object",
+            "properties": {
+                "accuracy": {"type": "integer", "description": "Score from 1-10"},
+                "clarity": {"type": "integer", "description": "Score from 1-10"},
+                "structure": {"type": "integer", "description": "Score from 1-10"},
+                "engagement": {"type": "integer", "description": "Score from 1-10"},
+                "completeness": {"type": "integer", "description": "Score from 1-10"},
+                "originality": {"type": "integer", "description": "Score from 1-10"}
+            },
+            "required": ["accuracy", "clarity", "structure", "engagement", "completeness", "originality"]
+        },
+        "critique": {
+            "type": "string",
+            "minLength": 1,
+            "description": "The full written critique with strengths, weaknesses and concrete suggestions for each area"
+        }
+    },
+    "required": ["scores", "critique"]
+}
+
+ASPECT_CRITIQUE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer", "description": "Score for this aspect from 1-10"},
+        "strengths": {"type": "array", "items": {"type": "string"}, "description": "Specific strengths for this aspect"},
+        "findings": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "issue": {"type": "string", "minLength": 1, "description": "A specific weakness"},
+                    "suggestion": {"type": "string", "minLength": 1, "description": "A concrete suggestion for improvement"},
+                    "severity": {"type": "string", "enum": ["high", "medium", "low"]},
+                    "location": {"type": "string", "description": "The ## section heading the issue refers to, or \"whole post\""}
+                },
+                "required": ["issue", "suggestion", "severity"]
+            }
+        }
+    },
+    "required": ["score", "findings"]
+}
+
+EDIT_SCRIPT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "edits": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "op": {
+                        "type": "string",
+                        "enum": ["search_replace", "replace", "insert_after", "delete"],
+                        "description": "search_replace: replace an exact snippet; replace: rewrite the whole paragraph; insert_after: add a new paragraph after it (0 = at the start); delete: remove it"
+                    },
+                    "paragraph": {"type": "integer", "description": "The [P<n>] number of the paragraph in the original post"},
+                    "search": {"type": "string", "description": "Exact text to find in the paragraph (search_replace only)"},
+                    "replace": {"type": "string", "description": "Replacement text (search_replace only)"},
+                    "text": {"type": "string", "description": "New paragraph text (replace and insert_after only)"}
+                },
+                "required": ["op", "paragraph"]
+            }
+        }
+    },
+    "required": ["edits"]
+}
+
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "number": (int, float),
+    "integer": int,
+}
+
+
+def validate_payload(payload: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """
+    Validate a payload against the subset of JSON Schema used in this module.
+    
+    Args:
+        payload: The decoded JSON value
+        schema: The schema to check against
+        path: Location of the payload, used in error messages
+        
+    Returns:
+        A list of human-readable validation errors (empty if valid)
+    """
+    errors = []
+    expected_type = schema.get("type")
+    
+    if expected_type:
+        python_type = _JSON_TYPES[expected_type]
+        # bool is a subclass of int, so exclude it from numeric types
+        if not isinstance(payload, python_type) or (expected_type in ("number", "integer") and isinstance(payload, bool)):
+            return [f"{path}: expected {expected_type}, got {type(payload).__name__}"]
+    
+    if expected_type == "object":
+        for key in schema.get("required", []):
+            if key not in payload:
+                errors.append(f"{path}: missing required field '{key}'")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in payload:
+                errors.extend(validate_payload(payload[key], sub_schema, f"{path}.{key}"))
+    
+    elif expected_type == "array":
+        if "minItems" in schema and len(payload) < schema["minItems"]:
+            errors.append(f"{path}: expected at least {schema['minItems']} items, got {len(payload)}")
+        if "maxItems" in schema and len(payload) > schema["maxItems"]:
+            errors.append(f"{path}: expected at most {schema['maxItems']} items, got {len(payload)}")
+        if "items" in schema:
+            for i, item in enumerate(payload):
+                errors.extend(validate_payload(item, schema["items"], f"{path}[{i}]"))
+    
+    elif expected_type == "string":
+        if "enum" in schema and payload not in schema["enum"]:
+            errors.append(f"{path}: must be one of {', '.join(schema['enum'])}")
+        if "minLength" in schema and len(payload.strip()) < schema["minLength"]:
+            errors.append(f"{path}: must not be empty")
+    
+    return errors
+
+
+def parse_json_payload(text: str) -> Optional[Any]:
+    """
+    Decode the first JSON object in a plain-text model response.
+    
+    Used when the model answers with text instead of a tool call.
+    Returns None if no JSON object can be decoded.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+    
+    try:
+        payload, _ = json.JSONDecoder().raw_decode(text, start)
+        return payload
+    except json.JSONDecodeError:
+        return None
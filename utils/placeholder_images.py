@@ -0,0 +1,115 @@
+import os
+import math
+import hashlib
+import colorsys
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from config import OUTPUT_DIR, IMAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Keywords drawn as soft glows on the placeholder
+MAX_PLACEHOLDER_KEYWORDS = 5
+# The image only has smooth features, so it is rendered at a fraction of its size and upscaled
+RENDER_SCALE = 0.25
+
+
+def placeholder_digest(title: str, keywords: Optional[List[str]] = None) -> bytes:
+    """
+    Hash the title and keywords that determine a placeholder image.
+    """
+    keywords = sorted(str(keyword).lower() for keyword in (keywords or []))
+    payload = "\n".join([(title or "AI Technology").strip().lower()] + keywords)
+    return hashlib.sha256(payload.encode('utf-8')).digest()
+
+
+def _color(hue: float, saturation: float, value: float) -> np.ndarray:
+    return np.array(colorsys.hsv_to_rgb(hue % 1.0, saturation, value), dtype=np.float32)
+
+
+def render_placeholder(title: str,
+                       keywords: Optional[List[str]] = None,
+                       size: Tuple[int, int] = IMAGE_SIZE) -> Image.Image:
+    """
+    Render a hero image from the title and keywords.
+    
+    The image is a two-color gradient with a soft glow per keyword and a faint
+    wave texture. The same title and keywords (in any order) always give the
+    same image, and a 1024x1024 image renders in about ten milliseconds.
+    
+    Args:
+        title: The post title, which picks the palette and gradient direction
+        keywords: The post keywords, each of which places a glow
+        size: Image (width, height)
+        
+    Returns:
+        RGB PIL Image
+    """
+    digest = placeholder_digest(title, keywords)
+    rng = np.random.default_rng(int.from_bytes(digest[:8], "big"))
+    width, height = (max(int(side * RENDER_SCALE), 64) for side in size)
+    
+    # Normalized coordinates, broadcast instead of materializing a full grid
+    u = np.linspace(0.0, 1.0, width, dtype=np.float32)[np.newaxis, :]
+    v = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, np.newaxis]
+    
+    # Analogous palette: two gradient stops and an accent, dark enough for a hero image
+    hue = rng.random()
+    start = _color(hue, 0.65, 0.35)
+    end = _color(hue + rng.uniform(0.08, 0.2), 0.7, 0.75)
+    accent = _color(hue + 0.5, 0.45, 0.95)
+    
+    angle = rng.uniform(0, 2 * math.pi)
+    t = u * math.cos(angle) + v * math.sin(angle)
+    t = (t - t.min()) / max(float(t.max() - t.min()), 1e-6)
+    image = start + (end - start) * t[..., np.newaxis]
+    
+    # A glow per keyword, placed by the keyword itself so it stays put when others change
+    for keyword in sorted(str(keyword).lower() for keyword in (keywords or []))[:MAX_PLACEHOLDER_KEYWORDS]:
+        keyword_digest = hashlib.sha256(keyword.encode('utf-8')).digest()
+        cx, cy = keyword_digest[0] / 255, keyword_digest[1] / 255
+        radius = 0.08 + keyword_digest[2] / 255 * 0.17
+        glow = np.exp(-((u - cx) ** 2 + (v - cy) ** 2) / (2 * radius ** 2)) * 0.35
+        image += (accent - image) * glow[..., np.newaxis]
+        
+    # Faint diagonal waves so the image does not look flat
+    frequency = rng.uniform(3, 7)
+    waves = np.sin(2 * math.pi * (frequency * (u + v) + rng.random())) * 0.025
+    image += waves[..., np.newaxis]
+    
+    pixels = (np.clip(image, 0.0, 1.0) * 255).astype(np.uint8)
+    return Image.fromarray(pixels, "RGB").resize(tuple(size), Image.BICUBIC)
+
+
+def save_placeholder_image(title: str,
+                           keywords: Optional[List[str]] = None,
+                           size: Tuple[int, int] = IMAGE_SIZE,
+                           output_dir: str = OUTPUT_DIR) -> Dict[str, Any]:
+    """
+    Render a placeholder hero image and save it to the output directory.
+    
+    It is saved as JPEG, which keeps smooth gradients small and encodes in a few
+    milliseconds. The file name is derived from the title and keywords, so an
+    existing file is reused.
+    
+    Returns:
+        Dictionary with image path information, with "placeholder" set to True
+    """
+    filename = f"placeholder_{placeholder_digest(title, keywords).hex()[:16]}.jpg"
+    image_path = os.path.join(output_dir, filename)
+    
+    if not os.path.exists(image_path):
+        os.makedirs(output_dir, exist_ok=True)
+        tmp_path = f"{image_path}.tmp"
+        render_placeholder(title, keywords, size).save(tmp_path, format="JPEG", quality=85)
+        os.replace(tmp_path, image_path)
+        logger.info(f"Placeholder image saved to: {image_path}")
+        
+    return {
+        "image_path": f"./outputs/{filename}",
+        "image_filename": filename,
+        "full_path": image_path,
+        "placeholder": True
+    }
@@ -6,18 +6,7 @@ Your task is to identify the most current and trending topics in AI.
 
 Please provide a list of 5 currently trending AI topics based on recent developments.
 
-You MUST format your response as a JSON object with exactly this structure:
-{
-  "trendingTopics": [
-    {
-      "title": "Topic name",
-      "description": "Brief 2-3 sentence description of the topic",
-      "why_trending": "Explanation of why this topic is currently trending or important",
-      "keywords": ["keyword1", "keyword2", "keyword3", "keyword4", "keyword5"]
-    },
-    // Additional topics follow the same format
-  ]
-}
+Record your answer with the provided tool as a list of topics.
 
 For each topic:
 1. title: A concise name for the trending topic
@@ -48,6 +37,47 @@ Guidelines:
 Your tone should be professional yet engaging, authoritative but conversational.
 """
 
+CONTENT_OUTLINE_PROMPT = """
+You are an expert AI content writer planning a blog post about the following AI topic:
+
+TOPIC: {topic}
+
+KEYWORDS: {keywords}
+
+Create an outline for an informative, engaging, and well-structured blog post of approximately {word_count} words:
+1. A compelling headline/title for the post
+2. 4-7 sections in reading order, starting with an introduction and ending with a conclusion
+3. For each section, a heading, the key points it must cover, and its approximate length in words
+4. Cover the current state, relevant examples or applications, challenges, and future directions
+5. Make sure sections do not overlap in the points they cover
+
+Record the outline with the provided tool.
+"""
+
+SECTION_GENERATION_PROMPT = """
+You are an expert AI content writer working on one section of a blog post.
+
+POST TITLE: {title}
+
+KEYWORDS: {keywords}
+
+FULL OUTLINE:
+{outline}
+
+Write ONLY section {section_number}: "{heading}"
+Key points to cover:
+{key_points}
+
+Guidelines:
+1. Write approximately {target_words} words
+2. Do not repeat the section heading and do not write other sections
+3. You may use ### subheadings, lists, and **bold** text where helpful
+4. Flow naturally from the previous section ("{previous_heading}") and lead into the next ("{next_heading}")
+5. Explain complex AI concepts in an accessible way for a technical audience
+
+Your tone should be professional yet engaging, authoritative but conversational.
+"""
+
 SELF_CRITIQUE_PROMPT = """
 You are a content editor specialized in AI topics. Review the following blog post and provide a detailed critique:
 
@@ -69,6 +99,35 @@ For each area, provide:
 - Concrete suggestions for improvement
 
 Remember that constructive criticism is most helpful.
+Record the scores and your full written critique with the provided tool.
+"""
+
+# Aspects evaluated by the parallel critique, with the question each one answers
+CRITIQUE_ASPECTS = {
+    "accuracy": "Are all technical details and explanations correct?",
+    "clarity": "Is the content easy to understand for the target audience?",
+    "structure": "Is the post well-organized with logical flow?",
+    "engagement": "Is the writing style engaging and interesting?",
+    "completeness": "Does it cover the important aspects of the topic?",
+    "originality": "Does it offer unique insights or perspectives?"
+}
+
+ASPECT_CRITIQUE_PROMPT = """
+You are a content editor specialized in AI topics. Review the following blog post for ONE aspect only:
+
+ASPECT: {aspect}
+QUESTION: {question}
+
+BLOG POST:
+{content}
+
+Provide:
+- A score from 1-10 for this aspect
+- Specific examples of strengths
+- The most important weaknesses (at most 5), each with a concrete suggestion, a severity, and where in the post it occurs
+  (the exact ## section heading, or "whole post" if it is not specific to one section)
+
+Ignore issues that belong to other aspects. Record your review with the provided tool.
 """
 
 CONTENT_REFINEMENT_PROMPT = """
@@ -91,6 +150,49 @@ Do not simply acknowledge the critique points - actually implement the suggested
 Provide the complete refined blog post.
 """
 
+CONTENT_EDIT_PROMPT = """
+You are an expert AI content writer. Improve the following blog post based on the provided critique,
+by describing targeted edits instead of rewriting the whole post.
+
+BLOG POST (each paragraph is labeled with its number, e.g. [P3]):
+{numbered_content}
+
+CRITIQUE:
+{critique}
+
+Your task:
+1. Address ALL issues identified in the critique
+2. Change only what the critique calls for; leave everything else untouched
+3. Prefer "search_replace" for small fixes, quoting the search text EXACTLY as it appears in the paragraph
+4. Use "replace" to rewrite a whole paragraph, "insert_after" to add new paragraphs or sections, and "delete" to remove one
+5. Always refer to the ORIGINAL paragraph numbers and do not include the [P<n>] labels in any text
+6. Keep the length approximately the same (around 1200 words)
+
+Record the edits with the provided tool.
+"""
+
+SECTION_REFINEMENT_PROMPT = """
+You are an expert AI content writer. Improve ONE section of a blog post based on the editorial feedback for that section.
+
+BLOG POST TITLE: {title}
+SECTIONS OF THE POST:
+{outline}
+
+SECTION TO IMPROVE:
+{section}
+
+FEEDBACK FOR THIS SECTION:
+{critique}
+
+Your task:
+1. Address ALL issues in the feedback
+2. Keep the section's role in the post and its transitions to the neighbouring sections
+3. Ensure accuracy of all technical information
+4. Keep the length approximately the same (around {word_count} words)
+
+Return only the improved section text, without its ## heading and without any explanations.
+"""
+
 IMAGE_PROMPT_GENERATION = """
 You are a specialist in creating prompts for AI image generation models.
 Based on the following blog post about an AI topic, create a detailed prompt for generating
@@ -107,11 +209,26 @@ Your task:
 5. Do not request text or words in the image
 6. Avoid requesting human faces or realistic human figures
 
-Format your response as a JSON object with two fields:
+Record your answer with the provided tool using two fields:
 - "image_prompt": The detailed description for the image generation model
 - "image_description": A brief caption (10-15 words) for the image that would appear on the blog
 """
 
+STRUCTURED_OUTPUT_REPAIR_PROMPT = """
+The following data was submitted to the "{tool_name}" tool but does not match its schema.
+
+SCHEMA:
+{schema}
+
+SUBMITTED DATA:
+{payload}
+
+VALIDATION ERRORS:
+{errors}
+
+Call the "{tool_name}" tool again with corrected data. Keep all valid values unchanged and fix only the reported problems.
+"""
+
 # HTML_TEMPLATE_PROMPT = """
 # You are designing a simple HTML template for an AI blog post.
 # Create clean, responsive HTML with CSS that:
@@ -0,0 +1,127 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Dict, Any, List, Optional
+from config import RESEARCH_PREFETCH_WORKERS, RESEARCH_PREFETCH_BUDGET, RESEARCH_PREFETCH_TTL
+
+logger = logging.getLogger(__name__)
+
+class ResearchPrefetcher:
+    """
+    Speculatively runs topic research in the background while a topic is being chosen.
+    """
+    def __init__(self,
+                 research_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 max_workers: int = RESEARCH_PREFETCH_WORKERS,
+                 budget: int = RESEARCH_PREFETCH_BUDGET,
+                 ttl: int = RESEARCH_PREFETCH_TTL):
+        """
+        Initialize the prefetcher.
+        
+        Args:
+            research_fn: Function that researches a single topic
+            max_workers: Maximum number of research jobs running at once
+            budget: Maximum number of speculative jobs queued or running at once;
+                    finished results do not count against it
+            ttl: Seconds a finished result may be reused, counted from when it finished
+        """
+        self.research_fn = research_fn
+        self.budget = budget
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="research-prefetch")
+        self._jobs: Dict[str, Future] = {}
+        self._finished_at: Dict[Future, float] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(topic: Dict[str, Any]) -> str:
+        return topic.get("title", "").strip().lower()
+    
+    def prefetch(self, topics: List[Dict[str, Any]]) -> int:
+        """
+        Start background research for the given topics, within the shared budget.
+        Topics already being researched are skipped, and fresh (non-duplicate) topics go first.
+        
+        Returns:
+            Number of newly started jobs
+        """
+        ordered = sorted(topics, key=lambda topic: bool(topic.get("is_duplicate")))
+        started = 0
+        with self._lock:
+            self._expire()
+            active = sum(1 for future in self._jobs.values() if not future.done())
+            for topic in ordered:
+                if active >= self.budget:
+                    break
+                key = self._key(topic)
+                if not key or key in self._jobs:
+                    continue
+                future = self._executor.submit(self.research_fn, topic)
+                future.add_done_callback(self._mark_finished)
+                self._jobs[key] = future
+                active += 1
+                started += 1
+        
+        if started:
+            logger.info(f"Started speculative research for {started} topics")
+        return started
+    
+    def take(self, topic: Dict[str, Any], timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return prefetched research for the selected topic, waiting for it if it is still running.
+        Queued research for other topics is cancelled; finished or running jobs stay cached.
+        
+        Returns:
+            The research result, or None if it was not prefetched or failed
+        """
+        with self._lock:
+            self._expire()
+            future = self._jobs.get(self._key(topic))
+            for key, other in list(self._jobs.items()):
+                if key != self._key(topic) and other.cancel():
+                    self._drop(key)
+        
+        if future is None:
+            return None
+        
+        try:
+            result = future.result(timeout=timeout)
+            logger.info(f"Using prefetched research for: {topic.get('title', '')}")
+            return result
+        except Exception as e:
+            logger.warning(f"Prefetched research unavailable for {topic.get('title', '')}: {str(e)}")
+            with self._lock:
+                if self._jobs.get(self._key(topic)) is future:
+                    self._drop(self._key(topic))
+            return None
+    
+    def cancel_pending(self) -> None:
+        """
+        Cancel all speculative jobs that have not started yet.
+        """
+        with self._lock:
+            for key, future in list(self._jobs.items()):
+                if future.cancel():
+                    self._drop(key)
+    
+    def _mark_finished(self, future: Future) -> None:
+        # Done callback: the TTL runs from when research finished, not from when it was queued
+        self._finished_at[future] = time.time()
+    
+    def _drop(self, key: str) -> None:
+        # Forget a job and its finish time (caller holds the lock)
+        future = self._jobs.pop(key)
+        self._finished_at.pop(future, None)
+    
+    def _expire(self) -> None:
+        # Drop finished results older than the TTL (caller holds the lock)
+        now = time.time()
+        for key, future in list(self._jobs.items()):
+            finished_at = self._finished_at.get(future)
+            if finished_at is not None and now - finished_at > self.ttl:
+                self._drop(key)
+        # Jobs given up on while running still report when they finish
+        tracked = set(self._jobs.values())
+        for future in [future for future in self._finished_at if future not in tracked]:
+            del self._finished_at[future]
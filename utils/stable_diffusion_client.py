@@ -1,26 +1,48 @@
 import os
 import io
+import time
 import base64
+import shutil
+import tempfile
 import requests
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from PIL import Image
-from config import OUTPUT_DIR
+from utils.image_cache import ImageCache, image_cache_key
+from utils.image_processing import upscale_image, sniff_image_format, FILE_EXTENSIONS
+from config import OUTPUT_DIR, IMAGE_CACHE_ENABLED, IMAGE_REQUEST_TIMEOUT, IMAGE_WAIT_FOR_MODEL
 
 logger = logging.getLogger(__name__)
 
+class ModelLoadingError(RuntimeError):
+    """
+    Raised when the Inference API is still loading the model (HTTP 503).
+    """
+    def __init__(self, message: str, estimated_time: Optional[float] = None):
+        super().__init__(message)
+        # Seconds until the model is expected to be ready, as reported by the API
+        self.estimated_time = estimated_time
+
 class StableDiffusionClient:
     """
     Client for interacting with Hugging Face's Stable Diffusion API.
     """
-    def __init__(self, api_token: Optional[str] = None):
+    # Part of the image cache key, so different backends never share images
+    backend = "api"
+    # The API returns encoded image bytes that can be written to disk as they are
+    streams_bytes = True
+    # Whether generate_image_files renders several seeds in one call
+    supports_batch = False
+    
+    def __init__(self, api_token: Optional[str] = None, use_cache: bool = IMAGE_CACHE_ENABLED):
         """
         Initialize the Stable Diffusion client.
         
         Args:
             api_token: Your Hugging Face API token. If None, will attempt to load from 
                       environment variable HF_API_TOKEN or .env file.
+            use_cache: Reuse images generated earlier with the same model and parameters
         """
         # Get API token
         self.api_token = api_token or os.environ.get("HF_API_TOKEN")
@@ -39,6 +61,9 @@ class StableDiffusionClient:
             "Content-Type": "application/json"
         }
         
+        # Content-addressed cache of generated images
+        self.cache = ImageCache() if use_cache else None
+        
         logger.info(f"Initialized Stable Diffusion client with model: {self.model_id}")
     
     def set_model(self, model_id: str) -> None:
@@ -57,7 +82,8 @@ class StableDiffusionClient:
                       width: int = 512, 
                       height: int = 512,
                       num_inference_steps: int = 50,
-                      guidance_scale: float = 7.5) -> Image.Image:
+                      guidance_scale: float = 7.5,
+                      seed: Optional[int] = None) -> Image.Image:
         """
         Generate an image using Stable Diffusion.
         
@@ -68,9 +94,88 @@ class StableDiffusionClient:
             height: Output image height (multiples of 64 recommended)
             num_inference_steps: Number of denoising steps (higher = better quality, slower)
             guidance_scale: How closely to follow the prompt (higher = more faithful)
+            seed: Random seed, for reproducible images and distinct candidates
             
         Returns:
             PIL Image object
+            
+        Raises:
+            ModelLoadingError: If the model is still loading; retry after its estimated_time
+        """
+        response = self._request_image(prompt, negative_prompt, width, height, num_inference_steps, guidance_scale,
+                                       seed=seed)
+        
+        # Get image from response
+        return Image.open(io.BytesIO(response.content))
+    
+    def download_image(self,
+                       prompt: str,
+                       negative_prompt: str = None,
+                       width: int = 512,
+                       height: int = 512,
+                       num_inference_steps: int = 50,
+                       guidance_scale: float = 7.5,
+                       name: Optional[str] = None,
+                       seed: Optional[int] = None) -> Dict[str, str]:
+        """
+        Generate an image and stream the response bytes straight to the output directory.
+        
+        The image is never decoded: its format is sniffed from the magic bytes (or
+        the Content-Type header), and the file is written atomically.
+        
+        Args:
+            name: File name without extension; the extension follows the returned format
+            
+        Returns:
+            Dictionary with image path information (see save_image) and the "format"
+            
+        Raises:
+            ModelLoadingError: If the model is still loading; retry after its estimated_time
+            ValueError: If the response is not a known image format
+        """
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        name = name or f"blog_image_{os.urandom(4).hex()}"
+        
+        response = self._request_image(prompt, negative_prompt, width, height, num_inference_steps,
+                                       guidance_scale, stream=True, seed=seed)
+        fd, tmp_path = tempfile.mkstemp(dir=OUTPUT_DIR, prefix=f"{name}.", suffix=".part")
+        try:
+            with response, os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+                    
+            with open(tmp_path, 'rb') as f:
+                image_format = sniff_image_format(f.read(16), response.headers.get("Content-Type"))
+            if not image_format:
+                raise ValueError(f"Response is not an image (Content-Type: {response.headers.get('Content-Type')})")
+                
+            filename = f"{name}.{FILE_EXTENSIONS[image_format]}"
+            image_path = os.path.join(OUTPUT_DIR, filename)
+            os.replace(tmp_path, image_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+            
+        logger.info(f"Image saved to: {image_path}")
+        return {
+            "image_path": f"./outputs/{filename}",
+            "image_filename": filename,
+            "full_path": image_path,
+            "format": image_format
+        }
+    
+    def _request_image(self,
+                       prompt: str,
+                       negative_prompt: Optional[str],
+                       width: int,
+                       height: int,
+                       num_inference_steps: int,
+                       guidance_scale: float,
+                       stream: bool = False,
+                       seed: Optional[int] = None):
+        """
+        Send the inference request and return the successful response.
         """
         url = f"{self.api_url}/{self.model_id}"
         
@@ -88,30 +193,207 @@ class StableDiffusionClient:
         # Add negative prompt if provided
         if negative_prompt:
             payload["parameters"]["negative_prompt"] = negative_prompt
+            
+        if seed is not None:
+            payload["parameters"]["seed"] = seed
         
+        if IMAGE_WAIT_FOR_MODEL:
+            payload["options"] = {"wait_for_model": True}
+            
         logger.info(f"Generating image with prompt: {prompt[:100]}...")
         
+        response = None
         try:
             # Make the API request
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = requests.post(url, headers=self.headers, json=payload, timeout=IMAGE_REQUEST_TIMEOUT, stream=stream)
+            if response.status_code == 503:
+                raise self._model_loading_error(response)
             response.raise_for_status()
             
-            # Get image from response
-            image = Image.open(io.BytesIO(response.content))
             logger.info("Image generated successfully")
-            
-            return image
+            return response
             
         except requests.exceptions.RequestException as e:
-            if response.status_code == 503:
-                # Model is loading
-                logger.warning("Model is still loading. Try again in a few minutes.")
-            else:
-                logger.error(f"Error generating image: {str(e)}")
+            logger.error(f"Error generating image: {str(e)}")
+            if response is not None:
                 logger.error(f"Response: {response.text}")
             
             raise
     
+    def _model_loading_error(self, response) -> ModelLoadingError:
+        """
+        Build the error for a 503 response, with the estimated load time if the API reports one.
+        """
+        estimated_time = None
+        try:
+            estimated_time = float(response.json().get("estimated_time"))
+        except (ValueError, TypeError, AttributeError):
+            pass
+            
+        logger.warning(f"Model {self.model_id} is loading (estimated time: {estimated_time or 'unknown'}s)")
+        return ModelLoadingError(f"Model {self.model_id} is loading", estimated_time)
+    
+    def generate_image_file(self,
+                            prompt: str,
+                            negative_prompt: str = None,
+                            width: int = 512,
+                            height: int = 512,
+                            num_inference_steps: int = 50,
+                            guidance_scale: float = 7.5,
+                            output_size: Optional[Tuple[int, int]] = None,
+                            sharpen: bool = False,
+                            seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Generate an image and save it to the output directory.
+        
+        The file name is derived from a hash of the model ID and all generation
+        parameters, and an image cached for the same hash is reused without calling the API.
+        When no upscaling is needed the API response is written to disk as it is,
+        without decoding and re-encoding it.
+        
+        Args:
+            output_size: Size to upscale the generated image to locally, if it differs
+                         from width and height
+            sharpen: Sharpen the image after upscaling
+            seed: Random seed; None lets the backend pick one
+            
+        Returns:
+            Dictionary with image path information (see save_image), whether the
+            image came from the cache, its "cache_key" if it was generated, and
+            the seconds it took
+        """
+        output_size = tuple(output_size or (width, height))
+        key = self._image_key(prompt, negative_prompt, width, height, num_inference_steps, guidance_scale,
+                              output_size, sharpen, seed)
+        name = f"blog_image_{key[:16]}"
+        
+        cached = self._cached_image_file(key, name)
+        if cached:
+            logger.info(f"Using cached image for prompt: {prompt[:100]}...")
+            return cached
+                
+        started = time.perf_counter()
+        if self.streams_bytes and output_size == (width, height):
+            # Nothing to transform, so keep the encoded bytes the API returned
+            image_data = self.download_image(
+                prompt=prompt,
+                negative_prompt=negative_prompt,
+                width=width,
+                height=height,
+                num_inference_steps=num_inference_steps,
+                guidance_scale=guidance_scale,
+                name=name,
+                seed=seed
+            )
+            finished = time.perf_counter()
+            logger.info(f"Image {width}x{height} ({num_inference_steps} steps) generated and saved "
+                        f"as {image_data['format']} in {finished - started:.1f}s")
+        else:
+            image = self.generate_image(
+                prompt=prompt,
+                negative_prompt=negative_prompt,
+                width=width,
+                height=height,
+                num_inference_steps=num_inference_steps,
+                guidance_scale=guidance_scale,
+                seed=seed
+            )
+            generated = time.perf_counter()
+        
+            image = upscale_image(image, output_size, sharpen=sharpen)
+            image_data = self.save_image(image, f"{name}.png")
+            finished = time.perf_counter()
+        
+            logger.info(f"Image {width}x{height} ({num_inference_steps} steps) generated in {generated - started:.1f}s, "
+                        f"upscaled to {output_size[0]}x{output_size[1]} and saved in {finished - generated:.1f}s")
+        
+        if self.cache:
+            self.cache.put_file(key, image_data["full_path"])
+            
+        return {**image_data, "cached": False, "cache_key": key, "generation_seconds": round(finished - started, 2)}
+    
+    def generate_image_files(self,
+                             prompt: str,
+                             seeds: List[int],
+                             **kwargs) -> List[Dict[str, Any]]:
+        """
+        Generate one image file per seed; see generate_image_file for the other arguments.
+        
+        The API takes one image per request, so this generates them one after the
+        other. Run separate jobs per seed to generate them concurrently.
+        """
+        return [self.generate_image_file(prompt, seed=seed, **kwargs) for seed in seeds]
+    
+    def max_candidates(self, requested: int) -> int:
+        """
+        Return how many image candidates to generate for a post; concurrent API
+        requests cost about as much wall time as one.
+        """
+        return requested
+    
+    def _image_key(self,
+                   prompt: str,
+                   negative_prompt: Optional[str],
+                   width: int,
+                   height: int,
+                   num_inference_steps: int,
+                   guidance_scale: float,
+                   output_size: Tuple[int, int],
+                   sharpen: bool,
+                   seed: Optional[int]) -> str:
+        """
+        Build the image cache key from the model, backend and all generation parameters.
+        """
+        parameters = {
+            "backend": self.backend,
+            "prompt": prompt,
+            "negative_prompt": negative_prompt or "",
+            "width": width,
+            "height": height,
+            "num_inference_steps": num_inference_steps,
+            "guidance_scale": guidance_scale,
+            "output_size": list(output_size),
+            "sharpen": sharpen
+        }
+        # Unseeded images keep the keys they had before seeds were supported
+        if seed is not None:
+            parameters["seed"] = seed
+        return image_cache_key(self.model_id, parameters)
+    
+    def _cached_image_file(self, key: str, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Publish the cached image for a key to the output directory, if there is one.
+        """
+        if not self.cache:
+            return None
+            
+        cached_path = self.cache.get(key)
+        if not cached_path:
+            return None
+            
+        filename = name + os.path.splitext(cached_path)[1]
+        return {**self._publish_cached_image(cached_path, filename), "cached": True, "generation_seconds": 0.0}
+    
+    def _publish_cached_image(self, cached_path: str, filename: str) -> Dict[str, str]:
+        """
+        Make a cached image available in the output directory.
+        """
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        image_path = os.path.join(OUTPUT_DIR, filename)
+        
+        if not os.path.exists(image_path):
+            try:
+                # A hard link avoids copying the bytes when both are on one filesystem
+                os.link(cached_path, image_path)
+            except OSError:
+                shutil.copyfile(cached_path, image_path)
+                
+        return {
+            "image_path": f"./outputs/{filename}",
+            "image_filename": filename,
+            "full_path": image_path
+        }
+    
     def save_image(self, image: Image.Image, filename: str = None) -> Dict[str, str]:
         """
         Save a generated image to a file.
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Any, List, Optional
+from config import TOPIC_CACHE_PATH, TOPIC_REFRESH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class TopicCache:
+    """
+    Versioned snapshot of trending topics, kept warm by an optional background refresher.
+    """
+    def __init__(self,
+                 discover_fn: Callable[[], List[Dict[str, Any]]],
+                 path: str = TOPIC_CACHE_PATH,
+                 refresh_interval: int = TOPIC_REFRESH_INTERVAL):
+        """
+        Initialize the topic cache.
+        
+        Args:
+            discover_fn: Function that discovers topics, raising on failure
+            path: JSON file the snapshot is persisted to
+            refresh_interval: Seconds after which a snapshot is considered stale
+        """
+        self.discover_fn = discover_fn
+        self.path = path
+        self.refresh_interval = refresh_interval
+        
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._loaded_mtime: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def get_snapshot(self) -> Optional[Dict[str, Any]]:
+        """
+        Return the latest snapshot, loading it from disk if needed.
+        
+        Returns:
+            Dictionary with version, created_at, timestamp and topics, or None
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return self._snapshot
+        if mtime == self._loaded_mtime:
+            return self._snapshot
+        
+        disk_snapshot = self._load()
+        self._loaded_mtime = mtime
+        if disk_snapshot and (self._snapshot is None or disk_snapshot["version"] > self._snapshot["version"]):
+            # Another process (e.g. a running Streamlit app) may have refreshed the file
+            self._snapshot = disk_snapshot
+        return self._snapshot
+    
+    def is_stale(self, snapshot: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Check whether a snapshot is missing or older than the refresh interval.
+        """
+        snapshot = snapshot if snapshot is not None else self.get_snapshot()
+        if not snapshot:
+            return True
+        return time.time() - snapshot.get("timestamp", 0) > self.refresh_interval
+    
+    def get_topics(self, force_refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Return cached topics, only blocking on discovery if there is no snapshot,
+        a refresh is explicitly requested, or the snapshot is stale and no
+        background refresher is running to update it.
+        """
+        snapshot = self.get_snapshot()
+        if snapshot and not force_refresh:
+            if not self.is_stale(snapshot) or self.is_refreshing_in_background():
+                return snapshot["topics"]
+        
+            # Nothing else keeps the snapshot fresh (e.g. the CLI), so refresh it now
+            try:
+                return self.refresh(only_if_stale=True)["topics"]
+            except Exception as e:
+                logger.error(f"Topic refresh failed, using the stale snapshot: {str(e)}")
+                return snapshot["topics"]
+    
+        return self.refresh(only_if_stale=not force_refresh)["topics"]
+    
+    def refresh(self, only_if_stale: bool = False) -> Dict[str, Any]:
+        """
+        Run topic discovery and store a new snapshot version.
+        
+        Args:
+            only_if_stale: Skip discovery if another caller stored a fresh snapshot
+                           while this one was waiting for the lock
+            
+        Returns:
+            The stored snapshot
+        """
+        with self._refresh_lock:
+            current = self.get_snapshot()
+            if only_if_stale and not self.is_stale(current):
+                return current
+            
+            logger.info("Refreshing trending topic snapshot...")
+            topics = self.discover_fn()
+            
+            snapshot = {
+                "version": (current["version"] if current else 0) + 1,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "timestamp": time.time(),
+                "topics": topics
+            }
+            self._save(snapshot)
+            self._snapshot = snapshot
+            logger.info(f"Stored trending topic snapshot v{snapshot['version']} with {len(topics)} topics")
+            return snapshot
+    
+    def start_background_refresh(self) -> None:
+        """
+        Start a daemon thread that refreshes the snapshot whenever it becomes stale.
+        """
+        if self.is_refreshing_in_background():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="topic-cache-refresher", daemon=True)
+        self._thread.start()
+        logger.info("Started background topic refresher")
+    
+    def is_refreshing_in_background(self) -> bool:
+        """
+        Check whether the background refresher thread is running.
+        """
+        return bool(self._thread and self._thread.is_alive())
+    
+    def stop_background_refresh(self) -> None:
+        """
+        Stop the background refresher.
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+    
+    def _refresh_loop(self) -> None:
+        while not self._stop_event.is_set():
+            snapshot = self.get_snapshot()
+            if self.is_stale(snapshot):
+                try:
+                    self.refresh()
+                    snapshot = self._snapshot
+                except Exception as e:
+                    # Keep serving the previous snapshot and retry on the next tick
+                    logger.error(f"Background topic refresh failed: {str(e)}")
+            
+            # Wake up when the current snapshot is due, but retry failures within a few minutes
+            if snapshot and not self.is_stale(snapshot):
+                wait = snapshot["timestamp"] + self.refresh_interval - time.time()
+            else:
+                wait = min(300, self.refresh_interval)
+            self._stop_event.wait(max(wait, 1))
+    
+    def _load(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if isinstance(snapshot, dict) and snapshot.get("topics"):
+                return snapshot
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not read topic snapshot {self.path}: {str(e)}")
+        return None
+    
+    def _save(self, snapshot: Dict[str, Any]) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Write to a temporary file first so readers never see a partial snapshot
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving topic snapshot: {str(e)}")
@@ -0,0 +1,166 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from config import TOPIC_STORE_PATH, DUPLICATE_SIMILARITY_THRESHOLD, DUPLICATE_LOOKBACK_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Common words that carry no topical signal
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "into", "is",
+    "it", "its", "of", "on", "or", "that", "the", "their", "this", "to", "with", "ai",
+    "artificial", "intelligence", "new", "using", "can", "like", "such", "more", "what", "why"
+}
+
+# Relative weight of each topic field in the similarity score
+FIELD_WEIGHTS = {"title": 0.5, "keywords": 0.3, "description": 0.2}
+
+# Maximum number of records kept per list
+MAX_RECORDS = 1000
+
+
+def _tokenize(text: str) -> List[str]:
+    # Split CamelCase keywords like "GenerativeAI" into separate words
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
+    words = re.findall(r'[a-z0-9]+', text.lower())
+    # Drop a plural "s" so "agents" matches "agent"
+    words = [w[:-1] if len(w) > 3 and w.endswith('s') and not w.endswith('ss') else w for w in words]
+    return sorted({w for w in words if w not in STOPWORDS and len(w) > 1})
+
+
+def fingerprint_topic(topic: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Build a fingerprint of normalized word sets for a topic's title, keywords and description.
+    """
+    keywords = topic.get("keywords", [])
+    if isinstance(keywords, list):
+        keywords = " ".join(str(k) for k in keywords)
+    
+    return {
+        "title": _tokenize(topic.get("title", "")),
+        "keywords": _tokenize(str(keywords)),
+        "description": _tokenize(topic.get("description", ""))
+    }
+
+
+def topic_similarity(fingerprint_a: Dict[str, List[str]], fingerprint_b: Dict[str, List[str]]) -> float:
+    """
+    Weighted Jaccard similarity (0-1) between two topic fingerprints.
+    Fields that are empty on either side are left out of the weighting.
+    """
+    score = 0.0
+    total_weight = 0.0
+    for field, weight in FIELD_WEIGHTS.items():
+        a = set(fingerprint_a.get(field, []))
+        b = set(fingerprint_b.get(field, []))
+        if not a or not b:
+            continue
+        score += weight * len(a & b) / len(a | b)
+        total_weight += weight
+    
+    return score / total_weight if total_weight else 0.0
+
+
+class TopicStore:
+    """
+    Local JSON store of discovered topics and published posts, used to avoid repeat posts.
+    """
+    def __init__(self, path: str = TOPIC_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = self._load()
+    
+    def record_topics(self, topics: List[Dict[str, Any]]) -> None:
+        """
+        Remember discovered topic candidates.
+        """
+        now = time.time()
+        with self._lock:
+            for topic in topics:
+                self._data["topics"].append({
+                    "title": topic.get("title", ""),
+                    "fingerprint": fingerprint_topic(topic),
+                    "timestamp": now
+                })
+            self._data["topics"] = self._data["topics"][-MAX_RECORDS:]
+            self._save()
+    
+    def record_post(self, topic: Dict[str, Any], title: str, html_path: str = "") -> None:
+        """
+        Remember a published post so future candidates can be checked against it.
+        """
+        with self._lock:
+            self._data["posts"].append({
+                "title": title,
+                "topic_title": topic.get("title", ""),
+                "html_path": html_path,
+                "fingerprint": fingerprint_topic({**topic, "title": f"{topic.get('title', '')} {title}"}),
+                "published_at": datetime.now().isoformat(timespec="seconds"),
+                "timestamp": time.time()
+            })
+            self._data["posts"] = self._data["posts"][-MAX_RECORDS:]
+            self._save()
+        logger.info(f"Recorded published post: {title}")
+    
+    def recent_posts(self, days: int = DUPLICATE_LOOKBACK_DAYS) -> List[Dict[str, Any]]:
+        """
+        Return posts published within the given number of days.
+        """
+        cutoff = time.time() - days * 24 * 60 * 60
+        with self._lock:
+            return [post for post in self._data["posts"] if post.get("timestamp", 0) >= cutoff]
+    
+    def score_topics(self,
+                     topics: List[Dict[str, Any]],
+                     threshold: float = DUPLICATE_SIMILARITY_THRESHOLD,
+                     days: int = DUPLICATE_LOOKBACK_DAYS) -> List[Dict[str, Any]]:
+        """
+        Score topic candidates against recently published posts.
+        
+        Returns copies of the topics with "similarity", "similar_post" and
+        "is_duplicate" fields added.
+        """
+        posts = self.recent_posts(days)
+        scored = []
+        for topic in topics:
+            fingerprint = fingerprint_topic(topic)
+            best_score = 0.0
+            best_post: Optional[Dict[str, Any]] = None
+            for post in posts:
+                score = topic_similarity(fingerprint, post["fingerprint"])
+                if score > best_score:
+                    best_score, best_post = score, post
+            
+            scored.append({
+                **topic,
+                "similarity": round(best_score, 3),
+                "similar_post": best_post["title"] if best_post else "",
+                "is_duplicate": best_score >= threshold
+            })
+        return scored
+    
+    def _load(self) -> Dict[str, List[Dict[str, Any]]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return {"topics": data.get("topics", []), "posts": data.get("posts", [])}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not read topic store {self.path}: {str(e)}")
+        return {"topics": [], "posts": []}
+    
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving topic store: {str(e)}")
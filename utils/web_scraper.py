@@ -1,15 +1,106 @@
 import requests
 import json
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from bs4 import BeautifulSoup
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import time
 import logging
-from config import SERPER_API_KEY, USER_AGENT, REQUEST_TIMEOUT
+from config import SERPER_API_KEY, USER_AGENT, REQUEST_TIMEOUT, HTML_PARSER_WORKERS
 
 logger = logging.getLogger(__name__)
 
+# Process pools shared by every scraper in this process, keyed by worker count
+_parser_pools: Dict[int, ProcessPoolExecutor] = {}
+_parser_pools_lock = threading.Lock()
+
+
+def extract_page_text(raw_html: bytes, max_chars: int = 8000) -> str:
+    """
+    Parse raw HTML bytes and return the cleaned main text.
+    
+    Kept at module level so it can be pickled and run in a worker process.
+    
+    Args:
+        raw_html: The page body as downloaded
+        max_chars: Maximum number of characters to keep
+        
+    Returns:
+        The extracted text, one phrase per line
+    """
+    soup = BeautifulSoup(raw_html, 'html5lib')
+    
+    # Remove script and style elements
+    for script in soup(["script", "style", "header", "footer", "nav"]):
+        script.extract()
+    
+    # Get text
+    text = soup.get_text(separator='\n')
+    
+    # Break into lines and remove leading and trailing space
+    lines = (line.strip() for line in text.splitlines())
+    # Break multi-headlines into a line each
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    # Drop blank lines
+    text = '\n'.join(chunk for chunk in chunks if chunk)
+    
+    # Limit to a reasonable length
+    return text[:max_chars]
+
+
+def _get_parser_pool(workers: int) -> Optional[ProcessPoolExecutor]:
+    """
+    Return the shared parser pool for the given size, creating it on first use.
+    """
+    if workers <= 0:
+        return None
+    
+    with _parser_pools_lock:
+        pool = _parser_pools.get(workers)
+        if pool is None:
+            # Spawn fresh interpreters: forking a process that already runs threads
+            # (Streamlit, boto3, the image jobs) can copy held locks into the children
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _parser_pools[workers] = pool
+            logger.info(f"Started HTML parser pool with {workers} workers")
+        return pool
+
+
+def _discard_parser_pool(workers: int) -> None:
+    """
+    Drop a broken parser pool so the next call starts a fresh one.
+    """
+    with _parser_pools_lock:
+        pool = _parser_pools.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+@atexit.register
+def shutdown_parser_pools() -> None:
+    """
+    Shut down all HTML parser pools.
+    """
+    with _parser_pools_lock:
+        pools = list(_parser_pools.values())
+        _parser_pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False)
+
+
 class WebScraper:
-    def __init__(self):
+    def __init__(self, parser_workers: int = HTML_PARSER_WORKERS):
+        """
+        Initialize the web scraper.
+        
+        Args:
+            parser_workers: Number of worker processes used for HTML parsing.
+                            Use 0 to parse on the calling thread.
+        """
+        self.parser_workers = parser_workers
         self.headers = {
             'User-Agent': USER_AGENT,
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -57,32 +148,36 @@ class WebScraper:
             logger.error(f"Error during Google search: {str(e)}")
             return []
     
+    def download_page(self, url: str) -> bytes:
+        """
+        Download the raw body of a webpage.
+        """
+        response = requests.get(url, headers=self.headers, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+    
+    def parse_page_content(self, raw_html: bytes) -> str:
+        """
+        Extract the main text from raw HTML, using the parser pool when enabled.
+        """
+        pool = _get_parser_pool(self.parser_workers)
+        if pool is None:
+            return extract_page_text(raw_html)
+        
+        try:
+            return pool.submit(extract_page_text, raw_html).result()
+        except BrokenProcessPool:
+            logger.warning("HTML parser pool is broken, parsing inline instead")
+            _discard_parser_pool(self.parser_workers)
+            return extract_page_text(raw_html)
+    
     def fetch_page_content(self, url: str) -> str:
         """
         Fetch and extract the main content from a webpage.
         """
         try:
-            response = requests.get(url, headers=self.headers, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html5lib')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style", "header", "footer", "nav"]):
-                script.extract()
-            
-            # Get text
-            text = soup.get_text(separator='\n')
-            
-            # Break into lines and remove leading and trailing space
-            lines = (line.strip() for line in text.splitlines())
-            # Break multi-headlines into a line each
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            # Drop blank lines
-            text = '\n'.join(chunk for chunk in chunks if chunk)
-            
-            # Limit to a reasonable length
-            return text[:8000]  # Limit to first 8000 chars
+            raw_html = self.download_page(url)
+            return self.parse_page_content(raw_html)
             
         except Exception as e:
             logger.error(f"Error fetching {url}: {str(e)}")
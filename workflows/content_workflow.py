@@ -1,32 +1,54 @@
+import os
 import logging
-from typing import Dict, Any, List, Literal, TypedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, Any, List, Literal, TypedDict, Optional, Callable
 from langgraph.graph import StateGraph # type: ignore
 from agents.topic_discovery import TopicDiscoveryAgent
 from agents.content_generator import ContentGeneratorAgent
 from agents.critique_refiner import CritiqueRefinerAgent
 from agents.image_generator import ImageGeneratorAgent
 from utils.html_generator import HtmlGenerator
+from config import PROGRESSIVE_DELIVERY
 
 logger = logging.getLogger(__name__)
 
 # Define state type
 class WorkflowState(TypedDict):
+    refresh_topics: bool
     topics: List[Dict[str, Any]]
     selected_topic: Dict[str, Any]
     research_data: Dict[str, Any]
     content: Dict[str, Any]
+    draft_content: Dict[str, Any]
     refined_content: Dict[str, Any]
+    draft_image: Dict[str, Any]
     final_content: Dict[str, Any]
+    html_filename: str
+    draft_html_path: str
     html_output: str
     html_path: str
+    html_version: int
+    image_pending: bool
 
 class ContentWorkflow:
-    def __init__(self):
+    def __init__(self, progressive: bool = PROGRESSIVE_DELIVERY):
+        """
+        Args:
+            progressive: Publish a quick draft HTML right after the first generation,
+                         and replace it with the refined version when it is ready
+        """
         self.topic_agent = TopicDiscoveryAgent()
         self.content_agent = ContentGeneratorAgent()
         self.critique_agent = CritiqueRefinerAgent()
         self.image_agent = ImageGeneratorAgent()
         self.html_generator = HtmlGenerator()
+        self.progressive = progressive
+        
+        # Called with the draft HTML path as soon as the draft is published
+        self._on_draft: Optional[Callable[[str], None]] = None
+        # Background generation of an image that replaces a published placeholder
+        self._image_update: Optional[Future] = None
         
         # Initialize the LangGraph workflow
         self.workflow = self._build_workflow()
@@ -45,15 +67,27 @@ class ContentWorkflow:
         workflow.add_node("generate_content", self._generate_content)
         workflow.add_node("refine_content", self._refine_content)
         workflow.add_node("generate_image", self._generate_image)
+        workflow.add_node("attach_image", self._attach_image)
         workflow.add_node("create_html", self._create_html)
+        if self.progressive:
+            workflow.add_node("quick_draft", self._quick_draft)
         
         # Add edges
         workflow.add_edge("discover_topics", "human_topic_selection")
         workflow.add_edge("human_topic_selection", "research_topic")
         workflow.add_edge("research_topic", "generate_content")
+        # The image is generated from the draft while the content is refined
         workflow.add_edge("generate_content", "refine_content")
-        workflow.add_edge("refine_content", "generate_image")
-        workflow.add_edge("generate_image", "create_html")
+        workflow.add_edge("generate_content", "generate_image")
+        if self.progressive:
+            # A quick draft is published while the full post is generated, refined and illustrated.
+            # Nodes of one step run concurrently but the step ends with its slowest node, so the
+            # draft is published inside the same node that generates it
+            workflow.add_edge("research_topic", "quick_draft")
+            workflow.add_edge(["refine_content", "generate_image", "quick_draft"], "attach_image")
+        else:
+            workflow.add_edge(["refine_content", "generate_image"], "attach_image")
+        workflow.add_edge("attach_image", "create_html")
         
         # Set the entry point
         workflow.set_entry_point("discover_topics")
@@ -66,8 +100,8 @@ class ContentWorkflow:
         Discover trending AI topics.
         """
         logger.info("Discovering trending topics...")
-        topics = self.topic_agent.discover_trending_topics()
-        return {"topics": topics}
+        topics = self.topic_agent.get_trending_topics(force_refresh=state.get("refresh_topics", False))
+        return {**state, "topics": topics}
     
     def _human_topic_selection(self, state: WorkflowState) -> WorkflowState:
         """
@@ -85,35 +119,80 @@ class ContentWorkflow:
         research_data = self.topic_agent.get_detailed_research(state.get("selected_topic", {}))
         return {**state, "research_data": research_data}
     
-    def _generate_content(self, state: WorkflowState) -> WorkflowState:
+    def _generate_content(self, state: WorkflowState) -> Dict[str, Any]:
         """
         Generate initial content.
+        
+        In progressive mode this runs in parallel with _quick_draft, so only its own key is returned.
         """
         logger.info("Generating content...")
         content = self.content_agent.generate_content(state.get("research_data", {}))
-        return {**state, "content": content}
+        return {"content": content}
+    
+    def _quick_draft(self, state: WorkflowState) -> Dict[str, Any]:
+        """
+        Generate a quick draft and publish it while the full content is generated.
+        
+        The draft is only published; refinement starts from the full content.
+        """
+        logger.info("Generating quick draft...")
+        draft = self.content_agent.generate_quick_draft(state.get("research_data", {}))
+        return {"draft_content": draft, **self._publish_draft(draft)}
     
-    def _refine_content(self, state: WorkflowState) -> WorkflowState:
+    def _publish_draft(self, draft: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Publish the unrefined draft as HTML (version 1) while refinement continues.
+        
+        It shows a placeholder hero image; the refined version with the generated
+        image later replaces the same file.
+        """
+        filename = f"ai_blog_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+        
+        html_content = self.html_generator.generate_html(
+            title=draft.get("title", "AI Technology"),
+            content=draft.get("content", ""),
+            keywords=draft.get("keywords")
+        )
+        draft_path = self.html_generator.save_html(html_content, filename, stage="draft")
+        logger.info(f"Draft published: {draft_path}")
+        
+        if self._on_draft and draft_path:
+            try:
+                self._on_draft(draft_path)
+            except Exception as e:
+                logger.error(f"Error in draft callback: {str(e)}")
+                
+        return {"html_filename": filename, "draft_html_path": draft_path}
+    
+    def _refine_content(self, state: WorkflowState) -> Dict[str, Any]:
         """
         Refine content through iterations.
+        
+        Runs in parallel with _generate_image, so only its own key is returned.
         """
         logger.info("Refining content...")
         refined_content = self.critique_agent.iterative_refinement(state.get("content", {}))
-        return {**state, "refined_content": refined_content}
+        return {"refined_content": refined_content}
+    
+    def _generate_image(self, state: WorkflowState) -> Dict[str, Any]:
+        """
+        Generate an image from the draft content while it is being refined.
+        """
+        logger.info("Generating image from the draft...")
+        draft_image = self.image_agent.generate_draft_image(state.get("content", {}))
+        return {"draft_image": draft_image}
     
-    def _generate_image(self, state: WorkflowState) -> WorkflowState:
+    def _attach_image(self, state: WorkflowState) -> WorkflowState:
         """
-        Generate an image for the content.
+        Attach the draft image to the refined content, regenerating it if the title changed drastically.
         """
-        logger.info("Generating image...")
-        final_content = self.image_agent.process_content_for_image(state.get("refined_content", {}))
+        final_content = self.image_agent.attach_image(state.get("refined_content", {}), state.get("draft_image"))
         return {**state, "final_content": final_content}
-    def _create_html(self, state: WorkflowState) -> WorkflowState:
+    
+    def _render_html(self, final_data: Dict[str, Any]) -> str:
         """
-        Create the HTML output.
+        Render the HTML for the final content.
         """
-        logger.info("Creating HTML...")
-        final_data = state.get("final_content", {})
         title = final_data.get("title", "AI Technology")
         content = final_data.get("content", "")
         
@@ -128,19 +207,65 @@ class ContentWorkflow:
             content=content,
             image_path=image_path.split("/")[-1],
             image_alt=image_description,
-            image_caption=image_description
+            image_caption=image_description,
+            image_variants=final_data.get("image_variants"),
+            keywords=final_data.get("keywords")
         )
+        return html_content
+    
+    def _create_html(self, state: WorkflowState) -> WorkflowState:
+        """
+        Create the HTML output.
         
-        html_path = self.html_generator.save_html(html_content)
+        If the image is still pending the HTML is published with a placeholder, and
+        saved again as a new version once the generated image is ready.
+        """
+        logger.info("Creating HTML...")
+        final_data = state.get("final_content", {})
+        html_content = self._render_html(final_data)
+        
+        # In progressive mode this atomically replaces the published draft
+        html_path = self.html_generator.save_html(html_content, state.get("html_filename") or None)
+        self.topic_agent.record_published_post(state.get("selected_topic", {}), final_data.get("title", "AI Technology"), html_path)
+        
+        image_pending = bool(final_data.get("image_pending") and html_path)
+        if image_pending:
+            def on_image(content_with_image: Dict[str, Any]) -> None:
+                image_html_path = self.html_generator.save_html(self._render_html(content_with_image), os.path.basename(html_path))
+                logger.info(f"Generated image published: {image_html_path}")
+                
+            self._image_update = self.image_agent.regenerate_image(final_data, on_image)
         
-        return {**state, "html_output": html_content, "html_path": html_path}
+        return {
+            **state,
+            "html_output": html_content,
+            "html_path": html_path,
+            "html_version": self.html_generator.read_version(html_path) if html_path else 0,
+            "image_pending": image_pending
+        }
     
-    def run(self) -> Dict[str, Any]:
+    def run(self, refresh_topics: bool = False, on_draft: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Run the complete workflow.
+        
+        Cached trending topics are used unless refresh_topics is set.
+        
+        If the post was published with a placeholder image, "image_update" is a
+        future that resolves once the generated image has been saved into the HTML;
+        callers that exit afterwards should wait for it.
+        
+        Args:
+            refresh_topics: Discover fresh topics instead of using the cached snapshot
+            on_draft: Optional function called with the draft HTML path as soon as the
+                      draft is published (progressive mode only)
         """
         logger.info("Starting AI content generation workflow...")
-        final_state = self.workflow.invoke({})
+        self._on_draft = on_draft
+        self._image_update = None
+        try:
+            final_state = self.workflow.invoke({"refresh_topics": refresh_topics})
+        finally:
+            self._on_draft = None
         logger.info("Workflow completed!")
         
         # Return the results
@@ -149,5 +274,10 @@ class ContentWorkflow:
             "content": final_state.get("final_content", {}).get("content", ""),
             "image_path": final_state.get("final_content", {}).get("image_path", ""),
             "html_path": final_state.get("html_path", ""),
+            "html_version": final_state.get("html_version", 0),
+            "draft_html_path": final_state.get("draft_html_path", ""),
+            "image_pending": final_state.get("image_pending", False),
+            "image_update": self._image_update,
+            "draft_title": final_state.get("draft_content", {}).get("title", ""),
             "selected_topic": final_state.get("selected_topic", {})
         }
\ No newline at end of file